@@ -0,0 +1,15 @@
+"""
+Benchmarks for the card pipeline. Run `python -m benchmarks --help` for the options.
+"""
+
+from .run import STAGES, benchmark_vault, compare_results, run_benchmarks
+from .vault import VaultSummary, generate_vault
+
+__all__ = [
+    "STAGES",
+    "VaultSummary",
+    "benchmark_vault",
+    "compare_results",
+    "generate_vault",
+    "run_benchmarks",
+]
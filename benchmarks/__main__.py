@@ -0,0 +1,57 @@
+import argparse
+import json
+from pathlib import Path
+
+from benchmarks.run import compare_results, format_results, run_benchmarks
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Times each stage of the card pipeline on synthetic vaults."
+    )
+    parser.add_argument(
+        "--sizes",
+        help="The number of notes in each vault. Defaults to 100 1000 10000.",
+        metavar="sizes",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+    )
+    parser.add_argument(
+        "--seed",
+        help="The random seed used to generate the vaults.",
+        metavar="seed",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--output-file-path",
+        help="The path to write the results to as JSON.",
+        metavar="output_file_path",
+        type=Path,
+        default=None,
+    )
+    parser.add_argument(
+        "--compare",
+        help="The path to the JSON results of an earlier run to compare against.",
+        metavar="compare",
+        type=Path,
+        default=None,
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    params = parse_args()
+    results = run_benchmarks(params.sizes, params.seed)
+    for line in format_results(results):
+        print(line)
+    if params.output_file_path is not None:
+        with open(params.output_file_path, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Successfully wrote {params.output_file_path}.")
+    if params.compare is not None:
+        with open(params.compare, "r") as file:
+            baseline = json.load(file)
+        for line in compare_results(baseline, results):
+            print(line)
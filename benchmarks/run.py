@@ -0,0 +1,219 @@
+"""
+Times each stage of the card pipeline on synthetic vaults.
+"""
+
+import datetime
+import platform
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List
+
+import main
+import typst
+import utils.files as files
+import utils.string as string_utils
+from benchmarks.vault import generate_vault
+from obsidian import links, rpg_pages
+from obsidian.parser import MarkdownData
+
+# The stages of the pipeline, in the order they run.
+STAGES = [
+    "discovery",
+    "link_index",
+    "read",
+    "markdown_data",
+    "new_page",
+    "to_typst_card",
+    "images",
+    "yaml_dump",
+]
+
+
+@dataclass
+class StageResult:
+    """
+    The total time spent in a stage and the number of times it ran.
+    """
+
+    seconds: float = 0.0
+    count: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "seconds": self.seconds,
+            "count": self.count,
+            "per_item_us": self.seconds / self.count * 1e6 if self.count else 0.0,
+        }
+
+
+class StageTimer:
+    """
+    Adds up the time spent in each stage.
+    """
+
+    def __init__(self):
+        self.stages = {stage: StageResult() for stage in STAGES}
+
+    @contextmanager
+    def time(self, stage: str, count: int = 1) -> Iterator[None]:
+        """Time a block of code as part of a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            count (int, optional): The number of items the block processes. Defaults to 1.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            result = self.stages[stage]
+            result.seconds += time.perf_counter() - start
+            result.count += count
+
+
+def benchmark_vault(vault: Path, output_directory: Path) -> dict:
+    """Run every stage of the pipeline on a vault, one stage at a time for each note, the same way `main.py` does.
+
+    Args:
+        vault (Path): The vault, with its images in an `images` folder.
+        output_directory (Path): The directory to write the cards and images to.
+
+    Returns:
+        dict: The number of cards, the number of notes that failed to parse and the results of each stage.
+    """
+    timer = StageTimer()
+    with timer.time("discovery", 0):
+        card_files = [
+            file for file in files.find_files(vault) if rpg_pages.is_card_file(file)
+        ]
+    timer.stages["discovery"].count = len(card_files)
+    with timer.time("link_index", len(card_files)):
+        link_index = links.build_link_index(card_files)
+
+    cards: List[dict] = []
+    failed = 0
+    for file in card_files:
+        with timer.time("read"):
+            with open(file, "r") as note:
+                text = string_utils.replace_uncommon_characters(note.read())
+        try:
+            with timer.time("markdown_data"):
+                page = MarkdownData(text)
+                # The fields are parsed when they are first read, so read them all here to time the parsing on its own.
+                page.frontmatter, page.content, page.dataview_fields, page.images
+            with timer.time("new_page"):
+                rpg_page = rpg_pages.new_page(page, link_index)
+            with timer.time("to_typst_card"):
+                cards.append(rpg_page.to_typst_card().to_dict())
+        except (KeyError, ValueError, AttributeError):
+            failed += 1
+
+    image_directory = vault / "images"
+    for card in cards:
+        with timer.time("images"):
+            card["image"] = main.process_card_image(
+                card["image"], image_directory, output_directory
+            )
+    with timer.time("yaml_dump", len(cards)):
+        with open(output_directory / "data.yaml", "w") as file:
+            typst.write_cards(cards, file)
+
+    return {
+        "cards": len(cards),
+        "failed": failed,
+        "total_seconds": sum(result.seconds for result in timer.stages.values()),
+        "stages": {stage: result.to_dict() for stage, result in timer.stages.items()},
+    }
+
+
+def run_benchmarks(sizes: List[int], seed: int = 0) -> dict:
+    """Generate a vault of each size and benchmark it.
+
+    Args:
+        sizes (List[int]): The number of notes in each vault.
+        seed (int, optional): The random seed for the vaults. Defaults to 0.
+
+    Returns:
+        dict: The results, with enough information about the machine to compare runs.
+    """
+    runs = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as temp_directory:
+            vault = Path(temp_directory) / "vault"
+            output_directory = Path(temp_directory) / "out"
+            output_directory.mkdir()
+            start = time.perf_counter()
+            summary = generate_vault(vault, size, seed)
+            generate_seconds = time.perf_counter() - start
+            result = benchmark_vault(vault, output_directory)
+        runs.append(
+            {
+                "notes": size,
+                "generate_seconds": generate_seconds,
+                "images": summary.images,
+                "wrong_extensions": summary.wrong_extensions,
+                **result,
+            }
+        )
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "runs": runs,
+    }
+
+
+def compare_results(baseline: dict, current: dict) -> List[str]:
+    """Compare the time taken by each stage in two sets of results.
+
+    Args:
+        baseline (dict): The results of an earlier run.
+        current (dict): The results of this run.
+
+    Returns:
+        List[str]: A line for each stage of each vault size that both runs include.
+    """
+    lines: List[str] = []
+    baseline_runs = {run["notes"]: run for run in baseline["runs"]}
+    for run in current["runs"]:
+        baseline_run = baseline_runs.get(run["notes"])
+        if baseline_run is None:
+            continue
+        for stage in [*STAGES, "total"]:
+            if stage == "total":
+                before, after = baseline_run["total_seconds"], run["total_seconds"]
+            elif stage in baseline_run["stages"]:
+                before = baseline_run["stages"][stage]["seconds"]
+                after = run["stages"][stage]["seconds"]
+            else:
+                continue
+            change = (after - before) / before * 100 if before else 0.0
+            lines.append(
+                f"{run['notes']:>7} notes  {stage:<14} {before:9.4f}s -> {after:9.4f}s  ({change:+.1f}%)"
+            )
+    return lines
+
+
+def format_results(results: dict) -> List[str]:
+    """Format the results as a table.
+
+    Args:
+        results (dict): The results from `run_benchmarks`.
+
+    Returns:
+        List[str]: A line for each stage of each vault size.
+    """
+    lines: List[str] = []
+    for run in results["runs"]:
+        lines.append(
+            f"{run['notes']} notes, {run['cards']} cards, {run['failed']} failed, {run['total_seconds']:.3f}s"
+        )
+        for stage, result in run["stages"].items():
+            lines.append(
+                f"  {stage:<14} {result['seconds']:9.4f}s  {result['per_item_us']:9.1f} us/item"
+            )
+    return lines
@@ -0,0 +1,324 @@
+"""
+Generates synthetic Obsidian vaults for benchmarking.
+
+The notes follow the character, item and location templates in `test/files`, with frontmatter, Dataview fields, wikilinks and image embeds.
+Some notes aren't cards, some images have the wrong extension and some embeds point to images that don't exist, as in a real vault.
+"""
+
+import random
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+SYLLABLES = [
+    "ar",
+    "bel",
+    "cor",
+    "dan",
+    "el",
+    "fen",
+    "gar",
+    "hil",
+    "is",
+    "jor",
+    "kel",
+    "lun",
+    "mor",
+    "nim",
+    "or",
+    "pel",
+    "quin",
+    "ros",
+    "sil",
+    "tor",
+    "ul",
+    "vex",
+    "wyn",
+    "zan",
+]
+RACES = [
+    "Human",
+    "Elf",
+    "Dwarf",
+    "Halfling",
+    "Gnome",
+    "Tiefling",
+    "Half-Orc",
+    "Dragonborn",
+]
+CLASSES = [
+    "Barbarian",
+    "Bard",
+    "Cleric",
+    "Druid",
+    "Fighter",
+    "Monk",
+    "Paladin",
+    "Ranger",
+    "Rogue",
+    "Wizard",
+]
+GENDERS = ["Male", "Female", "Nonbinary"]
+WEAPON_PROPERTIES = [
+    "Finesse",
+    "Light",
+    "Thrown",
+    "Heavy",
+    "Reach",
+    "Versatile",
+    "Two-Handed",
+]
+RARITIES = ["common", "uncommon", "rare", "very rare", "legendary"]
+LOCATION_KINDS = ["tavern", "library", "temple", "shop", "guildhall", "manor"]
+WORDS = "the a of and in to with for on by ancient quiet old grand dusty hidden secret busy narrow tall bright dark stone wooden golden scarlet river market harbor tower ward street guard merchant scholar traveler rumor treasure map song".split()
+
+# The chance that a note embeds an image, and the chances that the image has the wrong extension or is missing.
+IMAGE_RATE = 0.8
+WRONG_EXTENSION_RATE = 0.1
+MISSING_IMAGE_RATE = 0.05
+# The share of notes that aren't cards, such as session logs.
+OTHER_NOTE_RATE = 0.1
+
+
+def png_bytes() -> bytes:
+    """
+    Returns a valid 1x1 PNG image.
+    """
+
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        checksum = zlib.crc32(chunk_type + data)
+        return (
+            struct.pack(">I", len(data))
+            + chunk_type
+            + data
+            + struct.pack(">I", checksum)
+        )
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    pixels = zlib.compress(b"\x00\xff\x00\x00")
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", pixels)
+        + chunk(b"IEND", b"")
+    )
+
+
+# A JPEG with only its start, JFIF header and end markers, which is enough for the file type to be detected.
+JPEG_BYTES = (
+    b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00\xff\xd9"
+)
+
+
+@dataclass
+class VaultSummary:
+    """
+    The number of each kind of file in a generated vault.
+    """
+
+    characters: int = 0
+    items: int = 0
+    locations: int = 0
+    other_notes: int = 0
+    images: int = 0
+    wrong_extensions: int = 0
+    missing_images: int = 0
+    note_paths: list[str] = field(default_factory=list)
+
+    @property
+    def cards(self) -> int:
+        return self.characters + self.items + self.locations
+
+
+class VaultGenerator:
+    """
+    Writes a reproducible synthetic vault. The same seed always produces the same notes.
+    """
+
+    def __init__(self, directory: Path, seed: int = 0):
+        self.directory = directory
+        self.random = random.Random(seed)
+        self.summary = VaultSummary()
+        self.location_names: list[str] = []
+        self.used_names: set[str] = set()
+
+    def __name(self, words: int = 2, unique: bool = True) -> str:
+        while True:
+            name = " ".join(
+                "".join(
+                    self.random.choice(SYLLABLES)
+                    for _ in range(self.random.randint(2, 4))
+                ).capitalize()
+                for _ in range(words)
+            )
+            if not unique:
+                return name
+            # Note names must be unique, since they are also filenames.
+            if name not in self.used_names:
+                self.used_names.add(name)
+                return name
+
+    def __sentence(self, words: int = 12) -> str:
+        text = " ".join(self.random.choice(WORDS) for _ in range(words))
+        return text.capitalize() + "."
+
+    def __paragraph(self, sentences: int = 3) -> str:
+        text = " ".join(
+            self.__sentence(self.random.randint(8, 16)) for _ in range(sentences)
+        )
+        # Link to other notes in the body text, as real notes do.
+        if self.location_names and self.random.random() < 0.5:
+            text += f" See [[{self.random.choice(self.location_names)}]]."
+        return text
+
+    def __location_link(self) -> str:
+        if self.location_names and self.random.random() < 0.9:
+            return self.random.choice(self.location_names)
+        return self.__name(unique=False)
+
+    def __image_embed(self, stem: str) -> str:
+        """
+        Writes an image for a note and returns the embed line, or "" if the note has no image.
+        """
+        if self.random.random() >= IMAGE_RATE:
+            return ""
+        filename = f"{stem}.png"
+        if self.random.random() < MISSING_IMAGE_RATE:
+            self.summary.missing_images += 1
+            return f"![[{filename}]]\n\n"
+        is_jpeg = self.random.random() < 0.5
+        data = JPEG_BYTES if is_jpeg else png_bytes()
+        if self.random.random() < WRONG_EXTENSION_RATE:
+            # Give the image the other format's extension.
+            filename = f"{stem}.{'png' if is_jpeg else 'jpg'}"
+            self.summary.wrong_extensions += 1
+        else:
+            filename = f"{stem}.{'jpg' if is_jpeg else 'png'}"
+        (self.directory / "images" / filename).write_bytes(data)
+        self.summary.images += 1
+        return f"![[{filename}|+character]]\n\n"
+
+    def __write_note(self, folder: str, name: str, text: str) -> None:
+        path = self.directory / folder / f"{name}.md"
+        path.write_text(text, encoding="utf-8")
+        self.summary.note_paths.append(str(path))
+
+    def __character(self, index: int) -> None:
+        name = self.__name()
+        first_name = name.split()[0]
+        text = (
+            "---\ntags:\n- character\n"
+            f"aliases:\n- {first_name}\n"
+            f'location: "[[{self.__location_link()}]]"\n---\n\n'
+            f"# {name}\n\n"
+            f"_(gender:: {self.random.choice(GENDERS)}) (race:: {self.random.choice(RACES)}) (class:: {self.random.choice(CLASSES)})_\n\n"
+            f"{self.__image_embed(f'character-{index}')}"
+            "## Description\n\n"
+            f"### Overview\n\n{self.__paragraph()}\n\n"
+            f"### Looks\n\n{self.__paragraph(2)}\n\n"
+            f"### Voice\n\n{self.__sentence()}\n\n"
+            "## Personality\n\n"
+            f"### Quirk\n\n{self.__sentence()}\n\n"
+            f"### Likes\n\n{self.__sentence()}\n\n"
+            f"### Dislikes\n\n{self.__sentence()}\n\n"
+            "## Hooks\n\n"
+            f"### Goals\n\n{self.__sentence()}\n\n"
+            f"### Frustration\n\n{self.__sentence()}\n\n"
+            "## Group Membership\n\n"
+            f"- [Group Name:: [[The {self.__name(1, unique=False)} Company]]]\n"
+            "- [Group Title:: Member]\n"
+            f"- [Group Rank:: {self.random.randint(1, 9)}]\n"
+        )
+        self.__write_note("Characters", name, text)
+        self.summary.characters += 1
+
+    def __item(self, index: int) -> None:
+        name = f"{self.__name(1)} of {self.__name(1, unique=False)}"
+        properties = ", ".join(self.random.sample(WEAPON_PROPERTIES, 3))
+        text = (
+            "---\ntags:\n- item/weapon\n"
+            f"aliases: [{name.split()[0]}]\nobsidianUIMode: preview\n---\n\n"
+            f"# {name}\n\n"
+            f"{self.__image_embed(f'item-{index}')}"
+            f"## Description\n\n{self.__paragraph()}\n\n"
+            "## Properties\n\n"
+            f"- [Damage:: 1d{self.random.choice([4, 6, 8, 10, 12])}+{self.random.randint(0, 3)} S]\n"
+            f"- [Range:: {self.random.choice([5, 10, 20])}/{self.random.choice([30, 60, 120])}]\n"
+            f"- [Properties:: {properties}]\n"
+            f"- [Rarity:: {self.random.choice(RARITIES)}]\n"
+            f"- [Cost:: {self.random.randint(1, 5000)} gp]\n"
+            f"- [Weight:: {self.random.randint(1, 20)}.0 lbs.]\n"
+        )
+        self.__write_note("Items", name, text)
+        self.summary.items += 1
+
+    def __location(self, index: int) -> None:
+        name = f"The {self.__name(1)} {self.random.choice(LOCATION_KINDS).capitalize()}"
+        text = (
+            "---\ntags:\n"
+            f"  - location/service/{self.random.choice(LOCATION_KINDS)}\n"
+            f'location: "[[{self.__name(1, unique=False)} Ward]]"\nobsidianUIMode: preview\n---\n\n'
+            f"# {name}\n\n"
+            f"{self.__image_embed(f'location-{index}')}"
+            f"## Description\n\n{self.__paragraph()}\n\n{self.__paragraph(2)}\n\n"
+            f"## Occupants\n\nThe owner is [[{self.__name(unique=False)}]]. {self.__paragraph(2)}\n\n"
+            f"## Story Hook\n\n{self.__paragraph()}\n"
+        )
+        self.__write_note("Locations", name, text)
+        self.location_names.append(name)
+        self.summary.locations += 1
+
+    def __other_note(self, index: int) -> None:
+        text = (
+            f"---\ntags: session\ndate: 2024-01-{index % 28 + 1:02d}\n---\n\n"
+            f"# Session {index}\n\n{self.__paragraph(5)}\n"
+        )
+        self.__write_note("Sessions", f"Session {index}", text)
+        self.summary.other_notes += 1
+
+    def generate(self, notes: int) -> VaultSummary:
+        """Write the notes and images.
+
+        Args:
+            notes (int): The total number of markdown notes to write.
+
+        Returns:
+            VaultSummary: The number of each kind of file written.
+        """
+        for folder in [
+            "Characters",
+            "Items",
+            "Locations",
+            "Sessions",
+            "images",
+            ".obsidian",
+        ]:
+            (self.directory / folder).mkdir(parents=True, exist_ok=True)
+        # Obsidian's settings folder is in every vault and should be skipped during discovery.
+        (self.directory / ".obsidian" / "workspace.md").write_text("# Workspace\n")
+        for index in range(notes):
+            roll = self.random.random()
+            if roll < OTHER_NOTE_RATE:
+                self.__other_note(index)
+            elif roll < 0.4:
+                self.__location(index)
+            elif roll < 0.7:
+                self.__character(index)
+            else:
+                self.__item(index)
+        return self.summary
+
+
+def generate_vault(directory: Path, notes: int, seed: int = 0) -> VaultSummary:
+    """Write a synthetic vault.
+
+    Args:
+        directory (Path): The directory to write the vault to.
+        notes (int): The number of markdown notes.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        VaultSummary: The number of each kind of file written.
+    """
+    return VaultGenerator(directory, seed).generate(notes)
@@ -1,50 +1,911 @@
 import argparse
-from dataclasses import asdict
-from os import listdir
-from os.path import isfile, join
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, nullcontext
+from functools import cache, partial
 from pathlib import Path
-from shutil import copy
-from typing import List
-
-import yaml
+from typing import Any, Callable, Iterable, Iterator, List, TypeVar
 
 import typst as typst
+import utils.files as files
 import utils.image as image
+import utils.profiling as profiling
 import utils.string as string_utils
-from obsidian import rpg_pages
+import utils.watch as watch
+from utils.image_resize import ImageResizer
+from utils.image_store import store_image
+from utils.manifest import BuildManifest
+from utils.vault_index import (
+    IndexedPage,
+    VaultIndex,
+    compile_query,
+    read_fingerprinted_file,
+)
+from obsidian import MarkdownData, decks, links, rpg_pages
+
+# The link index used by a worker process, set once when the worker starts rather than being sent with every file.
+worker_link_index: links.LinkIndex | None = None
+# The number of notes read, parsed or written ahead of the card being written, for each worker.
+# It keeps every worker busy while bounding the number of cards in memory.
+NOTES_AHEAD_PER_WORKER = 2
+
+T = TypeVar("T")
+R = TypeVar("R")
+# A card dict with the title each of its links resolved to, or None if its links weren't resolved.
+LinkedCard = tuple[dict, links.ResolvedLinks | None]
 
 
-def get_files_with_extension(directory: Path, extension: str) -> List[str]:
-    """Get all files in a directory with a specific extension.
+def read_md_file(filepath: str) -> str:
+    """Read the text of a markdown file.
 
     Args:
-        directory (Path): The path to the directory.
-        extension (str): The file extension, including the period.
+        filepath (str): The path to the markdown file.
 
     Returns:
-        List[str]: A list of file paths.
+        str: The text of the file.
     """
+    with profiling.stage("read"), open(filepath, "r") as file:
+        return file.read()
 
-    files = [f for f in listdir(directory) if isfile(join(directory, f))]
-    markdown_files = [f for f in files if f.endswith(extension)]
-    return [f"{directory}/{file}" for file in markdown_files]
 
-
-def parse_md_to_typst_card(filepath: str) -> typst.Card:
+def parse_md_to_typst_card(
+    filepath: str, link_index: links.LinkIndex | None = None
+) -> typst.Card:
     """Parse an Obsidian markdown file into a Typst card.
 
     Args:
-        text (str): The text of the markdown file.
+        filepath (str): The path to the markdown file.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used to resolve the page's links. Defaults to None.
 
     Returns:
         rpgCardInterface: A Typst card.
     """
-    with open(filepath, "r") as file:
-        text: str = file.read()
+    return parse_md_text_to_typst_card(read_md_file(filepath), link_index)
+
+
+def parse_md_text_to_typst_card(
+    text: str, link_index: links.LinkResolver | None = None
+) -> typst.Card:
+    """Parse the text of an Obsidian markdown file into a Typst card.
+
+    Args:
+        text (str): The text of the markdown file.
+        link_index (links.LinkResolver | None, optional): An index of the vault's notes, such as a `links.LinkIndex`, used to resolve the page's links. Defaults to None.
+
+    Returns:
+        typst.Card: A Typst card.
+    """
+    with profiling.stage("replace_uncommon_characters"):
         cleaned_text = string_utils.replace_uncommon_characters(text)
-        page_object: rpg_pages.RpgData = rpg_pages.new_page(cleaned_text)
+    # The page's fields are parsed when they are first read, so their time is recorded under the stages that read them.
+    page = MarkdownData(cleaned_text)
+    page_object: rpg_pages.RpgData = rpg_pages.new_page(page, link_index)
+    with profiling.stage("build_card"):
         page_typst: typst.Card = page_object.to_typst_card()
-        return page_typst
+    return page_typst
+
+
+def parse_md_to_card_dict(
+    filepath: str, link_index: links.LinkIndex | None = None
+) -> dict:
+    """Parse an Obsidian markdown file into a Typst card dict.
+
+    Args:
+        filepath (str): The path to the markdown file.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used to resolve the page's links. Defaults to None.
+
+    Returns:
+        dict: The Typst card as a dict.
+    """
+    return parse_md_to_linked_card(filepath, link_index)[0]
+
+
+def parse_md_to_linked_card(
+    filepath: str, link_index: links.LinkIndex | None = None
+) -> LinkedCard:
+    """Parse an Obsidian markdown file into a Typst card dict, recording the notes its links resolved to.
+
+    Args:
+        filepath (str): The path to the markdown file.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used to resolve the page's links. Defaults to None.
+
+    Returns:
+        LinkedCard: The Typst card as a dict, with the title each of its links resolved to, or None if there is no link index.
+    """
+    with profiling.note(filepath):
+        return parse_md_text_to_linked_card(read_md_file(filepath), link_index)
+
+
+def parse_md_text_to_linked_card(
+    text: str, link_index: links.LinkIndex | None = None
+) -> LinkedCard:
+    """Parse the text of an Obsidian markdown file into a Typst card dict, recording the notes its links resolved to.
+
+    Args:
+        text (str): The text of the markdown file.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used to resolve the page's links. Defaults to None.
+
+    Returns:
+        LinkedCard: The Typst card as a dict, with the title each of its links resolved to, or None if there is no link index.
+    """
+    recorder = None if link_index is None else links.LinkRecorder(link_index)
+    card = parse_md_text_to_typst_card(text, recorder)
+    with profiling.stage("card_to_dict"):
+        return card.to_dict(), None if recorder is None else recorder.resolved
+
+
+def set_worker_link_index(link_index: links.LinkIndex | None) -> None:
+    """
+    Initializes a worker process with the link index.
+    """
+    global worker_link_index
+    worker_link_index = link_index
+
+
+def parse_md_to_indexed_page(
+    filepath: str, link_index: links.LinkIndex | None = None
+) -> IndexedPage:
+    """Parse an Obsidian markdown file into its card and the fields the vault index stores.
+
+    Args:
+        filepath (str): The path to the markdown file.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used to resolve the page's links. Defaults to None.
+
+    Returns:
+        IndexedPage: The page's type, full tags, frontmatter, Dataview fields and card, with the title each of its links resolved to.
+    """
+    recorder = None if link_index is None else links.LinkRecorder(link_index)
+    with profiling.note(filepath):
+        # The note is fingerprinted as it is read, so an edit made while it is parsed isn't mistaken for the parsed version.
+        with profiling.stage("read"):
+            text, fingerprint = read_fingerprinted_file(filepath)
+        with profiling.stage("replace_uncommon_characters"):
+            cleaned_text = string_utils.replace_uncommon_characters(text)
+        page = MarkdownData(cleaned_text)
+        page_object: rpg_pages.RpgData = rpg_pages.new_page(page, recorder)
+        with profiling.stage("build_card"):
+            card = page_object.to_typst_card()
+        with profiling.stage("card_to_dict"):
+            card_dict = card.to_dict()
+        return IndexedPage(
+            filepath,
+            rpg_pages.get_page_type_name(page.tags),
+            card_dict,
+            fingerprint,
+            page.full_tags,
+            page.frontmatter,
+            page.dataview_fields,
+            None if recorder is None else recorder.resolved,
+        )
+
+
+def parse_md_to_linked_card_in_worker(filepath: str) -> LinkedCard:
+    """
+    Same as `parse_md_to_linked_card`, using the worker process's link index.
+    """
+    return parse_md_to_linked_card(filepath, worker_link_index)
+
+
+def parse_md_text_to_linked_card_in_worker(text: str) -> LinkedCard:
+    """
+    Same as `parse_md_text_to_linked_card`, using the worker process's link index.
+    """
+    return parse_md_text_to_linked_card(text, worker_link_index)
+
+
+def parse_md_to_indexed_page_in_worker(filepath: str) -> IndexedPage:
+    """
+    Same as `parse_md_to_indexed_page`, using the worker process's link index.
+    """
+    return parse_md_to_indexed_page(filepath, worker_link_index)
+
+
+def iter_parse_results(
+    results: Iterable[tuple[str, Callable[[], T]]],
+) -> Iterator[tuple[str, T]]:
+    """Get the result of parsing each markdown file as soon as it is ready, reporting the files that failed to parse.
+
+    Args:
+        results (Iterable[tuple[str, Callable[[], T]]]): Each markdown file path with a callable that returns its parsed result.
+
+    Yields:
+        tuple[str, T]: Each file path with its result, in the same order as `results`. Files that failed to parse are left out.
+    """
+    for file, get_result in results:
+        try:
+            result = get_result()
+        except KeyError as identifier:
+            print(f"🔴 '{file}' KeyError: {identifier}")
+            continue
+        except ValueError as identifier:
+            print(f"🔴 '{file}' ValueError: {identifier}")
+            continue
+        except AttributeError as identifier:
+            print(f"🔴 '{file}' AttributeError: {identifier}")
+            continue
+        yield file, result
+
+
+def iter_card_dicts(
+    results: Iterable[tuple[str, Callable[[], LinkedCard]]],
+    manifest: BuildManifest | None = None,
+    links_by_file: dict[str, links.ResolvedLinks | None] | None = None,
+) -> Iterator[tuple[str, dict]]:
+    """Get the card for each markdown file as soon as it is ready, reporting the files that failed to parse.
+
+    Args:
+        results (Iterable[tuple[str, Callable[[], LinkedCard]]]): Each markdown file path with a callable that returns its card dict and links.
+        manifest (BuildManifest | None, optional): A build manifest to record each card in. Defaults to None.
+        links_by_file (dict[str, links.ResolvedLinks | None] | None, optional): A dict to record the links of each card in, keyed by file path. Defaults to None.
+
+    Yields:
+        tuple[str, dict]: Each file path with its card as a dict, in the same order as `results`. Files that failed to parse are left out.
+    """
+    for file, (card, resolved_links) in iter_parse_results(results):
+        if manifest is not None:
+            manifest.set_card(file, card, resolved_links)
+        if links_by_file is not None:
+            links_by_file[file] = resolved_links
+        yield file, card
+
+
+def get_card_result(
+    file: str,
+    manifest: BuildManifest | None = None,
+    executor: ProcessPoolExecutor | None = None,
+    link_index: links.LinkIndex | None = None,
+) -> Callable[[], LinkedCard]:
+    """Look up a markdown file's card in the build manifest, or start parsing it.
+
+    Args:
+        file (str): The path to the markdown file.
+        manifest (BuildManifest | None, optional): A build manifest. Defaults to None.
+        executor (ProcessPoolExecutor | None, optional): A process pool to parse the file in. Its workers must have been initialized with `set_worker_link_index`. Defaults to None, which parses it in this process when the result is requested.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used when parsing in this process. Defaults to None.
+
+    Returns:
+        Callable[[], LinkedCard]: A callable that returns the card dict and its links, or raises the error from parsing the file.
+    """
+    if manifest is not None:
+        cached_card = manifest.get_linked_card(file)
+        if cached_card is not None:
+            return partial(tuple, cached_card)  # type: ignore
+    if executor is None:
+        return partial(parse_md_to_linked_card, file, link_index)
+    return executor.submit(parse_md_to_linked_card_in_worker, file).result
+
+
+def parse_md_files(
+    md_files: Iterable[str],
+    jobs: int = 1,
+    manifest: BuildManifest | None = None,
+    link_index: links.LinkIndex | None = None,
+) -> List[dict]:
+    """Parse markdown files into Typst card dicts, optionally across a process pool.
+
+    Args:
+        md_files (Iterable[str]): The markdown file paths. Files are parsed as soon as they are yielded.
+        jobs (int, optional): The number of worker processes. 1 parses in this process, 0 uses every CPU core. Defaults to 1.
+        manifest (BuildManifest | None, optional): A build manifest. Files whose cards are cached in it aren't parsed again. Defaults to None.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used to resolve links between cards. Defaults to None.
+
+    Returns:
+        List[dict]: The cards as dicts, in the same order as `md_files`.
+    """
+    return list(parse_md_files_by_path(md_files, jobs, manifest, link_index).values())
+
+
+def parse_md_files_by_path(
+    md_files: Iterable[str],
+    jobs: int = 1,
+    manifest: BuildManifest | None = None,
+    link_index: links.LinkIndex | None = None,
+    links_by_file: dict[str, links.ResolvedLinks | None] | None = None,
+) -> dict[str, dict]:
+    """Same as `parse_md_files`, but returns the cards keyed by the file they came from.
+
+    Args:
+        links_by_file (dict[str, links.ResolvedLinks | None] | None, optional): A dict to record the links of each card in, keyed by file path. Defaults to None.
+
+    Returns:
+        dict[str, dict]: The cards as dicts keyed by file path, in the same order as `md_files`.
+    """
+    return dict(
+        stream_cards(md_files, jobs, manifest, link_index, links_by_file=links_by_file)
+    )
+
+
+def run_ahead(items: Iterable[T], ahead: int) -> Iterator[T]:
+    """Take up to `ahead` more items from an iterable before yielding each one.
+
+    Work that an item starts when it is made, such as a task submitted to an executor, keeps running ahead of the consumer, without taking the whole iterable.
+
+    Args:
+        items (Iterable[T]): The items.
+        ahead (int): The number of items to take before the one being yielded. 0 yields each item as soon as it is taken.
+
+    Yields:
+        T: The items, in order.
+    """
+    pending: deque[T] = deque()
+    for item in items:
+        pending.append(item)
+        if len(pending) > ahead:
+            yield pending.popleft()
+    yield from pending
+
+
+def read_card_source(
+    file: str, manifest: BuildManifest | None = None
+) -> LinkedCard | str:
+    """Read a markdown file, unless its card is cached in the build manifest.
+
+    Args:
+        file (str): The path to the markdown file.
+        manifest (BuildManifest | None, optional): A build manifest. Defaults to None.
+
+    Returns:
+        LinkedCard | str: The cached card dict and its links, or the text of the file.
+    """
+    if manifest is not None:
+        cached_card = manifest.get_linked_card(file)
+        if cached_card is not None:
+            return cached_card
+    return read_md_file(file)
+
+
+def get_source_card_result(
+    source: LinkedCard | str,
+    executor: ProcessPoolExecutor | None = None,
+    link_index: links.LinkIndex | None = None,
+) -> Callable[[], LinkedCard]:
+    """Start parsing the text read by `read_card_source`.
+
+    Args:
+        source (LinkedCard | str): The cached card dict and its links, or the text of the markdown file.
+        executor (ProcessPoolExecutor | None, optional): A process pool to parse the text in. Its workers must have been initialized with `set_worker_link_index`. Defaults to None, which parses it in this process when the result is requested.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used when parsing in this process. Defaults to None.
+
+    Returns:
+        Callable[[], LinkedCard]: A callable that returns the card dict and its links, or raises the error from parsing the text.
+    """
+    if isinstance(source, tuple):
+        return partial(tuple, source)  # type: ignore
+    if executor is None:
+        return partial(parse_md_text_to_linked_card, source, link_index)
+    return executor.submit(parse_md_text_to_linked_card_in_worker, source).result
+
+
+def stream_cards(
+    md_files: Iterable[str],
+    jobs: int = 1,
+    manifest: BuildManifest | None = None,
+    link_index: links.LinkIndex | None = None,
+    io_executor: Executor | None = None,
+    io_concurrency: int = 1,
+    links_by_file: dict[str, links.ResolvedLinks | None] | None = None,
+) -> Iterator[tuple[str, dict]]:
+    """Parse markdown files into Typst card dicts, yielding each card as soon as it and the cards before it are ready.
+
+    Only a few notes per worker are read or parsed ahead of the card being yielded, so memory use doesn't grow with the size of the vault.
+
+    Args:
+        md_files (Iterable[str]): The markdown file paths. Files are read as they are yielded.
+        jobs (int, optional): The number of worker processes to parse the notes in. 1 parses them in this process, 0 uses every CPU core. Defaults to 1.
+        manifest (BuildManifest | None, optional): A build manifest. Files whose cards are cached in it aren't parsed again. Defaults to None.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used to resolve links between cards. Defaults to None.
+        io_executor (Executor | None, optional): A thread pool to read the notes on, several at once, while earlier notes are parsed. Defaults to None, which reads each note just before it is parsed.
+        io_concurrency (int, optional): The number of threads in `io_executor`. Defaults to 1.
+        links_by_file (dict[str, links.ResolvedLinks | None] | None, optional): A dict to record the links of each card in, keyed by file path. Defaults to None.
+
+    Yields:
+        tuple[str, dict]: Each file path with its card as a dict, in the same order as `md_files`. Files that failed to parse are left out.
+    """
+    # Parsing and reading run ahead separately, so that neither limits how many notes the other has in flight.
+    parse_ahead = NOTES_AHEAD_PER_WORKER * (
+        (os.cpu_count() or 1) if jobs == 0 else jobs
+    )
+    read_ahead = NOTES_AHEAD_PER_WORKER * io_concurrency
+    parse_executor: ProcessPoolExecutor | None = (
+        None
+        if jobs == 1
+        else ProcessPoolExecutor(
+            max_workers=jobs or None,
+            initializer=set_worker_link_index,
+            initargs=(link_index,),
+        )
+    )
+    with parse_executor or nullcontext():
+        results: Iterable[tuple[str, Callable[[], LinkedCard]]]
+        if io_executor is None:
+            results = (
+                (file, get_card_result(file, manifest, parse_executor, link_index))
+                for file in md_files
+            )
+        else:
+            sources = run_ahead(
+                (
+                    (file, io_executor.submit(read_card_source, file, manifest))
+                    for file in md_files
+                ),
+                read_ahead,
+            )
+            results = (
+                (
+                    file,
+                    get_source_card_result(source.result(), parse_executor, link_index),
+                )
+                for file, source in sources
+            )
+        yield from iter_card_dicts(
+            run_ahead(results, parse_ahead), manifest, links_by_file
+        )
+
+
+def refresh_index(
+    vault_index: VaultIndex,
+    md_files: List[str],
+    jobs: int = 1,
+    link_index: links.LinkIndex | None = None,
+) -> int:
+    """Bring the vault index up to date, parsing only the notes that changed since they were indexed.
+
+    Notes that are no longer in the vault, or that now fail to parse, are removed from the index.
+
+    Args:
+        vault_index (VaultIndex): The index.
+        md_files (List[str]): The paths to every markdown file that can become a card.
+        jobs (int, optional): The number of worker processes to parse the notes in. 1 parses them in this process, 0 uses every CPU core. Defaults to 1.
+        link_index (links.LinkIndex | None, optional): An index of the vault's notes, used to resolve links between cards. Only the notes whose links now resolve differently are parsed again. Defaults to None.
+
+    Returns:
+        int: The number of notes parsed.
+    """
+    vault_index.link_index = link_index
+    vault_index.keep_pages(md_files)
+    stale_files = [file for file in md_files if not vault_index.is_current(file)]
+    for file in stale_files:
+        vault_index.remove_page(file)
+    workers = (os.cpu_count() or 1) if jobs == 0 else jobs
+    parse_executor: ProcessPoolExecutor | None = (
+        None
+        if jobs == 1 or len(stale_files) < 2
+        else ProcessPoolExecutor(
+            max_workers=jobs or None,
+            initializer=set_worker_link_index,
+            initargs=(link_index,),
+        )
+    )
+    with parse_executor or nullcontext():
+        results = (
+            (
+                file,
+                (
+                    partial(parse_md_to_indexed_page, file, link_index)
+                    if parse_executor is None
+                    else parse_executor.submit(
+                        parse_md_to_indexed_page_in_worker, file
+                    ).result
+                ),
+            )
+            for file in stale_files
+        )
+        # The pages are stored as they arrive, so only a few are held in memory at once.
+        for _, page in iter_parse_results(
+            run_ahead(results, NOTES_AHEAD_PER_WORKER * workers)
+        ):
+            vault_index.set_page(page)
+    vault_index.commit()
+    return len(stale_files)
+
+
+def stream_indexed_cards(
+    vault_index: VaultIndex, md_files: Iterable[str], query: str
+) -> Iterator[tuple[str, dict]]:
+    """Read the cards of the notes that match a query from the vault index, without parsing any note.
+
+    Args:
+        vault_index (VaultIndex): An up-to-date index.
+        md_files (Iterable[str]): The markdown file paths, in the order the cards are written.
+        query (str): The query, such as `type=item and rarity=rare` or `tag:character/npc/*`.
+
+    Raises:
+        ValueError: If the query is malformed.
+
+    Yields:
+        tuple[str, dict]: Each matching file path with its card as a dict, in the same order as `md_files`.
+    """
+    matching_files = vault_index.find_pages(query)
+    for file in md_files:
+        if file not in matching_files:
+            continue
+        card = vault_index.get_card(file)
+        if card is not None:
+            yield file, card
+
+
+def find_card_files(
+    md_files: Iterable[str], io_executor: Executor | None = None
+) -> List[str]:
+    """Keep the markdown files that could become cards, reading only their frontmatter.
+
+    Args:
+        md_files (Iterable[str]): The markdown file paths.
+        io_executor (Executor | None, optional): A thread pool to read the files on, several at once. Defaults to None, which reads them one at a time.
+
+    Returns:
+        List[str]: The paths of the files that could become cards, in the same order as `md_files`.
+    """
+    if io_executor is None:
+        return list(filter(rpg_pages.is_card_file, md_files))
+    md_files = list(md_files)
+    return [
+        file
+        for file, is_card_file in zip(
+            md_files, io_executor.map(rpg_pages.is_card_file, md_files)
+        )
+        if is_card_file
+    ]
+
+
+def build_link_index(
+    card_files: List[str],
+    manifest: BuildManifest | None = None,
+    link_targets: dict[str, links.LinkTarget] | None = None,
+    io_executor: Executor | None = None,
+) -> links.LinkIndex:
+    """Index the notes that cards can link to, reading only the start of each file.
+
+    Args:
+        card_files (List[str]): The paths to the markdown files that can become cards.
+        manifest (BuildManifest | None, optional): A build manifest. Its cached cards are only reused while their links resolve the same way in the index. Defaults to None.
+        link_targets (dict[str, links.LinkTarget] | None, optional): The notes read by an earlier call, keyed by path. Files missing from it are read and added to it. Defaults to None.
+        io_executor (Executor | None, optional): A thread pool to read the files on, several at once. Defaults to None, which reads them one at a time.
+
+    Returns:
+        links.LinkIndex: The index of the notes.
+    """
+    if link_targets is None:
+        link_targets = {}
+    unread_files = [file for file in card_files if file not in link_targets]
+    read = map if io_executor is None else io_executor.map
+    for file, link_target in zip(
+        unread_files, read(links.read_link_target, unread_files)
+    ):
+        link_targets[file] = link_target
+    link_index = links.LinkIndex(link_targets[file] for file in card_files)
+    if manifest is not None:
+        manifest.link_index = link_index
+    return link_index
+
+
+def process_card_image(
+    image_name: str,
+    input_image_directory: Path,
+    output_image_directory: Path,
+    image_resizer: ImageResizer | None = None,
+) -> str:
+    """Validate a card's image, fix its extension, optionally shrink it, and copy it to the output directory.
+
+    The copy is skipped if the output directory already has an identical file, and is linked rather than copied where the filesystem allows.
+
+    Args:
+        image_name (str): The filename of the image the card links to.
+        input_image_directory (Path): The directory containing the images.
+        output_image_directory (Path): The directory to copy the image to.
+        image_resizer (ImageResizer | None, optional): Shrinks the image to its print size and converts formats Typst handles poorly. Defaults to None, which copies the image as it is.
+
+    Returns:
+        str: The filename the card should use, or "" if the image is missing or isn't an image.
+    """
+    if image_name == "":
+        return ""
+    with profiling.stage("images.inspect"):
+        # Find the image file the card links to and check if it's in the input directory.
+        image_file = Path(f"{input_image_directory}/{image_name}")
+        # If it isn't, set the card's image to "" so that the Typst template doesn't try to use a file that doesn't exist.
+        if not image_file.exists():
+            return ""
+        if not image.is_image(image_file):
+            return ""
+        # If it is, check whether its extension matches its MIME type.
+        if not image.does_extension_match(image_file):
+            # If it doesn't, give the output the correct extension, leaving the input as it is.
+            image_name = image.get_matching_name(image_file)
+    if image_resizer is not None:
+        with profiling.stage("images.resize"):
+            image_file, image_name = image_resizer.prepare(image_file, image_name)
+    with profiling.stage("images.copy"):
+        # Copy the image to the output directory, unless an identical copy is already there.
+        store_image(image_file, output_image_directory / image_name)
+    return image_name
+
+
+def write_decks(
+    cards: Iterable[tuple[str, dict]],
+    output_file_path: Path,
+    input_image_directory: Path,
+    output_image_directory: Path,
+    router: decks.DeckRouter | None = None,
+    image_resizer: ImageResizer | None = None,
+    io_executor: Executor | None = None,
+    io_concurrency: int = 1,
+    image_names: dict[tuple[Path, str], Callable[[], str]] | None = None,
+    read_tags: Callable[[str], List[str]] = decks.read_card_tags,
+) -> Iterator[tuple[Path, dict]]:
+    """Send each card to its deck, check and copy its image, and write it to its deck's Typst YAML file as soon as it arrives.
+
+    Each deck's file is opened when its first card arrives and closed when `cards` runs out, so no deck is held in memory.
+
+    Args:
+        cards (Iterable[tuple[str, dict]]): Each markdown file path with its card as a dict. Each image filename is replaced with the one the card should use.
+        output_file_path (Path): The path to the output YAML file. Decks other than the default deck are written next to it.
+        input_image_directory (Path): The directory containing the images.
+        output_image_directory (Path): The output directory for the images. Decks other than the default deck copy their images to a folder in it.
+        router (decks.DeckRouter | None, optional): Chooses each card's deck. Defaults to None, which writes every card to the default deck.
+        image_resizer (ImageResizer | None, optional): Shrinks the images before they are copied. Defaults to None, which copies them as they are.
+        io_executor (Executor | None, optional): A thread pool to read tags and check and copy images on, for the next few cards while each card is written. Defaults to None, which does them one card at a time.
+        io_concurrency (int, optional): The number of threads in `io_executor`. Defaults to 1.
+        image_names (dict[tuple[Path, str], Callable[[], str]] | None, optional): For each output image directory and image, a callable that returns the filename the image resolved to when it was copied there. Only images missing from it are checked and copied, and it is updated with them. Defaults to None, which starts with none.
+        read_tags (Callable[[str], List[str]], optional): Reads the tags of a markdown file. Defaults to reading its frontmatter.
+
+    Yields:
+        tuple[Path, dict]: The path to the deck's YAML file and each card, after the card is written.
+    """
+    if image_names is None:
+        image_names = {}
+    ahead = 0 if io_executor is None else NOTES_AHEAD_PER_WORKER * io_concurrency
+
+    def start(function: Callable[..., R], *args: Any) -> Callable[[], R]:
+        # Start a call on the I/O pool, or put it off until its result is first needed.
+        if io_executor is None:
+            return cache(partial(function, *args))
+        return io_executor.submit(function, *args).result
+
+    def start_image(
+        file: str, card: dict, get_tags: Callable[[], List[str]] | None
+    ) -> tuple[Path, dict, Callable[[], str]]:
+        # Choose the card's deck, in order, and start on its image.
+        deck_name = (
+            decks.DEFAULT_DECK
+            if router is None or get_tags is None
+            else router.route(get_tags())
+        )
+        deck_file_path, deck_image_directory = decks.get_deck_paths(
+            deck_name, output_file_path, output_image_directory
+        )
+        key = (deck_image_directory, card["image"])
+        if key not in image_names:
+            if deck_name != decks.DEFAULT_DECK:
+                deck_image_directory.mkdir(parents=True, exist_ok=True)
+            image_names[key] = start(
+                process_card_image,
+                card["image"],
+                input_image_directory,
+                deck_image_directory,
+                image_resizer,
+            )
+        return deck_file_path, card, image_names[key]
+
+    tagged_cards = run_ahead(
+        (
+            (file, card, None if router is None else start(read_tags, file))
+            for file, card in cards
+        ),
+        ahead,
+    )
+    started_cards = run_ahead((start_image(*item) for item in tagged_cards), ahead)
+    with ExitStack() as stack:
+        writers: dict[Path, typst.CardWriter] = {}
+        if router is None:
+            # The default deck is written even if there are no cards.
+            file = stack.enter_context(open(output_file_path, "w"))
+            writers[output_file_path] = stack.enter_context(typst.CardWriter(file))
+        for deck_file_path, card, get_image_name in started_cards:
+            card["image"] = get_image_name()
+            if deck_file_path not in writers:
+                file = stack.enter_context(open(deck_file_path, "w"))
+                writers[deck_file_path] = stack.enter_context(typst.CardWriter(file))
+            with profiling.stage("yaml_dump"):
+                writers[deck_file_path].write(card)
+            yield deck_file_path, card
+
+
+def new_deck_router(params: argparse.Namespace) -> decks.DeckRouter | None:
+    """Create the deck router selected by the command line arguments.
+
+    Args:
+        params (argparse.Namespace): The command line arguments.
+
+    Returns:
+        decks.DeckRouter | None: The router, or None if every card goes to the default deck.
+    """
+    if not (
+        params.deck or params.split_by_type or params.max_cards_per_deck is not None
+    ):
+        return None
+    return decks.DeckRouter(
+        params.deck, params.split_by_type, params.max_cards_per_deck
+    )
+
+
+def watch_vault(params: argparse.Namespace, manifest: BuildManifest | None) -> None:
+    """Keep the parsed cards in memory and rewrite the output whenever the input changes.
+
+    Only the markdown files that changed are parsed again, and only the images that changed are checked and copied again.
+
+    Args:
+        params (argparse.Namespace): The command line arguments.
+        manifest (BuildManifest | None): A build manifest to use for the first build and to keep up to date.
+    """
+    md_files = list(find_md_files(params))
+    card_files = list(filter(rpg_pages.is_card_file, md_files))
+    link_targets: dict[str, links.LinkTarget] = {}
+    link_index = build_link_index(card_files, manifest, link_targets)
+    # The title each card's links resolved to, so that a changed note only reparses the cards that link to it.
+    links_by_file: dict[str, links.ResolvedLinks | None] = {}
+    cards_by_file = parse_md_files_by_path(
+        card_files, params.jobs, manifest, link_index, links_by_file
+    )
+    # For each output image directory and image, the filename the image resolved to after it was checked and copied.
+    image_names: dict[tuple[Path, str], Callable[[], str]] = {}
+    tags_by_file: dict[str, List[str]] = {}
+    image_resizer = new_image_resizer(params)
+
+    def read_tags(file: str) -> List[str]:
+        if file not in tags_by_file:
+            tags_by_file[file] = decks.read_card_tags(file)
+        return tags_by_file[file]
+
+    def write_output() -> List[Path]:
+        router = new_deck_router(params)
+        output_files = {} if router is not None else {params.output_file_path: None}
+        # Copy the cached cards, so that resolving their images doesn't change them.
+        cards = (
+            (file, dict(cards_by_file[file]))
+            for file in md_files
+            if file in cards_by_file
+        )
+        for output_file_path, _ in write_decks(
+            cards,
+            params.output_file_path,
+            params.input_image_directory,
+            params.output_image_directory,
+            router,
+            image_resizer,
+            image_names=image_names,
+            read_tags=read_tags,
+        ):
+            output_files[output_file_path] = None
+        if manifest is not None:
+            manifest.save()
+        return list(output_files)
+
+    output_files = write_output()
+    print(
+        f"Successfully wrote {', '.join(map(str, output_files))}. Watching for changes..."
+    )
+    watcher = watch.new_watcher(
+        [params.input_markdown_directory, params.input_image_directory],
+        params.exclude,
+    )
+    try:
+        while True:
+            changed = watcher.wait()
+            start = time.perf_counter()
+            md_files = list(find_md_files(params))
+            touched_files = {file for file in md_files if Path(file) in changed}
+            removed_files = cards_by_file.keys() - set(md_files)
+            touched_images = {
+                path.name
+                for path in changed
+                if path.parent == params.input_image_directory
+                and path.name in {image_name for _, image_name in image_names}
+            }
+            if not touched_files and not removed_files and not touched_images:
+                continue
+            for file in removed_files:
+                del cards_by_file[file]
+                links_by_file.pop(file, None)
+            for file in touched_files:
+                cards_by_file.pop(file, None)
+                links_by_file.pop(file, None)
+                link_targets.pop(file, None)
+                tags_by_file.pop(file, None)
+            previous_card_files = set(card_files)
+            card_files = [
+                file
+                for file in md_files
+                if (
+                    rpg_pages.is_card_file(file)
+                    if file in touched_files
+                    else file in previous_card_files
+                )
+            ]
+            link_index = build_link_index(card_files, manifest, link_targets)
+            # A renamed or retitled note can change how other cards' links resolve, so the cards whose links now resolve differently are parsed again.
+            files_to_parse = [
+                file
+                for file in card_files
+                if file in touched_files
+                or (
+                    file in cards_by_file
+                    and not link_index.resolves_to(links_by_file.get(file) or {})
+                )
+            ]
+            cards_by_file.update(
+                parse_md_files_by_path(
+                    files_to_parse, 1, manifest, link_index, links_by_file
+                )
+            )
+            for key in [key for key in image_names if key[1] in touched_images]:
+                del image_names[key]
+            output_files = write_output()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(
+                f"Rewrote {', '.join(map(str, output_files))} in {elapsed_ms:.0f} ms."
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def new_image_resizer(params: argparse.Namespace) -> ImageResizer | None:
+    """Create the image resizer selected by the command line arguments.
+
+    Args:
+        params (argparse.Namespace): The command line arguments.
+
+    Returns:
+        ImageResizer | None: The resizer, or None if the images are copied as they are.
+    """
+    if params.image_max_size is None:
+        return None
+    return ImageResizer(params.image_cache_directory, params.image_max_size)
+
+
+def find_md_files(params: argparse.Namespace) -> Iterable[str]:
+    """Find the markdown files selected by the command line arguments.
+
+    Args:
+        params (argparse.Namespace): The command line arguments.
+
+    Returns:
+        Iterable[str]: The markdown file paths, yielded as they are found.
+    """
+    return files.find_files(
+        params.input_markdown_directory,
+        include=params.include,
+        exclude=params.exclude,
+        recursive=not params.no_recursive,
+    )
+
+
+def positive_int(value: str) -> int:
+    """Parse a command line value that must be a whole number of at least 1.
+
+    Args:
+        value (str): The value.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value isn't a whole number of at least 1.
+
+    Returns:
+        int: The number.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' isn't a whole number.")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be 1 or more, but was {number}.")
+    return number
 
 
 def parse_args():
@@ -79,54 +940,293 @@ def parse_args():
         type=Path,
         default=".",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--deck",
+        help="A rule that sends cards to their own deck, written as NAME=type:TYPE or NAME=tag:TAG, such as 'items=type:item' or 'villains=tag:npc/villain'. The deck is written to the output file with '-NAME' added to its name, with its images in the NAME folder of the output image directory. Can be repeated, and each card goes to the first deck it matches.",
+        metavar="deck",
+        type=decks.parse_deck_rule,
+        action="append",
+    )
+    parser.add_argument(
+        "--split-by-type",
+        help="Send the cards that match no --deck rule to a deck for each page type, such as 'character'.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max-cards-per-deck",
+        help="Split each deck into numbered parts of at most this many cards, such as 'items-1' and 'items-2'.",
+        metavar="max_cards_per_deck",
+        type=positive_int,
+        default=None,
+    )
+    parser.add_argument(
+        "--image-max-size",
+        help="Shrink each card image so that its longest side is at most this many pixels, and convert formats other than PNG and JPEG. 600 pixels fills a 5 cm wide card at 300 DPI. Needs Pillow.",
+        metavar="image_max_size",
+        type=positive_int,
+        default=None,
+    )
+    parser.add_argument(
+        "--image-cache-directory",
+        help="The directory to keep the shrunk images in between runs, used with --image-max-size.",
+        metavar="image_cache_directory",
+        type=Path,
+        default=".image-cache",
+    )
+    parser.add_argument(
+        "--jobs",
+        help="The number of processes used to parse the markdown files. Use 0 for one per CPU core.",
+        metavar="jobs",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--io-concurrency",
+        help="The number of files to read, check or copy at once. Values above 1 overlap the waits when the vault is on a network mount.",
+        metavar="io_concurrency",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--manifest-file",
+        help="The path to a build manifest. Markdown files that haven't changed since the last run reuse their cached cards.",
+        metavar="manifest_file",
+        type=Path,
+        default=None,
+    )
+    parser.add_argument(
+        "--query",
+        help="Only write the cards of the notes that match a query, read from the vault index, such as 'type=item and rarity=rare' or 'tag:character/npc/*'. Terms are type=TYPE, tag:TAG or KEY=VALUE for a frontmatter or Dataview field, combined with and, or, not and parentheses. * matches any characters.",
+        metavar="query",
+        default=None,
+    )
+    parser.add_argument(
+        "--index-file",
+        help="The path to the vault index used by --query. Notes that haven't changed since they were indexed aren't parsed again.",
+        metavar="index_file",
+        type=Path,
+        default=".vault-index.sqlite",
+    )
+    parser.add_argument(
+        "--watch",
+        help="Keep running and rewrite the output whenever a markdown file or image changes.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--validate",
+        help="Validate the whole deck against the rpg-cards-typst-templates schema and exit with an error if any card is invalid.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--schema-file",
+        help="The path to the schema used by --validate.",
+        metavar="schema_file",
+        type=Path,
+        default=typst.SCHEMA_FILE,
+    )
+    parser.add_argument(
+        "--include",
+        help="A glob pattern for the markdown files to convert, matched against the file name or its path relative to the input directory. Can be repeated. Defaults to '*.md'.",
+        metavar="include",
+        action="append",
+    )
+    parser.add_argument(
+        "--exclude",
+        help=f"A glob pattern for the files and folders to skip, added to the default patterns {files.DEFAULT_EXCLUDES}. Can be repeated.",
+        metavar="exclude",
+        action="append",
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        help="Don't skip the folders matched by the default --exclude patterns, such as .obsidian and templates.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-recursive",
+        help="Only look for markdown files at the top level of the input directory.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Print the time taken and number of calls for each stage of the build, the cards per second and the slowest notes. The notes are parsed in a single process so that every stage is measured.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        help="Trace memory allocations with tracemalloc and print the peak, to check that memory use stays flat as the vault grows. Slows the build down.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-top",
+        help="The number of slowest notes to report with --profile.",
+        metavar="profile_top",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--profile-report",
+        help="The path to write the --profile report to as JSON. Implies --profile.",
+        metavar="profile_report",
+        type=Path,
+        default=None,
+    )
+    parser.add_argument(
+        "--profile-pstats",
+        help="The path to write a cProfile dump of the build to, for use with pstats or snakeviz. Implies --profile.",
+        metavar="profile_pstats",
+        type=Path,
+        default=None,
+    )
+    params = parser.parse_args()
+    if params.jobs < 0:
+        raise SystemExit(
+            f"🔴 --jobs must be 0 or more, but was {params.jobs}. Use 0 for one per CPU core."
+        )
+    params.include = params.include or ["*.md"]
+    params.deck = params.deck or []
+    params.exclude = ([] if params.no_default_excludes else files.DEFAULT_EXCLUDES) + (
+        params.exclude or []
+    )
+    params.profile = bool(
+        params.profile or params.profile_report or params.profile_pstats
+    )
+    return params
 
 
 if __name__ == "__main__":
     params = parse_args()
-
-    # Get all markdown files in the input directory
-    md_files = get_files_with_extension(params.input_markdown_directory, ".md")
-    typst_cards: dict[str, list[dict]] = {"cards": []}
-    for file in md_files:
+    if params.validate:
+        # Load the schema up front so that a missing schema fails before the build starts.
+        typst.get_validator(params.schema_file)
+    if params.query is not None:
+        # Check the query up front so that a typo fails before the build starts.
         try:
-            page_typst = parse_md_to_typst_card(file)
-            typst_cards["cards"].append(asdict(page_typst))
-        except KeyError as identifier:
-            print(f"🔴 '{file}' KeyError: {identifier}")
-            pass
-        except ValueError as identifier:
-            print(f"🔴 '{file}' ValueError: {identifier}")
-            pass
-        except AttributeError as identifier:
-            print(f"🔴 '{file}' AttributeError: {identifier}")
-            pass
-    if typst_cards["cards"].count == 0:
-        raise ValueError("No cards were generated.")
+            compile_query(params.query)
+        except ValueError as error:
+            raise SystemExit(f"🔴 {error}")
+        if params.watch:
+            print("Watching rebuilds every card, so --query is ignored.")
+            params.query = None
+        elif params.manifest_file is not None:
+            print(
+                "Queries read the cards from the vault index, so --manifest-file is ignored."
+            )
+            params.manifest_file = None
+    manifest = BuildManifest(params.manifest_file) if params.manifest_file else None
+    # Create the resizer up front so that a missing Pillow fails before the build starts.
+    image_resizer = new_image_resizer(params)
+    if params.watch:
+        watch_vault(params, manifest)
+        raise SystemExit(0)
 
-    # Iterate through each card to validate and convert its image.
-    for card in typst_cards["cards"]:
-        if card["image"] == "":
-            continue
-        # Find the image file the card links to and check if it's in the input directory.
-        image_file = Path(f"{params.input_image_directory}/{card['image']}")
-        # If it isn't, set the card's image to "" so that the Typst template doesn't try to use a file that doesn't exist.
-        if not image_file.exists():
-            card["image"] = ""
-            continue
-        if not image.is_image(image_file):
-            card["image"] = ""
-            continue
-        # If it is, check whether its extension matches its MIME type.
-        if not image.does_extension_match(image_file):
-            # If it doesn't, convert the image to the correct format.
-            new_file: Path = image.new_file_from_mimetype(image_file)
-            card["image"] = new_file.name
-        # Copy the image to the output directory.
-        dest_file: Path = params.output_image_directory / card["image"]
-        copy(image_file, dest_file)
-
-    # Write the Typst YAML to a file
-    with open(params.output_file_path, "w") as file:
-        yaml.dump(data=typst_cards, stream=file, Dumper=yaml.SafeDumper)
-    print(f"Successfully wrote {params.output_file_path}.")
+    if params.trace_memory:
+        tracemalloc.start()
+    profiler = profiling.start_profiling() if params.profile else None
+    cprofiler = cProfile.Profile() if params.profile_pstats else None
+    if cprofiler is not None:
+        cprofiler.enable()
+    if profiler is not None and params.jobs != 1:
+        print("Profiling parses the notes in a single process, so --jobs is ignored.")
+        params.jobs = 1
+    if profiler is not None and params.io_concurrency != 1:
+        print("Profiling reads one file at a time, so --io-concurrency is ignored.")
+        params.io_concurrency = 1
+    io_executor = (
+        ThreadPoolExecutor(max_workers=params.io_concurrency)
+        if params.io_concurrency > 1
+        else None
+    )
+
+    # Find the markdown files in the input directory.
+    # Notes whose frontmatter tags show they will never be cards are skipped without reading the rest of the file.
+    with profiling.stage("discovery"):
+        md_files = find_card_files(find_md_files(params), io_executor)
+    # Index every card's title and aliases up front, so links between cards resolve without searching the vault again.
+    with profiling.stage("link_index"):
+        link_index = build_link_index(md_files, manifest, io_executor=io_executor)
+    # Each card is parsed, sent to its deck, has its image checked and copied, and is written, before it leaves memory.
+    # Only the cards a few notes ahead of the one being written are held at once, however large the vault.
+    vault_index = None
+    if params.query is not None:
+        # Only the notes that changed since the last run are parsed. The rest of the deck comes from the index.
+        vault_index = VaultIndex(params.index_file)
+        with profiling.stage("vault_index"):
+            parsed_count = refresh_index(vault_index, md_files, params.jobs, link_index)
+        print(f"Parsed {parsed_count} new or changed notes into {params.index_file}.")
+        cards = stream_indexed_cards(vault_index, md_files, params.query)
+    else:
+        cards = stream_cards(
+            md_files,
+            params.jobs,
+            manifest,
+            link_index,
+            io_executor,
+            params.io_concurrency,
+        )
+    router = new_deck_router(params)
+    # The number of cards written to each output file.
+    output_files = {} if router is not None else {params.output_file_path: 0}
+    card_count = 0
+    errors: List[typst.CardValidationError] = []
+    for output_file_path, card in write_decks(
+        cards,
+        params.output_file_path,
+        params.input_image_directory,
+        params.output_image_directory,
+        router,
+        image_resizer,
+        io_executor,
+        params.io_concurrency,
+    ):
+        output_files[output_file_path] = output_files.get(output_file_path, 0) + 1
+        if params.validate:
+            errors.extend(typst.validate_card(card, card_count, params.schema_file))
+        card_count += 1
+    # Each output file is a data file of its own, so the constraints on the deck as a whole are checked once per file.
+    deck_errors: List[tuple[Path, typst.CardValidationError]] = []
+    if params.validate:
+        deck_errors = [
+            (output_file_path, error)
+            for output_file_path, deck_size in output_files.items()
+            for error in typst.validate_deck(deck_size, params.schema_file)
+        ]
+    if io_executor is not None:
+        io_executor.shutdown()
+    if manifest is not None:
+        manifest.save()
+    if vault_index is not None:
+        vault_index.close()
+        print(f"{card_count} cards matched '{params.query}'.")
+    for output_file_path in output_files:
+        print(f"Successfully wrote {output_file_path}.")
+    if params.trace_memory:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"Peak traced memory: {peak_memory / 2**20:.2f} MiB for {card_count} cards."
+        )
+
+    if cprofiler is not None:
+        cprofiler.disable()
+        cprofiler.dump_stats(params.profile_pstats)
+        print(f"Successfully wrote {params.profile_pstats}.")
+    if profiler is not None:
+        profiling.stop_profiling()
+        report = profiler.report(card_count, params.profile_top)
+        if params.trace_memory:
+            report["peak_memory_bytes"] = peak_memory
+        for line in profiling.format_report(report):
+            print(line)
+        if params.profile_report is not None:
+            with open(params.profile_report, "w") as file:
+                json.dump(report, file, indent=2)
+            print(f"Successfully wrote {params.profile_report}.")
+
+    if params.validate:
+        for error in errors:
+            print(f"🔴 '{error.card_name}' {error.path}: {error.message}")
+        for output_file_path, error in deck_errors:
+            print(f"🔴 {output_file_path} /{error.path}: {error.message}")
+        if errors or deck_errors:
+            raise SystemExit(f"{len(errors) + len(deck_errors)} schema errors found.")
+        print("All cards match the schema.")
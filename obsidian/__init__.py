@@ -1,4 +1,13 @@
-from . import rpg_pages
+from . import decks, rpg_pages
+from .links import LinkIndex, LinkRecorder, LinkTarget, build_link_index
 from .parser import MarkdownData
 
-__all__ = ["MarkdownData", "rpg_pages"]
+__all__ = [
+    "LinkIndex",
+    "LinkRecorder",
+    "LinkTarget",
+    "MarkdownData",
+    "build_link_index",
+    "decks",
+    "rpg_pages",
+]
@@ -0,0 +1,173 @@
+"""
+Routes cards into decks by page type, tag or size, so that each deck can be written and compiled on its own.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List
+
+from obsidian.parser import read_frontmatter
+from obsidian.rpg_pages import PageTypes, get_page_type_name, get_page_type_names
+
+# The name of the deck that cards go to when no rule matches them. Its output isn't renamed.
+DEFAULT_DECK = ""
+
+
+@dataclass(frozen=True)
+class DeckRule:
+    """
+    Sends the cards of a page type, or with a tag, to a named deck.
+
+    The page type is named as by `get_page_type_name`, so it can be a registered type such as `spell`. A `PageTypes` member works too.
+    A tag also matches the tags nested under it, so `npc` matches `npc/villain`.
+    """
+
+    name: str
+    page_type: PageTypes | str | None = None
+    tag: str | None = None
+
+    def matches(self, page_type: str, tags: List[str]) -> bool:
+        """Check whether a card belongs in this deck.
+
+        Args:
+            page_type (str): The name of the type of the card's page.
+            tags (List[str]): The page's tags, as written in its frontmatter.
+
+        Returns:
+            bool: True if the card matches the rule.
+        """
+        if self.page_type is not None and page_type != self.page_type:
+            return False
+        if self.tag is not None:
+            return any(
+                tag == self.tag or tag.startswith(f"{self.tag}/") for tag in tags
+            )
+        return True
+
+
+def parse_deck_rule(rule: str) -> DeckRule:
+    """Parse a deck rule written as `NAME=type:TYPE` or `NAME=tag:TAG`, such as `villains=tag:npc/villain`.
+
+    Args:
+        rule (str): The rule.
+
+    Raises:
+        ValueError: If the rule is malformed or names a page type that hasn't been registered.
+
+    Returns:
+        DeckRule: The rule.
+    """
+    name, separator, selector = rule.partition("=")
+    kind, _, value = selector.partition(":")
+    if not separator or not name or not value or "/" in name:
+        raise ValueError(
+            f"Deck rule '{rule}' should look like NAME=type:TYPE or NAME=tag:TAG, with no '/' in the name."
+        )
+    if kind == "type":
+        if value not in get_page_type_names():
+            raise ValueError(
+                f"Deck rule '{rule}' names an unknown page type. Use one of {get_page_type_names()}."
+            )
+        return DeckRule(name, page_type=value)
+    if kind == "tag":
+        return DeckRule(name, tag=value)
+    raise ValueError(f"Deck rule '{rule}' should select cards by 'type' or 'tag'.")
+
+
+def read_card_tags(filepath: str) -> List[str]:
+    """Read the tags of a note, without reading the rest of the file.
+
+    Args:
+        filepath (str): The path to the markdown file.
+
+    Returns:
+        List[str]: The tags, as written in the frontmatter. Empty if they can't be read.
+    """
+    tags = (read_frontmatter(filepath) or {}).get("tags")
+    if not isinstance(tags, list):
+        return []
+    return [tag for tag in tags if isinstance(tag, str)]
+
+
+def get_deck_name(
+    tags: List[str], rules: Iterable[DeckRule] = (), split_by_type: bool = False
+) -> str:
+    """Choose the deck a card goes to.
+
+    Args:
+        tags (List[str]): The tags of the card's page.
+        rules (Iterable[DeckRule], optional): The rules, tried in order. Defaults to none.
+        split_by_type (bool, optional): Whether cards that match no rule go to a deck named after their page type. Defaults to False.
+
+    Returns:
+        str: The name of the deck, which is `DEFAULT_DECK` if the card matches no rule and isn't split by type.
+    """
+    page_type = get_page_type_name([tag.split("/")[0] for tag in tags])
+    for rule in rules:
+        if rule.matches(page_type, tags):
+            return rule.name
+    if split_by_type:
+        return page_type
+    return DEFAULT_DECK
+
+
+class DeckRouter:
+    """
+    Chooses the deck for each card as the cards arrive, so that a deck can be written without holding all its cards.
+
+    With `max_cards`, every deck is split into parts numbered from 1, such as `items-1` and `items-2`, since the router can't know how many cards a deck will get.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[DeckRule] = (),
+        split_by_type: bool = False,
+        max_cards: int | None = None,
+    ):
+        if max_cards is not None and max_cards < 1:
+            raise ValueError("A deck must be able to hold at least 1 card.")
+        self.rules = list(rules)
+        self.split_by_type = split_by_type
+        self.max_cards = max_cards
+        # The number of cards sent to each deck so far, used to number its parts.
+        self.__counts: dict[str, int] = {}
+
+    def route(self, tags: List[str]) -> str:
+        """Choose the deck for the next card.
+
+        Args:
+            tags (List[str]): The tags of the card's page.
+
+        Returns:
+            str: The name of the deck, including its part number.
+        """
+        deck_name = get_deck_name(tags, self.rules, self.split_by_type)
+        if self.max_cards is None:
+            return deck_name
+        count = self.__counts.get(deck_name, 0)
+        self.__counts[deck_name] = count + 1
+        part = str(count // self.max_cards + 1)
+        return "-".join(filter(None, (deck_name, part)))
+
+
+def get_deck_paths(
+    deck_name: str, output_file_path: Path, output_image_directory: Path
+) -> tuple[Path, Path]:
+    """Get where a deck's data file and images are written.
+
+    Args:
+        deck_name (str): The name of the deck.
+        output_file_path (Path): The path to the output YAML file when there is only one deck.
+        output_image_directory (Path): The output directory for the images when there is only one deck.
+
+    Returns:
+        tuple[Path, Path]: The path to the deck's YAML file, such as `data-items.yaml`, and its image directory, such as `images/items`. The default deck keeps the paths as they are.
+    """
+    if deck_name == DEFAULT_DECK:
+        return output_file_path, output_image_directory
+    return (
+        output_file_path.with_name(
+            f"{output_file_path.stem}-{deck_name}{output_file_path.suffix}"
+        ),
+        output_image_directory / deck_name,
+    )
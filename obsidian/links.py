@@ -0,0 +1,190 @@
+"""
+An index of the notes in a vault, used to resolve wikilinks to the notes they point to.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Protocol
+
+from obsidian.parser import read_frontmatter, read_title
+from utils.string import replace_uncommon_characters
+
+# The title of the note each of a card's links resolved to, or None if it didn't resolve, keyed by the normalized link.
+ResolvedLinks = dict[str, str | None]
+
+
+def normalize_link(link: str) -> str:
+    """Reduce a wikilink to the form used as a key in the link index.
+
+    Obsidian matches links without regard to case, and a link can include brackets, alt text, a folder path, an extension or a heading.
+
+    Args:
+        link (str): The link, such as `[[Places/Waterdeep.md#Docks|the city]]` or `Waterdeep`.
+
+    Returns:
+        str: The normalized name of the note, such as `waterdeep`.
+    """
+    link = link.strip()
+    if link.startswith("[[") and link.endswith("]]"):
+        link = link[2:-2]
+    link = link.split("|", 1)[0].split("#", 1)[0].split("^", 1)[0]
+    link = link.rsplit("/", 1)[-1].strip()
+    if link.lower().endswith(".md"):
+        link = link[:-3]
+    return link.casefold()
+
+
+def get_aliases(frontmatter: dict) -> List[str]:
+    """Get the aliases of a note from its frontmatter.
+
+    Args:
+        frontmatter (dict): The note's frontmatter.
+
+    Returns:
+        List[str]: The aliases, which can be given as either a list or a single string.
+    """
+    aliases = frontmatter.get("aliases", frontmatter.get("alias"))
+    if isinstance(aliases, str):
+        return [aliases]
+    if isinstance(aliases, list):
+        return [str(alias) for alias in aliases if alias is not None]
+    return []
+
+
+@dataclass
+class LinkTarget:
+    """
+    A note that wikilinks can point to.
+    """
+
+    path: str
+    title: str
+    aliases: List[str] = field(default_factory=list)
+
+
+def read_link_target(filepath: str) -> LinkTarget:
+    """Read the title and aliases of a note, without parsing the whole file.
+
+    Args:
+        filepath (str): The path to the markdown file.
+
+    Returns:
+        LinkTarget: The note. Its title is the first level 1 heading, the same as the name of its card, or the filename if it has no such heading.
+    """
+    frontmatter = read_frontmatter(filepath) or {}
+    title = read_title(filepath)
+    if title is None:
+        title = Path(filepath).stem
+    return LinkTarget(
+        path=filepath,
+        title=replace_uncommon_characters(title),
+        aliases=get_aliases(frontmatter),
+    )
+
+
+class LinkResolver(Protocol):
+    """
+    Finds the note a link points to, like `LinkIndex.resolve`.
+    """
+
+    def resolve(self, link: str) -> LinkTarget | None: ...
+
+
+class LinkIndex:
+    """
+    Maps the filename, title and aliases of each note to the note, so links can be resolved in constant time.
+
+    Like Obsidian, a filename takes precedence over a title, and a title takes precedence over an alias.
+    When two notes share a name, the first one added wins.
+    """
+
+    def __init__(self, targets: Iterable[LinkTarget] = ()):
+        self.__by_filename: dict[str, LinkTarget] = {}
+        self.__by_title: dict[str, LinkTarget] = {}
+        self.__by_alias: dict[str, LinkTarget] = {}
+        self.__targets: dict[str, LinkTarget] = {}
+        for target in targets:
+            self.add(target)
+
+    def add(self, target: LinkTarget) -> None:
+        """Add a note to the index.
+
+        Args:
+            target (LinkTarget): The note.
+        """
+        self.__targets.setdefault(target.path, target)
+        self.__by_filename.setdefault(normalize_link(Path(target.path).stem), target)
+        self.__by_title.setdefault(normalize_link(target.title), target)
+        for alias in target.aliases:
+            self.__by_alias.setdefault(normalize_link(alias), target)
+
+    def resolve(self, link: str) -> LinkTarget | None:
+        """Find the note a link points to.
+
+        Args:
+            link (str): The link, with or without its brackets.
+
+        Returns:
+            LinkTarget | None: The note, or None if no note in the index matches.
+        """
+        key = normalize_link(link)
+        return (
+            self.__by_filename.get(key)
+            or self.__by_title.get(key)
+            or self.__by_alias.get(key)
+        )
+
+    def resolves_to(self, resolved: ResolvedLinks) -> bool:
+        """Check whether links still resolve to the same notes' titles, which are what cards show.
+
+        Args:
+            resolved (ResolvedLinks): The title each link resolved to, as recorded by a `LinkRecorder`.
+
+        Returns:
+            bool: True if every link resolves as it did before.
+        """
+        for link, title in resolved.items():
+            target = self.resolve(link)
+            if (None if target is None else target.title) != title:
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self.__targets)
+
+
+class LinkRecorder:
+    """
+    Resolves links with a link index, recording the title each link resolved to.
+
+    A card only depends on the notes its links resolved to, so it stays current while `LinkIndex.resolves_to` holds for its recorded links, whatever else changes in the vault.
+    """
+
+    def __init__(self, link_index: LinkIndex):
+        self.link_index = link_index
+        self.resolved: ResolvedLinks = {}
+
+    def resolve(self, link: str) -> LinkTarget | None:
+        """Find the note a link points to, and record it.
+
+        Args:
+            link (str): The link, with or without its brackets.
+
+        Returns:
+            LinkTarget | None: The note, or None if no note in the index matches.
+        """
+        target = self.link_index.resolve(link)
+        self.resolved[normalize_link(link)] = None if target is None else target.title
+        return target
+
+
+def build_link_index(filepaths: Iterable[str]) -> LinkIndex:
+    """Index the notes in a vault.
+
+    Args:
+        filepaths (Iterable[str]): The paths to the markdown files.
+
+    Returns:
+        LinkIndex: The index of the notes.
+    """
+    return LinkIndex(read_link_target(filepath) for filepath in filepaths)
@@ -1,13 +1,146 @@
-import json
 import re
-from dataclasses import dataclass, field
-from typing import Dict, List
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Tuple
 
 import frontmatter as fm
-import markdown_to_json
+import yaml
+from frontmatter.default_handlers import YAMLHandler
 
+import utils.profiling as profiling
+from obsidian.sections import parse_sections
 from utils.string import remove_wikilinks, simplify_text
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# The same delimiter that the frontmatter library uses for YAML frontmatter.
+FRONTMATTER_BOUNDARY: re.Pattern[str] = re.compile(r"^-{3,}\s*$")
+# Splits the YAML frontmatter from the body the same way `fm.parse` does.
+YAML_HANDLER = YAMLHandler()
+# A level 1 ATX heading, without its optional closing hashes.
+TITLE_PATTERN: re.Pattern[str] = re.compile(r"^ {0,3}# +(?P<title>.*?)(?: +#+)?\s*$")
+# An inline Dataview field written as `(key:: value)`, `[key:: value]` or `- key:: value`.
+DATAVIEW_FIELD_PATTERN: re.Pattern[str] = re.compile(
+    r"(?:[(\[]|^- )(?P<dvKey>[\w ]+):: (?:\[{0,2})(?:\w*\|)?(?P<dvValue>[^\[\]]*?)(?:[)\]]|$|\n)"
+)
+
+
+def read_frontmatter(filepath: str) -> Dict[str, str] | None:
+    """
+    Read only the frontmatter block at the start of a markdown file, without reading the rest of the file.
+
+    Args:
+
+        - `filepath (str)`: The path to the markdown file.
+
+    Returns:
+
+        - The key-value pairs from the frontmatter. Empty if the file has no frontmatter.
+        - `None` if the frontmatter isn't closed or can't be parsed, in which case only a full parse can tell what the file contains.
+    """
+    with open(filepath, "r") as file:
+        # Leading blank lines are ignored, as they are by the frontmatter library.
+        for line in file:
+            if line.strip():
+                break
+        else:
+            return {}
+        if not FRONTMATTER_BOUNDARY.match(line):
+            return {}
+        frontmatter_lines: List[str] = []
+        for line in file:
+            if FRONTMATTER_BOUNDARY.match(line):
+                break
+            frontmatter_lines.append(line)
+        else:
+            return None
+    try:
+        frontmatter = yaml.load("".join(frontmatter_lines), Loader=SafeLoader)
+    except yaml.YAMLError:
+        return None
+    if frontmatter is None:
+        return {}
+    if not isinstance(frontmatter, dict):
+        return None
+    return frontmatter
+
+
+def read_title(filepath: str) -> str | None:
+    """
+    Read the first level 1 heading of a markdown file, stopping as soon as it is found.
+
+    Args:
+
+        - `filepath (str)`: The path to the markdown file.
+
+    Returns:
+
+        - The text of the heading, with wikilinks replaced by their text.
+        - `None` if the file has no level 1 heading.
+    """
+    with open(filepath, "r") as file:
+        for line in file:
+            if line.strip():
+                break
+        else:
+            return None
+        if FRONTMATTER_BOUNDARY.match(line):
+            # Skip the frontmatter, since its YAML comments look like headings.
+            for line in file:
+                if FRONTMATTER_BOUNDARY.match(line):
+                    break
+            else:
+                return None
+        else:
+            match = TITLE_PATTERN.match(line)
+            if match:
+                return remove_wikilinks(match.group("title"))
+        for line in file:
+            match = TITLE_PATTERN.match(line)
+            if match:
+                return remove_wikilinks(match.group("title"))
+    return None
+
+
+@dataclass(slots=True)
+class ScannedText:
+    """
+    The parts of a note found by `scan_text`.
+    """
+
+    text_without_wikilinks: str
+    dataview_fields: Dict[str, List[str]]
+    images: List[str]
+
+
+def scan_text(text: str) -> ScannedText:
+    """
+    Find the wikilinks, image embeds and inline Dataview fields of a note.
+
+    The links are rewritten and the images collected in one pass over the text.
+    The Dataview fields are then matched in the rewritten text, since their values are often links, as in `[Group Name:: [[The Possums]]]`.
+
+    Args:
+
+        - `text (str)`: Input markdown text.
+
+    Returns:
+
+        - The text with each wikilink replaced by its text, the Dataview fields and the image filenames.
+    """
+    images: List[str] = []
+    text_without_wikilinks = remove_wikilinks(text, images)
+    dataview_fields: Dict[str, List[str]] = {}
+    if "::" in text_without_wikilinks:
+        for match in DATAVIEW_FIELD_PATTERN.finditer(text_without_wikilinks):
+            dv_key = simplify_text(match.group("dvKey"))
+            # Dataview allows a key to be repeated, so every value is kept.
+            dataview_fields.setdefault(dv_key, []).append(match.group("dvValue"))
+    return ScannedText(text_without_wikilinks, dataview_fields, images)
+
 
 @dataclass
 class MarkdownData:
@@ -15,6 +148,9 @@ class MarkdownData:
     Parses text in an Obsidian.md file into a Python object.
     Makes it easier to work with Obsidian files in Python.
 
+    Each field is parsed the first time it is read and then kept, so callers only pay for the fields they use.
+    For example, reading `tags` parses the frontmatter but not the content.
+
     Args:
 
         - `text (str)`: Input markdown text.
@@ -30,41 +166,101 @@ class MarkdownData:
                 - `[key:: value]`
                 - `- key:: value`
         - `images`: A list of all embedded image filenames.
+        - `tags`: The top level of each tag in the frontmatter. Raises `AttributeError` if the frontmatter has no tags.
+        - `full_tags`: Each tag in the frontmatter with all its levels, such as `character/npc/villain`. Raises `AttributeError` if the frontmatter has no tags.
+        - `frontmatter_links`: Each frontmatter value that is a wikilink, by key, as written, such as `Waterdeep|the city`. `frontmatter` has these replaced by their alt text.
     """
 
     text: str
-    frontmatter: Dict[str, str] = field(init=False)
-    content: Dict[str, str | dict] = field(init=False)  # type: ignore
-    dataview_fields: Dict[str, List[str]] = field(init=False)
-    images: List[str] = field(init=False)
-    tags: List[str] = field(init=False)
-
-    def __init__(self, text):
-        text_without_wikilinks = remove_wikilinks(text)
-        self.frontmatter = self.__get_frontmatter(text_without_wikilinks)
-        self.content = self.__get_content(text_without_wikilinks)
-        self.dataview_fields = self.__get_dataview_fields(text_without_wikilinks)
-        self.images = self.__get_images(text)
-        if "tags" in self.frontmatter:
-            tags = self.frontmatter["tags"]
-            self.tags = [tag.split("/")[0] for tag in tags]
-
-    def __get_content(self, text) -> Dict[str, str | dict]:  # type: ignore
-        # Pull the frontmatter into a dict.
-        parsed = fm.parse(text)
-
-        # Pull the rest of the non-frontmatter markdown content.
-        text_markdown = parsed[1]
-
-        # Parse the markdown into a dict.
-        # I convert the markdown to JSON and then back to a dict because this way I get a plain dict instead of an OrderedDict.
-        data_json = markdown_to_json.jsonify(text_markdown)
-        data = json.loads(data_json)
-        return data
-
-    def __get_frontmatter(self, text) -> Dict[str, str]:
-        parsed = fm.parse(text)
-        frontmatter = parsed[0]
+
+    @cached_property
+    def __scanned(self) -> ScannedText:
+        with profiling.stage("markdown_data.scan"):
+            return scan_text(self.text)
+
+    @cached_property
+    def __split(self) -> Tuple[Dict[str, str], str]:
+        """
+        The frontmatter and the markdown body, split once and shared by `frontmatter` and `content`.
+        """
+        text_without_wikilinks = self.__scanned.text_without_wikilinks
+        with profiling.stage("markdown_data.frontmatter"):
+            metadata, text_markdown = fm.parse(text_without_wikilinks)
+            return self.__get_frontmatter(metadata), text_markdown
+
+    @cached_property
+    def frontmatter(self) -> Dict[str, str]:
+        return self.__split[0]
+
+    @cached_property
+    def content(self) -> Dict[str, str | dict]:  # type: ignore
+        text_markdown = self.__split[1]
+        with profiling.stage("markdown_data.content"):
+            return self.__get_content(text_markdown)
+
+    @cached_property
+    def dataview_fields(self) -> Dict[str, List[str]]:
+        return self.__scanned.dataview_fields
+
+    @cached_property
+    def images(self) -> List[str]:
+        return self.__scanned.images
+
+    @cached_property
+    def tags(self) -> List[str]:
+        return [tag.split("/")[0] for tag in self.full_tags]
+
+    @cached_property
+    def full_tags(self) -> List[str]:
+        if "tags" not in self.frontmatter:
+            raise AttributeError("The frontmatter has no tags.")
+        return list(self.frontmatter["tags"])
+
+    @cached_property
+    def frontmatter_links(self) -> Dict[str, str]:
+        # The links are read from the original text, since the frontmatter is parsed after wikilinks are replaced by their alt text.
+        text = self.text.strip()
+        if "[[" not in text or not YAML_HANDLER.detect(text):
+            return {}
+        try:
+            raw_frontmatter, _ = YAML_HANDLER.split(text)
+        except ValueError:
+            return {}
+        if "[[" not in raw_frontmatter:
+            return {}
+        with profiling.stage("markdown_data.frontmatter_links"):
+            try:
+                metadata = yaml.load(raw_frontmatter, Loader=SafeLoader)
+            except yaml.YAMLError:
+                return {}
+        if not isinstance(metadata, dict):
+            return {}
+        links: Dict[str, str] = {}
+        for key, value in metadata.items():
+            # YAML reads an unquoted `[[link]]` as a list nested in a list.
+            if (
+                isinstance(value, list)
+                and len(value) == 1
+                and isinstance(value[0], list)
+                and len(value[0]) == 1
+            ):
+                value = f"[[{value[0][0]}]]"
+            if not isinstance(value, str):
+                continue
+            value = value.strip()
+            if (
+                value.startswith("[[")
+                and value.endswith("]]")
+                and value.count("[[") == 1
+            ):
+                links[str(key)] = value[2:-2]
+        return links
+
+    def __get_content(self, text_markdown) -> Dict[str, str | dict]:  # type: ignore
+        # Parse the non-frontmatter markdown into a dict.
+        return parse_sections(text_markdown)
+
+    def __get_frontmatter(self, frontmatter) -> Dict[str, str]:
         # Some frontmatter values are enclosed in [[double brackets]], causing the frontmatter parser to interpret them as double-nested lists.
         # I want to convert these to strings.
         for key, value in frontmatter.items():
@@ -72,34 +268,3 @@ class MarkdownData:
                 if isinstance(value[0], list):
                     frontmatter[key] = value[0][0]
         return frontmatter
-
-    def __get_dataview_fields(self, text) -> Dict[str, List[str]]:
-        dv_fields_pattern: re.Pattern[str] = re.compile(
-            r"(?:[(\[]|^- )(?P<dvKey>[\w ]+):: (?:\[{0,2})(?:\w*\|)?(?P<dvValue>[^\[\]]*?)(?:[)\]]|$|\n)"
-        )
-        matches: list[re.Match[str]] = list(dv_fields_pattern.finditer(text))
-        dv_fields: dict[str, list[str]] = {}
-        if not matches:
-            return dv_fields
-        for match in matches:
-            dv_key: str = simplify_text(match.group("dvKey"))
-            dv_value: str = match.group("dvValue")
-            # Continue just in case the key is empty somehow.
-            if not dv_key or dv_key == "":
-                continue
-            # If this key is already present, change the existing value to a list and append the new value.
-            if dv_key in dv_fields:
-                dv_fields[dv_key] = [*dv_fields[dv_key], dv_value]
-            else:
-                dv_fields[dv_key] = [dv_value]
-        return dv_fields
-
-    def __get_images(self, text) -> List[str]:
-        image_file_pattern = re.compile(r"\[\[(?P<filename>.*?\.(?:jpg|png|jpeg|webp))")
-        matches = list(image_file_pattern.finditer(text))
-        images = []
-        if not matches:
-            return images
-        for match in matches:
-            images.append(match.group("filename"))
-        return images
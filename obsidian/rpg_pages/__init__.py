@@ -1,19 +1,49 @@
+from .fields import (
+    Dataview,
+    FieldSource,
+    Frontmatter,
+    Record,
+    Section,
+    SectionRecord,
+    compile_fields,
+)
 from .rpg_pages import (
+    PAGE_TYPES,
     Character,
     Item,
     Location,
     PageTypes,
     RpgData,
+    get_page_class,
     get_page_type,
+    get_page_type_from_tags,
+    get_page_type_name,
+    get_page_type_names,
+    is_card_file,
     new_page,
+    register_page_type,
 )
 
 __all__ = [
     "Character",
+    "Dataview",
+    "FieldSource",
+    "Frontmatter",
     "Item",
     "Location",
+    "PAGE_TYPES",
+    "Record",
+    "Section",
+    "SectionRecord",
+    "compile_fields",
+    "get_page_class",
     "get_page_type",
+    "get_page_type_from_tags",
+    "get_page_type_name",
+    "get_page_type_names",
+    "is_card_file",
     "new_page",
     "PageTypes",
     "RpgData",
+    "register_page_type",
 ]
@@ -0,0 +1,173 @@
+"""
+Declarative mappings from the parts of a note to the fields of a page.
+
+Each page type lists where each of its fields comes from: a Dataview field, a frontmatter key or a section of the note.
+The list is compiled once, when the page type is defined, into a function that fills in the fields of every page of that type.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Mapping
+
+from obsidian.sections import find_section
+
+# Reads the value of a field from a page whose `content`, `frontmatter` and `dataview_fields` are already set.
+Extractor = Callable[[Any], Any]
+
+
+class FieldSource:
+    """
+    Base class for the places a field's value can come from.
+    """
+
+    def compile(self) -> Extractor:
+        """
+        Returns a function that reads the value from a page.
+        """
+        raise NotImplementedError("This method should be overridden in subclasses.")
+
+
+@dataclass(frozen=True)
+class Dataview(FieldSource):
+    """
+    The first value of an inline Dataview field, such as `(race:: Human)`.
+    The key is written the way `MarkdownData` simplifies it, as in `group-name`.
+    """
+
+    key: str
+    default: Any = ""
+
+    def compile(self) -> Extractor:
+        key, default = self.key, self.default
+
+        def extract(page) -> Any:
+            values = page.dataview_fields.get(key)
+            return values[0] if values else default
+
+        return extract
+
+
+@dataclass(frozen=True)
+class Frontmatter(FieldSource):
+    """
+    The value of a key in the frontmatter.
+    """
+
+    key: str
+    default: Any = ""
+
+    def compile(self) -> Extractor:
+        key, default = self.key, self.default
+
+        def extract(page) -> Any:
+            return page.frontmatter.get(key, default)
+
+        return extract
+
+
+@dataclass(frozen=True)
+class Section(FieldSource):
+    """
+    The content under a heading, found the way `find_section` finds it.
+    If `required` is set, a note without the section raises a `KeyError` and isn't turned into a card.
+    """
+
+    name: str
+    default: Any = ""
+    required: bool = False
+
+    def compile(self) -> Extractor:
+        name, default, required = self.name, self.default, self.required
+
+        def extract(page) -> Any:
+            section = find_section(page.content, name)
+            if section is None:
+                if required:
+                    raise KeyError(name)
+                return default
+            return section
+
+        return extract
+
+
+@dataclass(frozen=True)
+class SectionRecord(FieldSource):
+    """
+    A section read into a dataclass, such as a character's personality.
+
+    Each subheading fills in the field with the same name, ignoring case, and subheadings without a field are ignored.
+    If the section has no subheadings, its text fills in the field named by `text_field`.
+    A missing section gives a dataclass with its default values.
+    """
+
+    name: str
+    record_type: type
+    text_field: str
+
+    def compile(self) -> Extractor:
+        name, record_type, text_field = self.name, self.record_type, self.text_field
+        field_names = frozenset(field.name for field in fields(record_type))
+
+        def extract(page) -> Any:
+            section = find_section(page.content, name)
+            if section is None:
+                return record_type()
+            if isinstance(section, str):
+                return record_type(**{text_field: section})
+            values = {}
+            for heading, value in section.items():
+                key = heading.lower()
+                if key in field_names:
+                    if not isinstance(value, str):
+                        raise ValueError(
+                            f'The "{heading}" section under "{name}" should be text.'
+                        )
+                    values[key] = value
+            return record_type(**values)
+
+        return extract
+
+
+@dataclass(frozen=True)
+class Record(FieldSource):
+    """
+    A dataclass whose fields each come from their own source, such as a character's gender and race.
+    """
+
+    record_type: type
+    sources: Mapping[str, FieldSource]
+
+    def compile(self) -> Extractor:
+        record_type = self.record_type
+        extractors = tuple(
+            (name, source.compile()) for name, source in self.sources.items()
+        )
+
+        def extract(page) -> Any:
+            return record_type(
+                **{name: extractor(page) for name, extractor in extractors}
+            )
+
+        return extract
+
+
+def compile_fields(
+    sources: Mapping[str, FieldSource | Extractor],
+) -> Callable[[Any], None]:
+    """Compile a page type's field mapping into a function that fills in those fields on a page.
+
+    Args:
+        sources (Mapping[str, FieldSource | Extractor]): The source of each field, by the name of the field. A plain function can be used for a field that needs its own logic.
+
+    Returns:
+        Callable[[Any], None]: A function that sets each field on the page it's given, in the order of the mapping.
+    """
+    extractors = tuple(
+        (name, source.compile() if isinstance(source, FieldSource) else source)
+        for name, source in sources.items()
+    )
+
+    def fill_fields(page) -> None:
+        for name, extractor in extractors:
+            setattr(page, name, extractor(page))
+
+    return fill_fields
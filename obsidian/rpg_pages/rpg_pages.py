@@ -1,20 +1,45 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
-
-from dacite import from_dict
+from typing import Callable, ClassVar, Mapping
 
 import typst
-from obsidian.parser import MarkdownData
-from utils.dict import get_lower_keys
+import utils.profiling as profiling
+from obsidian.links import LinkResolver
+from obsidian.parser import MarkdownData, read_frontmatter
+from obsidian.rpg_pages.fields import (
+    Dataview,
+    Extractor,
+    FieldSource,
+    Frontmatter,
+    Record,
+    Section,
+    SectionRecord,
+    compile_fields,
+)
+from obsidian.sections import find_section
+
+
+class PageTypes(str, Enum):
+    CHARACTER = "character"
+    ITEM = "item"
+    LOCATION = "location"
+    UNKNOWN = "unknown"
 
 
 @dataclass
 class RpgData(ABC):
     """
     Base class for each of the types of Obsidian pages.
+
+    Subclasses list where each of their fields comes from in `FIELDS`, which is compiled once, when the subclass is defined.
     """
 
+    # The source of each field, by the name of the field. Fields are filled in in this order.
+    FIELDS: ClassVar[Mapping[str, FieldSource | Extractor]] = {}
+    PAGE_TYPE: ClassVar[PageTypes] = PageTypes.UNKNOWN
+    _fill_fields: ClassVar[Callable[["RpgData"], None]]
+
     name: str = ""
     description: str = ""
     image: str = ""
@@ -22,10 +47,16 @@ class RpgData(ABC):
     frontmatter: dict[str, str] = field(default_factory=dict)
     dataview_fields: dict[str, list[str]] = field(default_factory=dict)
     tags: list[str] = field(default_factory=list)
-
-    def __init__(self, markdown_text: str):
-        # Parse string to object
-        page = MarkdownData(markdown_text)
+    # The frontmatter values that are wikilinks, as written, which `new_page` sets before resolving the links.
+    frontmatter_links: dict[str, str] = field(default_factory=dict)
+
+    def __init__(self, markdown_text: str | MarkdownData):
+        # Parse string to object, unless the caller has already parsed it.
+        page = (
+            markdown_text
+            if isinstance(markdown_text, MarkdownData)
+            else MarkdownData(markdown_text)
+        )
 
         # The name of the character should be H1, which is the key of the top-level element.
         self.name = list(page.content.keys())[0]
@@ -53,6 +84,18 @@ class RpgData(ABC):
             self.frontmatter = {}
         if page.tags:
             self.tags = page.tags
+        self.frontmatter_links = {}
+
+        self._fill_fields(self)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fill_fields = staticmethod(compile_fields(cls.FIELDS))  # type: ignore
+
+    def resolve_links(self, link_index: LinkResolver) -> None:
+        """
+        Replaces links to other notes with the names of the cards they point to. Pages without links to resolve don't override this.
+        """
 
     @abstractmethod
     def to_typst_card(self) -> typst.Card:
@@ -62,7 +105,7 @@ class RpgData(ABC):
         raise NotImplementedError("This method should be overridden in subclasses.")
 
 
-@dataclass
+@dataclass(init=False)
 class Item(RpgData):
     """This is the format that my Obsidian item template uses. It's a dataclass so that I can easily convert it to a dictionary for exporting to other programs."""
 
@@ -78,43 +121,23 @@ class Item(RpgData):
     traits: str = ""  # item type, rarity, magic level, attunement requirements
     magic_level: str = ""  # minor, major, artifact
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        # All items should have these fields, but we need to check for them anyway since it's a dict.
-        if "Description" in self.content:
-            self.description = self.content["Description"]
-        else:
-            self.description = ""
-        if "cost" in self.dataview_fields:
-            self.cost = self.dataview_fields["cost"][0]
-        else:
-            self.cost = ""
-        if "weight" in self.dataview_fields:
-            self.weight = self.dataview_fields["weight"][0]
-        else:
-            self.weight = ""
-
+    PAGE_TYPE = PageTypes.ITEM
+    FIELDS = {
+        # All items should have these fields.
+        "description": Section("Description"),
+        "cost": Dataview("cost"),
+        "weight": Dataview("weight"),
         # Optional fields
-        if "damage" in self.dataview_fields:
-            self.damage = self.dataview_fields["damage"][0]
-        if "range" in self.dataview_fields:
-            self.range = self.dataview_fields["range"][0]
-        if "armor-class" in self.dataview_fields:
-            self.armor_class = self.dataview_fields["armor-class"][0]
-        if "stealth" in self.dataview_fields:
-            self.stealth = self.dataview_fields["stealth"][0]
-        if "magic-level" in self.dataview_fields:
-            self.magic_level = self.dataview_fields["magic-level"][0]
-
+        "damage": Dataview("damage"),
+        "range": Dataview("range"),
+        "armor_class": Dataview("armor-class"),
+        "stealth": Dataview("stealth"),
+        "magic_level": Dataview("magic-level"),
         # "Traits" is the key that I used on compendium items to store the item type, rarity, magic level, and attunement requirements.
         # On custom items, these are separate fields.
-        # Compendium items
-        if "traits" in self.dataview_fields:
-            self.traits = self.dataview_fields["traits"][0]
-        # Custom items
-        if "properties" in self.dataview_fields:
-            self.properties = self.dataview_fields["properties"][0]
+        "traits": Dataview("traits"),
+        "properties": Dataview("properties"),
+    }
 
     def to_typst_card(self) -> typst.Card:
         """
@@ -217,7 +240,7 @@ class Item(RpgData):
         return name_subtext
 
 
-@dataclass
+@dataclass(init=False)
 class Location(RpgData):
     """
     This is the format that my Obsidian location template uses. It's a dataclass so that I can easily convert it to a dictionary for exporting to other programs.
@@ -227,16 +250,24 @@ class Location(RpgData):
     story_hook: str = ""
     location: str = ""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        self.description = self.__get_description()
-        self.occupants = (
-            self.content["Occupants"] if "Occupants" in self.content else ""
-        )
-        self.story_hook = (
-            self.content["Story Hook"] if "Story Hook" in self.content else ""
-        )
+    def __get_description(self) -> str:
+        """
+        Returns the description of the location, which is either the text under the H1 heading or its Description section.
+        """
+        if self.description:
+            return self.description
+        description = find_section(self.content, "Description")
+        # Locations without a description aren't turned into cards.
+        if description is None:
+            raise KeyError("Description")
+        return description
+
+    PAGE_TYPE = PageTypes.LOCATION
+    FIELDS = {
+        "description": __get_description,
+        "occupants": Section("Occupants"),
+        "story_hook": Section("Story Hook"),
+    }
 
     def to_typst_card(self) -> typst.Card:
         """
@@ -253,32 +284,18 @@ class Location(RpgData):
             template="landscape-content-right",
         )
 
-    def __get_description(self) -> str:
-        """
-        Returns the description of the location.
-        """
-        if self.description:
-            return self.description
-        if "Description" in self.content:
-            return self.content["Description"]
-        if isinstance(self.content["Description"], str):
-            return self.content["Description"]
-        return ""
-
     def __get_lists(self) -> list[typst.CardList]:
         list_items = []
-        if "Occupants" in self.content:
-            list_items.append(
-                typst.CardList.Item(value=self.content["Occupants"], name="Occupants")
-            )
-        if "Story Hook" in self.content:
-            list_items.append(
-                typst.CardList.Item(value=self.content["Story Hook"], name="Rumor")
-            )
+        occupants = find_section(self.content, "Occupants")
+        if occupants is not None:
+            list_items.append(typst.CardList.Item(value=occupants, name="Occupants"))
+        story_hook = find_section(self.content, "Story Hook")
+        if story_hook is not None:
+            list_items.append(typst.CardList.Item(value=story_hook, name="Rumor"))
         return [typst.CardList(items=list_items, title="")]
 
 
-@dataclass
+@dataclass(init=False)
 class Character(RpgData):
     """This is the format that my Obsidian character template uses. It's a dataclass so that I can easily convert it to a dictionary for exporting to other programs."""
 
@@ -316,49 +333,35 @@ class Character(RpgData):
     group_title: str = ""
     group_rank: str = ""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        self.physical_info = Character.PhysicalInfo(
-            gender=(
-                self.dataview_fields["gender"][0]
-                if "gender" in self.dataview_fields
-                else ""
-            ),
-            race=(
-                self.dataview_fields["race"][0]
-                if "race" in self.dataview_fields
-                else ""
-            ),
-            job=(
-                self.dataview_fields["class"][0]
-                if "class" in self.dataview_fields
-                else ""
-            ),
-        )
-        # If the Description, Personality, or Hooks fields are strings, then fill in the overview/quirk/goals fields.
-        self.description = self.__get_description()
-        self.personality = self.__get_personality()
-        self.hooks = self.__get_hooks()
-        # Fill in the rest of the fields
-        self.location = (
-            self.frontmatter["location"] if "location" in self.frontmatter else ""
-        )
-        self.group_name = (
-            self.dataview_fields["group-name"][0]
-            if "group-name" in self.dataview_fields
-            else ""
-        )
-        self.group_title = (
-            self.dataview_fields["group-title"][0]
-            if "group-title" in self.dataview_fields
-            else ""
-        )
-        self.group_rank = (
-            self.dataview_fields["group-rank"][0]
-            if "group-rank" in self.dataview_fields
-            else ""
-        )
+    PAGE_TYPE = PageTypes.CHARACTER
+    FIELDS = {
+        "physical_info": Record(
+            PhysicalInfo,
+            {
+                "gender": Dataview("gender"),
+                "race": Dataview("race"),
+                "job": Dataview("class"),
+            },
+        ),
+        # If the Description, Personality, or Hooks sections have no subheadings, then their text is the overview, quirk or goals.
+        "description": SectionRecord("Description", Description, "overview"),
+        "personality": SectionRecord("Personality", Personality, "quirk"),
+        "hooks": SectionRecord("Hooks", Hooks, "goals"),
+        "location": Frontmatter("location"),
+        "group_name": Dataview("group-name"),
+        "group_title": Dataview("group-title"),
+        "group_rank": Dataview("group-rank"),
+    }
+
+    def resolve_links(self, link_index: LinkResolver) -> None:
+        # The location is usually a link to a location note, whose card may be named differently from the file.
+        # The link is resolved as written, since `location` holds its alt text, as in `[[Waterdeep|the city]]`.
+        if self.location:
+            target = link_index.resolve(
+                self.frontmatter_links.get("location", self.location)
+            )
+            if target is not None:
+                self.location = target.title
 
     def to_typst_card(self) -> typst.Card:
         """
@@ -413,90 +416,113 @@ class Character(RpgData):
             second_list.items.append(group_name_item)
         return second_list
 
-    def __get_description(self) -> Description:
-        """
-        Returns the description of the character.
-        """
-        # If it already exists for some reason, just return it.
-        if self.description and isinstance(self.description, Character.Description):
-            return self.description
-        # If there is a header for "Description" in the content...
-        if "Description" in self.content:
-            # If the content of that header is a string, then it's the overview.
-            if isinstance(self.content["Description"], str):
-                return Character.Description(overview=self.content["Description"])
-            # If it's a dict, then it's the full description.
-            return from_dict(
-                data_class=Character.Description,
-                data=get_lower_keys(self.content["Description"]),
-            )
-        # If there is no header for "Description" in the content, then just return an empty description.
-        return Character.Description()
 
-    def __get_personality(self) -> Personality:
-        """
-        Returns the personality of the character.
-        """
-        # If there is a header for "Personality" in the content...
-        if "Personality" in self.content:
-            # If the content of that header is a string, then it's the quirk.
-            if isinstance(self.content["Personality"], str):
-                return Character.Personality(quirk=self.content["Personality"])
-            # If it's a dict, then it's the full personality.
-            return from_dict(
-                data_class=Character.Personality,
-                data=get_lower_keys(self.content["Personality"]),
-            )
-        # If there is no header for "Personality" in the content, then just return an empty personality.
-        return Character.Personality()
+# The page type of each tag. A note tagged with several page types is the one added first.
+PAGE_TYPES: dict[str, type[RpgData]] = {
+    "character": Character,
+    "item": Item,
+    "location": Location,
+}
 
-    def __get_hooks(self) -> Hooks:
-        """
-        Returns the hooks of the character.
-        """
-        # If there is a header for "Hooks" in the content...
-        if "Hooks" in self.content:
-            # If the content of that header is a string, then it's the goals.
-            if isinstance(self.content["Hooks"], str):
-                return Character.Hooks(goals=self.content["Hooks"])
-            # If it's a dict, then it's the full hooks.
-            return from_dict(
-                data_class=Character.Hooks,
-                data=get_lower_keys(self.content["Hooks"]),
-            )
-        # If there is no header for "Hooks" in the content, then just return an empty hooks.
-        return Character.Hooks()
 
+def register_page_type(tag: str, page_type: type[RpgData]) -> None:
+    """Turn notes with a tag into pages of a type, such as spells or monsters.
 
-class PageTypes(Enum):
-    CHARACTER = "character"
-    ITEM = "item"
-    LOCATION = "location"
-    UNKNOWN = "unknown"
+    Args:
+        tag (str): The first segment of the tag, as in `spell` for `spell/evocation`.
+        page_type (type[RpgData]): The page type, which lists where its fields come from in `FIELDS`.
+    """
+    PAGE_TYPES[tag] = page_type
 
 
-def get_page_type(text: str) -> PageTypes:
+def get_page_class(tags: list[str]) -> type[RpgData] | None:
     """
-    Identify the type of an Obsidian page based on its frontmatter tags.
+    Find the page type for the first segment of each of a page's tags, or None if none of them has one.
     """
-    page = MarkdownData(text)
-    if len(page.tags) == 0:
-        return PageTypes.UNKNOWN
-    if "character" in page.tags:
-        return PageTypes.CHARACTER
-    elif "item" in page.tags:
-        return PageTypes.ITEM
-    elif "location" in page.tags:
-        return PageTypes.LOCATION
-    else:
+    matches = [PAGE_TYPES[tag] for tag in tags if tag in PAGE_TYPES]
+    if len(matches) <= 1:
+        return matches[0] if matches else None
+    return next(page_type for page_type in PAGE_TYPES.values() if page_type in matches)
+
+
+def get_page_type_name(tags: list[str]) -> str:
+    """Name the type of an Obsidian page from the first segment of each of its tags.
+
+    Unlike `get_page_type_from_tags`, this tells apart the page types added with `register_page_type`.
+
+    Args:
+        tags (list[str]): The first segment of each of the page's tags.
+
+    Returns:
+        str: The `PageTypes` value of a built-in type, such as `character`, the tag a registered type was first registered with, such as `spell`, or `unknown`.
+    """
+    page_class = get_page_class(tags)
+    if page_class is None:
+        return PageTypes.UNKNOWN.value
+    if page_class.PAGE_TYPE is not PageTypes.UNKNOWN:
+        return page_class.PAGE_TYPE.value
+    return next(tag for tag, page_type in PAGE_TYPES.items() if page_type is page_class)
+
+
+def get_page_type_names() -> list[str]:
+    """
+    Returns the name of every page type, as given by `get_page_type_name`, in the order they were added.
+    """
+    return list(dict.fromkeys(get_page_type_name([tag]) for tag in PAGE_TYPES))
+
+
+def get_page_type_from_tags(tags: list[str]) -> PageTypes:
+    """
+    Identify the type of an Obsidian page from the first segment of each of its tags.
+    Page types added with `register_page_type` are `UNKNOWN` unless they set their own `PAGE_TYPE`.
+    """
+    page_class = get_page_class(tags)
+    if page_class is None:
         return PageTypes.UNKNOWN
+    return page_class.PAGE_TYPE
 
 
-def new_page(text: str) -> RpgData:
+def get_page_type(text: str | MarkdownData) -> PageTypes:
+    """
+    Identify the type of an Obsidian page based on its frontmatter tags.
+    """
+    page = text if isinstance(text, MarkdownData) else MarkdownData(text)
+    return get_page_type_from_tags(page.tags)
+
+
+def is_card_file(filepath: str) -> bool:
+    """Check whether a markdown file could become a card, reading only its frontmatter.
+
+    Args:
+        filepath (str): The path to the markdown file.
+
+    Returns:
+        bool: False if the file's tags show it will never be a card. True if it might be, including when the frontmatter can't be read without a full parse.
+    """
+    frontmatter = read_frontmatter(filepath)
+    if frontmatter is None:
+        return True
+    if "tags" not in frontmatter:
+        return False
+    tags = frontmatter["tags"]
+    # A single tag written as a string is split into characters by MarkdownData, so it never matches a page type.
+    if isinstance(tags, str):
+        return False
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        return True
+    return get_page_class([tag.split("/")[0] for tag in tags]) is not None
+
+
+def new_page(
+    text: str | MarkdownData, link_index: LinkResolver | None = None
+) -> RpgData:
     """Main function for creating a new Obsidian page object.
 
+    The markdown is parsed once and the same `MarkdownData` is used both to identify the page type and to build the page object.
+
     Args:
-        text (str): The text of the markdown file.
+        text (str | MarkdownData): The text of the markdown file, or an already parsed page.
+        link_index (LinkResolver | None, optional): An index of the vault's notes, such as a `LinkIndex`, used to resolve the page's links. Defaults to None, which leaves links as they are written.
 
     Raises:
         ValueError: If the page type is not recognized.
@@ -504,13 +530,14 @@ def new_page(text: str) -> RpgData:
     Returns:
         RpgData: An Obsidian page object.
     """
-    page_type = get_page_type(text)
-    match page_type:
-        case PageTypes.CHARACTER:
-            return Character(text)
-        case PageTypes.ITEM:
-            return Item(text)
-        case PageTypes.LOCATION:
-            return Location(text)
-        case _:
-            raise ValueError(f"Page type {page_type} not recognized.")
+    page = text if isinstance(text, MarkdownData) else MarkdownData(text)
+    with profiling.stage("classify"):
+        page_class = get_page_class(page.tags)
+    if page_class is None:
+        raise ValueError(f"Page type {PageTypes.UNKNOWN} not recognized.")
+    with profiling.stage("build_page"):
+        rpg_page = page_class(page)
+        if link_index is not None:
+            rpg_page.frontmatter_links = page.frontmatter_links
+            rpg_page.resolve_links(link_index)
+    return rpg_page
@@ -0,0 +1,483 @@
+"""
+Builds the nested heading-section tree of a markdown document.
+
+This produces exactly the same structure as `json.loads(markdown_to_json.jsonify(text))`,
+in a single pass over the lines and without the inline parsing, `OrderedDict`s and JSON round trip.
+The block rules follow the CommonMark parser vendored by markdown_to_json, including its quirks,
+because the shape of the tree decides which card fields get filled in.
+
+The rules for turning blocks into sections are:
+
+- Headings are keys, and the blocks following a heading are its value.
+- The top level is the lowest heading level in the document. If that level has no ATX headings, the document is returned as `{"root": [...]}`.
+- A section whose first block is a list becomes a list of strings, which can contain nested lists. Anything after that list is dropped.
+- Any other section becomes its blocks joined by blank lines.
+- Blocks before the first subheading of a section are dropped.
+"""
+
+import re
+from functools import reduce
+from typing import Any, Dict, List
+
+CODE_INDENT = 4
+LINE_ENDING_PATTERN: re.Pattern[str] = re.compile(r"\r\n|\n|\r")
+NON_SPACE_PATTERN: re.Pattern[str] = re.compile(r"[^ ]")
+BLOCK_START_PATTERN: re.Pattern[str] = re.compile(r"[ #`~*+_=<>0-9-]")
+ATX_HEADING_PATTERN: re.Pattern[str] = re.compile(r"^#{1,6}(?: +|$)")
+ATX_CLOSING_PATTERN: re.Pattern[str] = re.compile(r"(?:(\\#) *#*| *#+) *$")
+FENCE_OPEN_PATTERN: re.Pattern[str] = re.compile(r"^`{3,}(?!.*`)|^~{3,}(?!.*~)")
+FENCE_CLOSE_PATTERN: re.Pattern[str] = re.compile(r"^(?:`{3,}|~{3,})(?= *$)")
+SETEXT_UNDERLINE_PATTERN: re.Pattern[str] = re.compile(r"^(?:=+|-+) *$")
+THEMATIC_BREAK_PATTERN: re.Pattern[str] = re.compile(
+    r"^(?:(?:\* *){3,}|(?:_ *){3,}|(?:- *){3,}) *$"
+)
+BULLET_MARKER_PATTERN: re.Pattern[str] = re.compile(r"^[*+-]( +|$)")
+ORDERED_MARKER_PATTERN: re.Pattern[str] = re.compile(r"^(\d+)([.)])( +|$)")
+BLOCK_TAG_NAME = (
+    "(?:article|header|aside|hgroup|iframe|blockquote|hr|body|li|map|button|object"
+    "|canvas|ol|caption|output|col|p|colgroup|pre|dd|progress|div|section|dl|table"
+    "|td|dt|tbody|embed|textarea|fieldset|tfoot|figcaption|th|figure|thead|footer"
+    "|tr|form|ul|h1|h2|h3|h4|h5|h6|video|script|style)"
+)
+HTML_BLOCK_OPEN_PATTERN: re.Pattern[str] = re.compile(
+    "^<(?:" + BLOCK_TAG_NAME + "[\\s/>]|/" + BLOCK_TAG_NAME + "[\\s>]|[?!])",
+    re.IGNORECASE,
+)
+HEADING_TYPES = ("ATXHeader", "SetextHeader")
+
+
+class _Block:
+    """
+    A block in the document tree, such as a heading, paragraph, list or list item.
+    """
+
+    __slots__ = (
+        "kind",
+        "parent",
+        "children",
+        "is_open",
+        "last_line_blank",
+        "start_line",
+        "strings",
+        "level",
+        "list_data",
+        "fence_length",
+        "fence_char",
+        "fence_offset",
+    )
+
+    def __init__(self, kind: str, start_line: int):
+        self.kind = kind
+        self.parent: _Block | None = None
+        self.children: List[_Block] = []
+        self.is_open = True
+        self.last_line_blank = False
+        self.start_line = start_line
+        self.strings: List[str] = []
+        self.level = 0
+        self.list_data: Dict[str, Any] = {}
+        self.fence_length = 0
+        self.fence_char = ""
+        self.fence_offset = 0
+
+
+def _find_non_space(line: str, offset: int) -> int | None:
+    match = NON_SPACE_PATTERN.search(line, offset)
+    return None if match is None else match.start()
+
+
+def _expand_tabs(line: str) -> str:
+    """
+    Replaces tabs with spaces the same way as the vendored parser, which measures tab stops in the original line.
+    """
+    if "\t" not in line:
+        return line
+    last_stop = 0
+
+    def replace_tab(match: re.Match[str]) -> str:
+        nonlocal last_stop
+        result = "    "[(match.end() - 1 - last_stop) % 4 :]
+        last_stop = match.end()
+        return result
+
+    return re.sub("\t", replace_tab, line)
+
+
+def _parse_list_marker(line: str, offset: int) -> Dict[str, Any] | None:
+    rest = line[offset:]
+    if THEMATIC_BREAK_PATTERN.match(rest):
+        return None
+    data: Dict[str, Any] = {}
+    match = BULLET_MARKER_PATTERN.search(rest)
+    if match:
+        spaces_after_marker = len(match.group(1))
+        data["type"] = "Bullet"
+        data["bullet_char"] = match.group(0)[0]
+    else:
+        match = ORDERED_MARKER_PATTERN.search(rest)
+        if not match:
+            return None
+        spaces_after_marker = len(match.group(3))
+        data["type"] = "Ordered"
+        data["delimiter"] = match.group(2)
+    if spaces_after_marker >= 5 or spaces_after_marker < 1:
+        data["padding"] = len(match.group(0)) - spaces_after_marker + 1
+    else:
+        data["padding"] = len(match.group(0))
+    return data
+
+
+def _lists_match(list_data: Dict[str, Any], item_data: Dict[str, Any]) -> bool:
+    return all(
+        list_data.get(key) == item_data.get(key)
+        for key in ("type", "delimiter", "bullet_char")
+    )
+
+
+class _BlockParser:
+    """
+    Splits a markdown document into blocks, one line at a time.
+    """
+
+    def __init__(self):
+        self.document = _Block("Document", 1)
+        self.tip = self.document
+
+    def parse(self, text: str) -> _Block:
+        lines = LINE_ENDING_PATTERN.split(re.sub(r"\n$", "", text))
+        for line_number, line in enumerate(lines, start=1):
+            self.__add_line(line, line_number)
+        while self.tip is not None:
+            self.__finalize(self.tip)
+        return self.document
+
+    def __finalize(self, block: _Block) -> None:
+        if not block.is_open:
+            return
+        block.is_open = False
+        if block.kind == "Paragraph":
+            block.strings = [line.lstrip(" ") for line in block.strings]
+        elif block.kind == "FencedCode":
+            # The first line holds the info string, which isn't part of the code.
+            code = "\n".join(block.strings[1:]) + "\n" if len(block.strings) > 1 else ""
+            block.strings = [code]
+        self.tip = block.parent  # type: ignore
+
+    def __add_child(self, kind: str, line_number: int) -> _Block:
+        while not (
+            self.tip.kind in ("Document", "BlockQuote", "ListItem")
+            or (self.tip.kind == "List" and kind == "ListItem")
+        ):
+            self.__finalize(self.tip)
+        block = _Block(kind, line_number)
+        block.parent = self.tip
+        self.tip.children.append(block)
+        self.tip = block
+        return block
+
+    def __break_out_of_lists(self, block: _Block) -> None:
+        """
+        Two blank lines in a row close every list that contains the block.
+        """
+        outermost_list = None
+        current: _Block | None = block
+        while current is not None:
+            if current.kind == "List":
+                outermost_list = current
+            current = current.parent
+        if outermost_list is not None:
+            while block is not outermost_list:
+                self.__finalize(block)
+                block = block.parent  # type: ignore
+            self.__finalize(outermost_list)
+            self.tip = outermost_list.parent  # type: ignore
+
+    def __close_unmatched(self, last_matched: _Block) -> None:
+        while self.__unmatched is not None and self.__unmatched is not last_matched:
+            self.__finalize(self.__unmatched)
+            self.__unmatched = self.__unmatched.parent
+        self.__unmatched = None
+
+    def __add_line(self, line: str, line_number: int) -> None:
+        offset = 0
+        blank = False
+        container = self.document
+        self.__unmatched: _Block | None = self.tip
+        line = _expand_tabs(line)
+
+        # Find the deepest open block that this line continues.
+        while container.children and container.children[-1].is_open:
+            container = container.children[-1]
+            first_non_space = _find_non_space(line, offset)
+            blank = first_non_space is None
+            if first_non_space is None:
+                first_non_space = len(line)
+            indent = first_non_space - offset
+            matched = True
+            if container.kind == "BlockQuote":
+                if indent <= 3 and line[first_non_space : first_non_space + 1] == ">":
+                    offset = first_non_space + 1
+                    if line[offset : offset + 1] == " ":
+                        offset += 1
+                else:
+                    matched = False
+            elif container.kind == "ListItem":
+                item_indent = (
+                    container.list_data["marker_offset"]
+                    + container.list_data["padding"]
+                )
+                if indent >= item_indent:
+                    offset += item_indent
+                elif blank:
+                    offset = first_non_space
+                else:
+                    matched = False
+            elif container.kind == "IndentedCode":
+                if indent >= CODE_INDENT:
+                    offset += CODE_INDENT
+                elif blank:
+                    offset = first_non_space
+                else:
+                    matched = False
+            elif container.kind in ("ATXHeader", "SetextHeader", "HorizontalRule"):
+                matched = False
+            elif container.kind == "FencedCode":
+                remaining = container.fence_offset
+                while remaining > 0 and line[offset : offset + 1] == " ":
+                    offset += 1
+                    remaining -= 1
+            elif container.kind == "HtmlBlock":
+                matched = not blank
+            elif container.kind == "Paragraph" and blank:
+                container.last_line_blank = True
+                matched = False
+            if not matched:
+                container = container.parent  # type: ignore
+                break
+        last_matched = container
+
+        if blank and container.last_line_blank:
+            self.__break_out_of_lists(container)
+
+        # Open any new blocks that start on this line.
+        while (
+            container.kind not in ("FencedCode", "IndentedCode", "HtmlBlock")
+            and BLOCK_START_PATTERN.match(line, offset) is not None
+        ):
+            first_non_space = _find_non_space(line, offset)
+            blank = first_non_space is None
+            if first_non_space is None:
+                first_non_space = len(line)
+            rest = line[first_non_space:]
+            indent = first_non_space - offset
+            atx_match = ATX_HEADING_PATTERN.search(rest)
+            fence_match = FENCE_OPEN_PATTERN.search(rest)
+            if indent >= CODE_INDENT:
+                if self.tip.kind == "Paragraph" or blank:
+                    break
+                offset += CODE_INDENT
+                self.__close_unmatched(last_matched)
+                container = self.__add_child("IndentedCode", line_number)
+            elif rest[:1] == ">":
+                offset = first_non_space + 1
+                if line[offset : offset + 1] == " ":
+                    offset += 1
+                self.__close_unmatched(last_matched)
+                container = self.__add_child("BlockQuote", line_number)
+            elif atx_match:
+                offset = first_non_space + len(atx_match.group(0))
+                self.__close_unmatched(last_matched)
+                container = self.__add_child("ATXHeader", line_number)
+                container.level = len(atx_match.group(0).strip())
+                replacement = r"\g<1>" if "\\#" in line[offset:] else ""
+                container.strings = [
+                    ATX_CLOSING_PATTERN.sub(replacement, line[offset:])
+                ]
+                break
+            elif fence_match:
+                fence_length = len(fence_match.group(0))
+                self.__close_unmatched(last_matched)
+                container = self.__add_child("FencedCode", line_number)
+                container.fence_length = fence_length
+                container.fence_char = fence_match.group(0)[0]
+                container.fence_offset = first_non_space - offset
+                offset = first_non_space + fence_length
+                break
+            elif HTML_BLOCK_OPEN_PATTERN.search(rest):
+                self.__close_unmatched(last_matched)
+                container = self.__add_child("HtmlBlock", line_number)
+                break
+            elif (
+                container.kind == "Paragraph"
+                and len(container.strings) == 1
+                and SETEXT_UNDERLINE_PATTERN.search(rest)
+            ):
+                self.__close_unmatched(last_matched)
+                container.kind = "SetextHeader"
+                container.level = 1 if rest[0] == "=" else 2
+                offset = len(line)
+            elif THEMATIC_BREAK_PATTERN.search(rest):
+                self.__close_unmatched(last_matched)
+                container = self.__add_child("HorizontalRule", line_number)
+                offset = len(line) - 1
+                break
+            else:
+                data = _parse_list_marker(line, first_non_space)
+                if data is None:
+                    break
+                self.__close_unmatched(last_matched)
+                data["marker_offset"] = indent
+                offset = first_non_space + data["padding"]
+                if container.kind != "List" or not _lists_match(
+                    container.list_data, data
+                ):
+                    container = self.__add_child("List", line_number)
+                    container.list_data = data
+                container = self.__add_child("ListItem", line_number)
+                container.list_data = data
+            if container.kind in ("Paragraph", "IndentedCode", "FencedCode"):
+                break
+
+        first_non_space = _find_non_space(line, offset)
+        blank = first_non_space is None
+        if first_non_space is None:
+            first_non_space = len(line)
+        indent = first_non_space - offset
+
+        # A line that doesn't continue its container can still lazily continue an open paragraph.
+        if (
+            self.tip is not last_matched
+            and not blank
+            and self.tip.kind == "Paragraph"
+            and self.tip.strings
+        ):
+            self.tip.strings.append(line[offset:])
+            return
+
+        self.__close_unmatched(last_matched)
+        container.last_line_blank = blank and not (
+            container.kind in ("BlockQuote", "FencedCode")
+            or (
+                container.kind == "ListItem"
+                and not container.children
+                and container.start_line == line_number
+            )
+        )
+        ancestor = container
+        while ancestor.parent is not None:
+            ancestor.parent.last_line_blank = False
+            ancestor = ancestor.parent
+
+        if container.kind in ("IndentedCode", "HtmlBlock"):
+            container.strings.append(line[offset:])
+        elif container.kind == "FencedCode":
+            fence_close = FENCE_CLOSE_PATTERN.match(rest := line[first_non_space:])
+            if (
+                indent <= 3
+                and rest[:1] == container.fence_char
+                and fence_close
+                and len(fence_close.group(0)) >= container.fence_length
+            ):
+                self.__finalize(container)
+            else:
+                container.strings.append(line[offset:])
+        elif container.kind in HEADING_TYPES:
+            pass
+        elif container.kind == "Paragraph":
+            container.strings.append(line[first_non_space:])
+        elif not blank and container.kind != "HorizontalRule":
+            container = self.__add_child("Paragraph", line_number)
+            container.strings.append(line[first_non_space:])
+
+
+def _render_block(block: _Block) -> Any:
+    if block.kind == "List":
+        return _render_list(block)
+    if block.kind == "FencedCode":
+        return "```\n" + block.strings[0] + "```"
+    if block.strings:
+        return "\n".join(block.strings)
+    if block.children:
+        return [_render_block(child) for child in block.children]
+    return None
+
+
+def _render_list(block: _Block) -> Any:
+    # Each item renders as a list of its children, so adding them together flattens the list by one level.
+    return reduce(lambda a, b: a + b, [_render_block(item) for item in block.children])
+
+
+def _render_value(blocks: List[_Block]) -> Any:
+    if not blocks:
+        return ""
+    if blocks[0].kind == "List":
+        return _render_list(blocks[0])
+    return "\n\n".join(str(_render_block(block)) for block in blocks)
+
+
+def _nest(blocks: List[_Block], heading_level: int) -> Any:
+    """
+    Groups blocks under the headings of one level, then recurses into each group with the next level.
+    """
+    sections: Dict[str, Any] = {}
+    heading: _Block | None = None
+    children: List[_Block] = []
+    for block in blocks:
+        if block.kind == "ATXHeader" and block.level == heading_level:
+            if heading is not None:
+                sections[_render_block(heading)] = _nest(children, heading_level + 1)
+            heading = block
+            children = []
+        else:
+            children.append(block)
+    if heading is None:
+        return _render_value(blocks)
+    sections[_render_block(heading)] = _nest(children, heading_level + 1)
+    return sections
+
+
+def parse_sections(text: str) -> Dict[str, Any]:
+    """Parse markdown into a `dict` with each header as the key and the content under that header as the value.
+
+    Args:
+        text (str): Markdown text, without frontmatter.
+
+    Raises:
+        ValueError: If the text has no content.
+
+    Returns:
+        Dict[str, Any]: The nested sections.
+    """
+    blocks = _BlockParser().parse(text).children
+    if not blocks:
+        raise ValueError("The markdown has no content.")
+    top_level = min(
+        (block.level for block in blocks if block.kind in HEADING_TYPES),
+        default=100000,
+    )
+    if not any(
+        block.kind == "ATXHeader" and block.level == top_level for block in blocks
+    ):
+        return {"root": [_render_block(block) for block in blocks]}
+    return _nest(blocks, top_level)
+
+
+def find_section(content: Any, name: str) -> Any:
+    """Look up a section by its heading, ignoring case and surrounding whitespace.
+
+    Args:
+        content (Any): The sections to search. Anything other than a `dict` has no sections.
+        name (str): The heading of the section.
+
+    Returns:
+        Any: The content of the section, or None if there is no such section.
+    """
+    if not isinstance(content, dict):
+        return None
+    if name in content:
+        return content[name]
+    folded_name = name.strip().casefold()
+    for heading, section in content.items():
+        if heading.strip().casefold() == folded_name:
+            return section
+    return None
@@ -0,0 +1,69 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmarks import STAGES, benchmark_vault, compare_results, generate_vault
+from obsidian import rpg_pages
+
+
+class TestBenchmarks(unittest.TestCase):
+    # Tests for the synthetic vault generator and the benchmark suite.
+    # 1. The generated notes are recognized as the card types they were written as.
+    # 2. The same seed generates the same vault.
+    # 3. Every stage is timed, and the results can be written as JSON and compared.
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.vault = self.temp_dir / "vault"
+        self.summary = generate_vault(self.vault, 60, seed=1)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_generated_notes(self):
+        # Test 1: Identify the type of every generated note.
+        # Expected Result: The counts should match the summary.
+        page_types = [
+            rpg_pages.get_page_type(Path(path).read_text(encoding="utf-8"))
+            for path in self.summary.note_paths
+        ]
+        self.assertEqual(
+            page_types.count(rpg_pages.PageTypes.CHARACTER), self.summary.characters
+        )
+        self.assertEqual(page_types.count(rpg_pages.PageTypes.ITEM), self.summary.items)
+        self.assertEqual(
+            page_types.count(rpg_pages.PageTypes.LOCATION), self.summary.locations
+        )
+        self.assertEqual(len(page_types), 60)
+        self.assertGreater(self.summary.images, 0)
+
+    def test_reproducible(self):
+        # Test 2: Generate a second vault with the same seed.
+        # Expected Result: The notes should be identical.
+        other = generate_vault(self.temp_dir / "other", 60, seed=1)
+        for path, other_path in zip(self.summary.note_paths, other.note_paths):
+            self.assertEqual(
+                Path(path).read_text(encoding="utf-8"),
+                Path(other_path).read_text(encoding="utf-8"),
+            )
+
+    def test_benchmark_vault(self):
+        # Test 3: Benchmark the vault and compare the results with themselves.
+        # Expected Result: Every stage should be timed, every card built and the results should survive a JSON round trip.
+        output_directory = self.temp_dir / "out"
+        output_directory.mkdir()
+        result = benchmark_vault(self.vault, output_directory)
+        self.assertEqual(list(result["stages"]), STAGES)
+        self.assertEqual(result["cards"], self.summary.cards)
+        self.assertEqual(result["failed"], 0)
+        self.assertTrue((output_directory / "data.yaml").exists())
+        results = json.loads(json.dumps({"runs": [{"notes": 60, **result}]}))
+        lines = compare_results(results, results)
+        self.assertEqual(len(lines), len(STAGES) + 1)
+        self.assertTrue(all("(+0.0%)" in line for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from dataclasses import asdict
 from pathlib import Path
+from unittest import mock
 
 import yaml
 from jsonschema import ValidationError
@@ -69,6 +70,24 @@ class TestCharacter(unittest.TestCase):
             is_valid = False
         self.assertTrue(is_valid)
 
+    def test_new_page_parses_once(self):
+        # Test 7: Identifying and building a page should only parse the markdown once.
+        # Expected Result: The frontmatter parser should be called a single time, and the result should match a direct parse.
+        with mock.patch(
+            "obsidian.parser.fm.parse", wraps=obsidian.parser.fm.parse
+        ) as parse:
+            page = obsidian.rpg_pages.new_page(self.CHARACTER_MARKDOWN_STANDARD)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(page, self.character_data)
+
+    def test_character_from_markdown_data(self):
+        # Test 8: Generate an ObsidianCharacter object from an already parsed page.
+        # Expected Result: The object should be the same as one built from the raw text.
+        markdown_data = obsidian.parser.MarkdownData(self.CHARACTER_MARKDOWN_STANDARD)
+        self.assertEqual(
+            obsidian.rpg_pages.Character(markdown_data), self.character_data
+        )
+
 
 class EdgeCases(unittest.TestCase):
     # Tests what happens when the input files are not formatted correctly.
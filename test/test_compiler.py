@@ -0,0 +1,260 @@
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import typst.compiler as compiler
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Stands in for `typst compile`: writes the titles of the shard's cards, one per line, after a short wait.
+STUB_COMPILER = """
+import sys, time, yaml
+root, data, output = sys.argv[2], sys.argv[4].removeprefix("data="), sys.argv[6]
+with open(root + data) as file:
+    cards = yaml.safe_load(file)["cards"]
+time.sleep(0.5)
+with open(output, "w") as file:
+    file.writelines(card["title"] + "\\n" for card in cards)
+"""
+
+# Stands in for `typst compile`: writes a PDF with a blank page for each of the shard's cards.
+STUB_PDF_COMPILER = """
+import sys, yaml
+from pypdf import PdfWriter
+root, data, output = sys.argv[2], sys.argv[4].removeprefix("data="), sys.argv[6]
+with open(root + data) as file:
+    cards = yaml.safe_load(file)["cards"]
+writer = PdfWriter()
+for card in cards:
+    writer.add_blank_page(width=180, height=252)
+with open(output, "wb") as file:
+    writer.write(file)
+"""
+
+# Stands in for a template that reads its cards from a fixed path in the root: writes their titles, one per line.
+STUB_FIXED_PATH_COMPILER = """
+import sys, yaml
+root, output = sys.argv[2], sys.argv[4]
+with open(root + "/in/data.yaml") as file:
+    cards = yaml.safe_load(file)["cards"]
+with open(output, "w") as file:
+    file.writelines(card["title"] + "\\n" for card in cards)
+"""
+
+# Stands in for a template that reads a data file outside the shard: writes a PDF with a blank page for each card in it.
+STUB_WRONG_DATA_COMPILER = """
+import sys, yaml
+from pypdf import PdfWriter
+data, output = sys.argv[1], sys.argv[2]
+with open(data) as file:
+    cards = yaml.safe_load(file)["cards"]
+writer = PdfWriter()
+for card in cards:
+    writer.add_blank_page(width=180, height=252)
+with open(output, "wb") as file:
+    writer.write(file)
+"""
+
+# Stands in for a PDF merger: concatenates the shards.
+STUB_MERGER = """
+import sys
+with open(sys.argv[1], "w") as output:
+    for path in sys.argv[2:]:
+        with open(path) as file:
+            output.write(file.read())
+"""
+
+
+class TestCompileDeck(unittest.TestCase):
+    # Tests for compiling a deck in shards.
+    # 1. Shards are balanced, in order, and hold whole pages.
+    # 2. Shards are compiled at the same time and merged in order.
+    # 3. A deck small enough for one shard is compiled straight to the output.
+    # 4. A failing compiler raises an error with its output, and leaves no shards behind.
+    # 5. Shard PDFs are merged with pypdf.
+    # 6. A template that reads a fixed data file only renders its shard's cards, and the root is left unchanged.
+    # 7. Shards whose page counts don't add up raise an error.
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.root = self.temp_dir / "root"
+        self.root.mkdir()
+        self.template = self.root / "cards.typ"
+        self.template.touch()
+        self.output_file = self.temp_dir / "cards.pdf"
+        self.cards = [{"title": f"Card {index}"} for index in range(10)]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def write_script(self, name: str, source: str) -> str:
+        script = self.temp_dir / name
+        script.write_text(source)
+        return f"{sys.executable} {script}"
+
+    def test_split_cards(self):
+        # Test 1: Split 10 cards into 3 shards, with 1 and then 4 cards per page, and 2 cards into 4 shards.
+        # Expected Result: Shards should differ by at most a page, hold whole pages, and keep the cards in order.
+        split = compiler.split_cards(self.cards, 3)
+        self.assertEqual([len(shard) for shard in split], [4, 3, 3])
+        self.assertEqual(sum(split, []), self.cards)
+        split = compiler.split_cards(self.cards, 3, cards_per_page=4)
+        self.assertEqual([len(shard) for shard in split], [4, 4, 2])
+        self.assertEqual(sum(split, []), self.cards)
+        self.assertEqual(len(compiler.split_cards(self.cards[:2], 4)), 2)
+        self.assertEqual(compiler.split_cards([], 4), [[]])
+
+    def test_parallel_compile(self):
+        # Test 2: Compile 10 cards in 4 shards with a compiler that takes half a second.
+        # Expected Result: The merged output should list every card in order, in much less time than compiling the shards one at a time.
+        compiler_command = (
+            self.write_script("compiler.py", STUB_COMPILER)
+            + " --root {root} --input data={data} {template} {output}"
+        )
+        merge_command = (
+            self.write_script("merger.py", STUB_MERGER) + " {output} {inputs}"
+        )
+        start = time.perf_counter()
+        shards = compiler.compile_deck(
+            self.cards,
+            self.output_file,
+            self.template,
+            self.root,
+            4,
+            compiler_command=compiler_command,
+            merge_command=merge_command,
+        )
+        elapsed = time.perf_counter() - start
+        self.assertEqual(shards, 4)
+        self.assertEqual(
+            self.output_file.read_text().splitlines(),
+            [card["title"] for card in self.cards],
+        )
+        self.assertLess(elapsed, 4 * 0.5)
+        self.assertEqual(list(self.root.iterdir()), [self.template])
+
+    def test_single_shard(self):
+        # Test 3: Compile 10 cards in 1 shard, with a merge command that always fails.
+        # Expected Result: The output should be written by the compiler, without merging.
+        compiler_command = (
+            self.write_script("compiler.py", STUB_COMPILER)
+            + " --root {root} --input data={data} {template} {output}"
+        )
+        shards = compiler.compile_deck(
+            self.cards,
+            self.output_file,
+            self.template,
+            self.root,
+            1,
+            compiler_command=compiler_command,
+            merge_command="false {output} {inputs}",
+        )
+        self.assertEqual(shards, 1)
+        self.assertEqual(len(self.output_file.read_text().splitlines()), 10)
+
+    def test_compiler_error(self):
+        # Test 4: Compile with a compiler that fails.
+        # Expected Result: A RuntimeError should be raised with the compiler's error, and the shard folder removed.
+        compiler_command = (
+            self.write_script(
+                "compiler.py", "import sys\nsys.exit('error: unknown variable')"
+            )
+            + " {output}"
+        )
+        with self.assertRaisesRegex(RuntimeError, "unknown variable"):
+            compiler.compile_deck(
+                self.cards,
+                self.output_file,
+                self.template,
+                self.root,
+                2,
+                compiler_command=compiler_command,
+            )
+        self.assertEqual(list(self.root.iterdir()), [self.template])
+
+    @unittest.skipIf(PdfReader is None, "pypdf isn't installed.")
+    def test_merge_pdfs(self):
+        # Test 5: Compile 10 cards in 3 shards to PDFs, and merge them with pypdf.
+        # Expected Result: The merged PDF should have a page for each card.
+        compiler_command = (
+            self.write_script("compiler.py", STUB_PDF_COMPILER)
+            + " --root {root} --input data={data} {template} {output}"
+        )
+        compiler.compile_deck(
+            self.cards,
+            self.output_file,
+            self.template,
+            self.root,
+            3,
+            compiler_command=compiler_command,
+        )
+        self.assertEqual(len(PdfReader(self.output_file).pages), 10)  # type: ignore
+
+    def test_fixed_data_path(self):
+        # Test 6: Compile 10 cards in 4 shards with a template that reads in/data.yaml, in a root whose in/data.yaml holds the whole deck.
+        # Expected Result: The merged output should list every card once, in order, and the root's files should be unchanged.
+        data_file = self.root / "in" / "data.yaml"
+        data_file.parent.mkdir()
+        with open(data_file, "w") as file:
+            compiler.write_cards(self.cards, file)
+        image = self.root / "in" / "portrait.png"
+        image.write_bytes(b"image")
+        root_data = data_file.read_bytes()
+        compiler_command = (
+            self.write_script("compiler.py", STUB_FIXED_PATH_COMPILER)
+            + " --root {root} {template} {output}"
+        )
+        merge_command = (
+            self.write_script("merger.py", STUB_MERGER) + " {output} {inputs}"
+        )
+        shards = compiler.compile_deck(
+            self.cards,
+            self.output_file,
+            self.template,
+            self.root,
+            4,
+            compiler_command=compiler_command,
+            merge_command=merge_command,
+        )
+        self.assertEqual(shards, 4)
+        self.assertEqual(
+            self.output_file.read_text().splitlines(),
+            [card["title"] for card in self.cards],
+        )
+        self.assertEqual(data_file.read_bytes(), root_data)
+        self.assertEqual(
+            sorted(path.name for path in self.root.rglob("*")),
+            ["cards.typ", "data.yaml", "in", "portrait.png"],
+        )
+
+    @unittest.skipIf(PdfReader is None, "pypdf isn't installed.")
+    def test_shard_pages(self):
+        # Test 7: Compile 10 cards in 3 shards with a template that renders the whole deck in every shard.
+        # Expected Result: A RuntimeError should be raised about the page counts, and no output written.
+        data_file = self.temp_dir / "deck.yaml"
+        with open(data_file, "w") as file:
+            compiler.write_cards(self.cards, file)
+        compiler_command = (
+            self.write_script("compiler.py", STUB_WRONG_DATA_COMPILER)
+            + f" {data_file} {{output}}"
+        )
+        with self.assertRaisesRegex(RuntimeError, "pages"):
+            compiler.compile_deck(
+                self.cards,
+                self.output_file,
+                self.template,
+                self.root,
+                3,
+                compiler_command=compiler_command,
+            )
+        self.assertFalse(self.output_file.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from pathlib import Path
+
+from obsidian import decks
+from obsidian.rpg_pages import PageTypes
+
+
+class TestDecks(unittest.TestCase):
+    # Tests for splitting cards into decks.
+    # 1. Deck rules are parsed from the command line, and malformed rules are rejected.
+    # 2. Each card goes to the first deck it matches, then its page type's deck if split by type.
+    # 3. With a maximum size, decks are split into numbered parts, keeping the cards in order.
+    # 4. Named decks are written next to the default output, with their own image directory.
+    # 5. Tags are read from the frontmatter of the test files.
+
+    def setUp(self) -> None:
+        self.tags_by_file = {
+            "bob.md": ["character"],
+            "villain.md": ["character/antagonist"],
+            "sword.md": ["item/weapon"],
+            "library.md": ["location/service/library"],
+        }
+
+    def __route(self, router: decks.DeckRouter) -> dict[str, list[str]]:
+        """
+        Routes each file in order, returning the files sent to each deck, keyed in the order each deck's first file appears.
+        """
+        routed: dict[str, list[str]] = {}
+        for file, tags in self.tags_by_file.items():
+            routed.setdefault(router.route(tags), []).append(file)
+        return routed
+
+    def test_parse_deck_rule(self):
+        # Test 1: Parse a rule by type, a rule by tag, and malformed rules.
+        # Expected Result: The rules should select by the page type or tag, and the malformed ones raise a ValueError.
+        self.assertEqual(
+            decks.parse_deck_rule("items=type:item"),
+            decks.DeckRule("items", page_type=PageTypes.ITEM),
+        )
+        self.assertEqual(
+            decks.parse_deck_rule("villains=tag:character/antagonist"),
+            decks.DeckRule("villains", tag="character/antagonist"),
+        )
+        for rule in ["items", "=type:item", "items=type:", "items=name:x", "a/b=tag:x"]:
+            with self.assertRaises(ValueError):
+                decks.parse_deck_rule(rule)
+        with self.assertRaises(ValueError):
+            decks.parse_deck_rule("spells=type:spell")
+
+    def test_route(self):
+        # Test 2: Route the cards with a tag rule and a type rule, with and without splitting by type.
+        # Expected Result: Matched cards should go to their rule's deck, and the rest to the default deck or their type's deck.
+        rules = [
+            decks.parse_deck_rule("villains=tag:character/antagonist"),
+            decks.parse_deck_rule("characters=type:character"),
+        ]
+        self.assertEqual(
+            self.__route(decks.DeckRouter(rules)),
+            {
+                "characters": ["bob.md"],
+                "villains": ["villain.md"],
+                decks.DEFAULT_DECK: ["sword.md", "library.md"],
+            },
+        )
+        self.assertEqual(
+            list(self.__route(decks.DeckRouter(rules, split_by_type=True))),
+            ["characters", "villains", "item", "location"],
+        )
+        # A tag rule doesn't match tags that only share a prefix.
+        self.assertFalse(
+            decks.DeckRule("c", tag="char").matches(PageTypes.CHARACTER, ["character"])
+        )
+
+    def test_max_cards(self):
+        # Test 3: Route 4 cards into decks of at most 3, with and without splitting by type.
+        # Expected Result: Every deck should be split into numbered parts in order, even if it only needs one.
+        self.assertEqual(
+            self.__route(decks.DeckRouter(max_cards=3)),
+            {"1": ["bob.md", "villain.md", "sword.md"], "2": ["library.md"]},
+        )
+        self.assertEqual(
+            list(self.__route(decks.DeckRouter(split_by_type=True, max_cards=1))),
+            ["character-1", "character-2", "item-1", "location-1"],
+        )
+        with self.assertRaises(ValueError):
+            decks.DeckRouter(max_cards=0)
+
+    def test_deck_paths(self):
+        # Test 4: Get the paths of the default deck and a named deck.
+        # Expected Result: The default deck should keep the paths, and the named deck add its name to them.
+        output_file_path = Path("out/data.yaml")
+        output_image_directory = Path("out/images")
+        self.assertEqual(
+            decks.get_deck_paths(
+                decks.DEFAULT_DECK, output_file_path, output_image_directory
+            ),
+            (output_file_path, output_image_directory),
+        )
+        self.assertEqual(
+            decks.get_deck_paths("items", output_file_path, output_image_directory),
+            (Path("out/data-items.yaml"), Path("out/images/items")),
+        )
+
+    def test_read_card_tags(self):
+        # Test 5: Read the tags of a character and a location.
+        # Expected Result: The tags should be read as written, including their nested parts.
+        self.assertEqual(
+            decks.read_card_tags("test/files/bad_input.md"), ["character/antagonist"]
+        )
+        self.assertEqual(
+            decks.read_card_tags("test/files/location.md"),
+            ["location/service/library"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+
+import typst
+from obsidian import decks, rpg_pages
+from obsidian.rpg_pages import Dataview, Frontmatter, Section, SectionRecord
+
+SPELL_MARKDOWN = """---
+tags:
+- spell/evocation
+school: Evocation
+---
+# Fireball
+(level:: 3) (range:: 150 feet)
+## Description
+A bright streak flashes to a point you choose.
+"""
+
+
+@dataclass(init=False)
+class Spell(rpg_pages.RpgData):
+    level: str = ""
+    range: str = ""
+    school: str = ""
+
+    FIELDS = {
+        "level": Dataview("level"),
+        "range": Dataview("range"),
+        "school": Frontmatter("school"),
+        "description": Section("Description"),
+    }
+
+    def to_typst_card(self) -> typst.Card:
+        return typst.Card(name=self.name, body_text=self.description)
+
+
+class TestFields(unittest.TestCase):
+    # Tests for the declarative field mappings and the page type registry.
+    # 1. A new page type can be added with only a field mapping, and is named after its tag.
+    # 2. A note tagged with several page types is the type added first.
+    # 3. Sections read into a dataclass ignore case and unknown subheadings, and reject subheadings that aren't text.
+
+    def setUp(self) -> None:
+        rpg_pages.register_page_type("spell", Spell)
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        del rpg_pages.PAGE_TYPES["spell"]
+        shutil.rmtree(self.temp_dir)
+
+    def test_new_page_type(self):
+        # Test 1: Create a page from a note tagged as a spell.
+        # Expected Result: The spell's fields should be filled in from its Dataview fields, frontmatter and sections, and its type named `spell` for decks.
+        spell = rpg_pages.new_page(SPELL_MARKDOWN)
+        self.assertIsInstance(spell, Spell)
+        self.assertEqual(spell.name, "Fireball")  # type: ignore
+        self.assertEqual(spell.level, "3")  # type: ignore
+        self.assertEqual(spell.range, "150 feet")  # type: ignore
+        self.assertEqual(spell.school, "Evocation")  # type: ignore
+        self.assertEqual(
+            spell.description, "A bright streak flashes to a point you choose."
+        )
+        path = self.temp_dir / "Fireball.md"
+        path.write_text(SPELL_MARKDOWN)
+        self.assertTrue(rpg_pages.is_card_file(str(path)))
+        self.assertEqual(
+            rpg_pages.get_page_type(SPELL_MARKDOWN), rpg_pages.PageTypes.UNKNOWN
+        )
+        self.assertEqual(rpg_pages.get_page_type_name(["spell"]), "spell")
+        self.assertEqual(rpg_pages.get_page_type_name(["item"]), "item")
+        self.assertEqual(
+            rpg_pages.get_page_type_names(), ["character", "item", "location", "spell"]
+        )
+        self.assertEqual(
+            decks.get_deck_name(["spell/evocation"], split_by_type=True), "spell"
+        )
+        rule = decks.parse_deck_rule("spells=type:spell")
+        self.assertEqual(decks.get_deck_name(["spell"], [rule]), "spells")
+
+    def test_precedence(self):
+        # Test 2: Look up the page type of tags that include both a spell and a character.
+        # Expected Result: The character should win, whichever order the tags are in.
+        for tags in [["spell", "character"], ["character", "spell"]]:
+            with self.subTest(tags=tags):
+                self.assertIs(rpg_pages.get_page_class(tags), rpg_pages.Character)
+        self.assertIsNone(rpg_pages.get_page_class(["session"]))
+
+    def test_section_record(self):
+        # Test 3: Read a character's personality from subheadings in mixed case, with one the dataclass doesn't have.
+        # Expected Result: The matching subheadings should be read, and a list under one should raise a ValueError.
+        markdown = (
+            "---\ntags:\n- character\n---\n# Bob\n## Personality\n"
+            "### QUIRK\nHums.\n### Likes\nTea.\n### Fears\nSpiders.\n"
+        )
+        character = rpg_pages.new_page(markdown)
+        self.assertEqual(
+            character.personality,  # type: ignore
+            rpg_pages.Character.Personality(quirk="Hums.", likes="Tea."),
+        )
+        extract = SectionRecord(
+            "Personality", rpg_pages.Character.Personality, "quirk"
+        ).compile()
+        character.content = {"Personality": {"Likes": ["Tea", "Cake"]}}
+        with self.assertRaises(ValueError):
+            extract(character)
+
+
+if __name__ == "__main__":
+    unittest.main()
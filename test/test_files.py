@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+import types
+import unittest
+from pathlib import Path
+
+import utils.files as files
+
+
+class TestFindFiles(unittest.TestCase):
+    # Tests for finding the markdown files in a vault.
+    # 1. Markdown files in nested folders are found.
+    # 2. Obsidian's settings, trash and template folders are skipped.
+    # 3. Include and exclude patterns can be customized.
+    # 4. Files are yielded lazily.
+
+    def setUp(self) -> None:
+        self.vault = Path(tempfile.mkdtemp())
+        for relative_path in [
+            "top.md",
+            "image.png",
+            "People/NPCs/bob.md",
+            "Places/tavern.md",
+            "Places/notes.txt",
+            ".obsidian/workspace.md",
+            ".trash/deleted.md",
+            "Templates/character.md",
+        ]:
+            path = self.vault / relative_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("# Note")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.vault)
+
+    def __find(self, **kwargs) -> set[str]:
+        return {
+            Path(path).relative_to(self.vault).as_posix()
+            for path in files.find_files(self.vault, **kwargs)
+        }
+
+    def test_finds_nested_files(self):
+        # Test 1 and 2: Find the markdown files with the default settings.
+        # Expected Result: Nested notes should be found, and excluded folders skipped.
+        self.assertEqual(
+            self.__find(), {"top.md", "People/NPCs/bob.md", "Places/tavern.md"}
+        )
+
+    def test_not_recursive(self):
+        # Test 1: Only search the top level.
+        # Expected Result: Only the top-level note should be found.
+        self.assertEqual(self.__find(recursive=False), {"top.md"})
+
+    def test_custom_patterns(self):
+        # Test 3: Change the include patterns, and exclude the NPCs folder.
+        # Expected Result: Only files matching the include patterns and outside the excluded folder should be found.
+        self.assertEqual(self.__find(include=["People/*.md"]), {"People/NPCs/bob.md"})
+        self.assertEqual(self.__find(include=["People/*.md"], exclude=["NPCs"]), set())
+        self.assertEqual(
+            self.__find(include=["*.png", "*.txt"]), {"image.png", "Places/notes.txt"}
+        )
+
+    def test_lazy(self):
+        # Test 4: Call find_files.
+        # Expected Result: A generator should be returned.
+        self.assertIsInstance(files.find_files(self.vault), types.GeneratorType)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import utils.image_resize as image_resize
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+@unittest.skipIf(Image is None, "Pillow isn't installed.")
+class TestImageResizer(unittest.TestCase):
+    # Tests for shrinking card images to their print size.
+    # 1. Large images are shrunk, keeping their format, and the result is cached.
+    # 2. Formats other than PNG and JPEG are converted, and the card's filename follows.
+    # 3. Images that are already small enough are used as they are.
+    # 4. Images that Pillow can't read are used as they are.
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache_directory = self.temp_dir / "cache"
+        self.resizer = image_resize.ImageResizer(self.cache_directory, 100)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_shrink_and_cache(self):
+        # Test 1: Prepare a 400x200 PNG with transparency twice.
+        # Expected Result: The cached copy should be 100x50 and still a PNG, and only be made once.
+        source = self.temp_dir / "token.png"
+        Image.new("RGBA", (400, 200), (255, 0, 0, 128)).save(source)  # type: ignore
+        cached_file, image_name = self.resizer.prepare(source, "token.png")
+        self.assertEqual(image_name, "token.png")
+        self.assertEqual(cached_file.parent, self.cache_directory)
+        with Image.open(cached_file) as image:  # type: ignore
+            self.assertEqual(image.size, (100, 50))
+            self.assertEqual(image.format, "PNG")
+            self.assertEqual(image.mode, "RGBA")
+        with mock.patch.object(
+            image_resize.ImageResizer, "_ImageResizer__resize"
+        ) as resize:
+            self.assertEqual(
+                self.resizer.prepare(source, "token.png"), (cached_file, image_name)
+            )
+        resize.assert_not_called()
+
+    def test_convert_format(self):
+        # Test 2: Prepare a small WebP image without transparency.
+        # Expected Result: It should be converted to a JPEG, and the extension added to the filename so it can't replace a real map.jpg.
+        source = self.temp_dir / "map.webp"
+        Image.new("RGB", (50, 50), (0, 128, 0)).save(source, "WEBP")  # type: ignore
+        cached_file, image_name = self.resizer.prepare(source, "maps/map.webp")
+        self.assertEqual(image_name, "maps/map.webp.jpg")
+        with Image.open(cached_file) as image:  # type: ignore
+            self.assertEqual(image.format, "JPEG")
+
+    def test_small_image(self):
+        # Test 3: Prepare a JPEG that is already small enough.
+        # Expected Result: The original should be used, and nothing cached.
+        source = self.temp_dir / "portrait.jpg"
+        Image.new("RGB", (80, 100)).save(source, "JPEG")  # type: ignore
+        self.assertEqual(
+            self.resizer.prepare(source, "portrait.jpg"), (source, "portrait.jpg")
+        )
+        self.assertFalse(self.cache_directory.exists())
+
+    def test_unreadable_image(self):
+        # Test 4: Prepare an SVG image, which Pillow can't decode.
+        # Expected Result: The original should be used, with its name unchanged.
+        source = self.temp_dir / "crest.svg"
+        source.write_text('<svg xmlns="http://www.w3.org/2000/svg"/>')
+        self.assertEqual(
+            self.resizer.prepare(source, "crest.svg"), (source, "crest.svg")
+        )
+        self.assertFalse(self.cache_directory.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import main
+import utils.image_store as image_store
+
+
+class TestImageStore(unittest.TestCase):
+    # Tests for writing card images by their content.
+    # 1. An image that is already in the output isn't written again.
+    # 2. Identical images are written once and linked, without linking to the input.
+    # 3. An image that changes is written again.
+    # 4. Fixing an image's extension doesn't add a file to the input directory.
+    # 5. An image isn't linked to an earlier output that has since been overwritten.
+    # 6. An output whose content changed without changing its size or mtime is written again.
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.input_directory = self.temp_dir / "in"
+        self.output_directory = self.temp_dir / "out"
+        self.input_directory.mkdir()
+        self.output_directory.mkdir()
+        self.image = self.input_directory / "portrait.jpg"
+        shutil.copy("test/files/image-good.jpg", self.image)
+        self.store = image_store.ImageStore()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_skip_unchanged(self):
+        # Test 1: Write the same image twice, then again with a fresh store as a new run would.
+        # Expected Result: Only the first write should copy the image.
+        destination = self.output_directory / "portrait.jpg"
+        with mock.patch.object(
+            image_store.shutil, "copy2", wraps=shutil.copy2
+        ) as copy2, mock.patch.object(image_store, "clone_file", return_value=False):
+            self.store.write(self.image, destination)
+            self.store.write(self.image, destination)
+            image_store.ImageStore().write(self.image, destination)
+        copy2.assert_called_once()
+        self.assertEqual(destination.read_bytes(), self.image.read_bytes())
+
+    def test_identical_images(self):
+        # Test 2: Write an image and an identical copy of it under another name.
+        # Expected Result: The outputs should be the same file, and the input shouldn't be linked to either.
+        duplicate = self.input_directory / "copy.jpg"
+        shutil.copy(self.image, duplicate)
+        self.store.write(self.image, self.output_directory / "portrait.jpg")
+        self.store.write(duplicate, self.output_directory / "copy.jpg")
+        self.assertTrue(
+            os.path.samefile(
+                self.output_directory / "portrait.jpg",
+                self.output_directory / "copy.jpg",
+            )
+        )
+        self.assertEqual(os.stat(self.image).st_nlink, 1)
+        self.assertEqual(
+            sorted(path.name for path in self.output_directory.iterdir()),
+            ["copy.jpg", "portrait.jpg"],
+        )
+
+    def test_changed_image(self):
+        # Test 3: Write an image, then change it and write it again.
+        # Expected Result: The output should have the new contents.
+        destination = self.output_directory / "portrait.jpg"
+        self.store.write(self.image, destination)
+        self.image.write_bytes(self.image.read_bytes() + b"\0")
+        self.store.write(self.image, destination)
+        self.assertEqual(destination.read_bytes(), self.image.read_bytes())
+
+    def test_overwritten_output(self):
+        # Test 5: Write an image, overwrite its output through the store or from outside it, then write the first image under another name.
+        # Expected Result: The new output should have the first image's contents.
+        other = self.input_directory / "other.jpg"
+        other.write_bytes(self.image.read_bytes() + b"\0")
+        overwrites = {
+            "store": lambda store, path: store.write(other, path),
+            "outside": lambda store, path: path.write_bytes(b"not an image"),
+        }
+        for name, overwrite in overwrites.items():
+            with self.subTest(overwrite=name):
+                store = image_store.ImageStore()
+                first = self.output_directory / f"{name}-first.jpg"
+                second = self.output_directory / f"{name}-second.jpg"
+                store.write(self.image, first)
+                overwrite(store, first)
+                store.write(self.image, second)
+                self.assertEqual(second.read_bytes(), self.image.read_bytes())
+
+    def test_changed_output_with_same_metadata(self):
+        # Test 6: Write an image, change a byte of its output and restore the output's mtime, then write the image again with the same and with a fresh store.
+        # Expected Result: Each write should copy the image again.
+        destination = self.output_directory / "portrait.jpg"
+        self.store.write(self.image, destination)
+        for store in (self.store, image_store.ImageStore()):
+            with self.subTest(fresh=store is not self.store):
+                stat = os.stat(destination)
+                contents = bytearray(destination.read_bytes())
+                contents[-1] ^= 0xFF
+                destination.write_bytes(contents)
+                os.utime(destination, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                store.write(self.image, destination)
+                self.assertEqual(destination.read_bytes(), self.image.read_bytes())
+
+    def test_input_untouched(self):
+        # Test 4: Process a JPEG image whose name ends in .png.
+        # Expected Result: The output should be named .jpg, and the input directory should be unchanged.
+        shutil.copy("test/files/image-good.jpg", self.input_directory / "map.png")
+        before = sorted(path.name for path in self.input_directory.iterdir())
+        image_name = main.process_card_image(
+            "map.png", self.input_directory, self.output_directory
+        )
+        self.assertEqual(image_name, "map.jpg")
+        self.assertTrue((self.output_directory / "map.jpg").exists())
+        self.assertEqual(
+            sorted(path.name for path in self.input_directory.iterdir()), before
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
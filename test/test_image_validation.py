@@ -1,5 +1,6 @@
 import unittest
 from pathlib import Path
+from unittest import mock
 
 import utils.image as image
 
@@ -42,5 +43,59 @@ class TestImageValidation(unittest.TestCase):
             new_filepath.unlink()
 
 
+class TestImageInspector(unittest.TestCase):
+    # Tests for the shared image inspector.
+    # 1. Common image formats are identified from their signatures without libmagic.
+    # 2. Other files fall back to libmagic.
+    # 3. Each file is only sniffed once.
+
+    def setUp(self) -> None:
+        self.inspector = image.ImageInspector()
+        self.IMAGE_FILE: Path = Path("test/files/image-good.jpg")
+        self.TEXT_FILE: Path = Path("test/files/text.txt")
+        self.MISMATCHED_FILE: Path = Path("test/files/image-mismatched.png")
+
+    def test_signature_fast_path(self):
+        # Test 1: Identify JPEG files.
+        # Expected Result: The MIME type should be found without creating a libmagic handle.
+        with mock.patch("utils.image.magic.Magic") as magic_class:
+            self.assertEqual(
+                self.inspector.get_mime_type(self.IMAGE_FILE), "image/jpeg"
+            )
+            self.assertFalse(self.inspector.does_extension_match(self.MISMATCHED_FILE))
+        magic_class.assert_not_called()
+
+    def test_signature_mime_types(self):
+        # Test 2: Identify the signatures of each common image format.
+        # Expected Result: The MIME type should match the format.
+        self.assertEqual(
+            image.get_signature_mime_type(b"\x89PNG\r\n\x1a\n\x00"), "image/png"
+        )
+        self.assertEqual(image.get_signature_mime_type(b"GIF89a\x00"), "image/gif")
+        self.assertEqual(
+            image.get_signature_mime_type(b"RIFF\x00\x00\x00\x00WEBPVP8 "),
+            "image/webp",
+        )
+        self.assertIsNone(image.get_signature_mime_type(b"Plain text"))
+
+    def test_magic_fallback(self):
+        # Test 3: Identify a text file.
+        # Expected Result: The file should be identified by libmagic and not be an image.
+        with mock.patch(
+            "utils.image.magic.Magic", wraps=image.magic.Magic
+        ) as magic_class:
+            self.assertFalse(self.inspector.is_image(self.TEXT_FILE))
+        magic_class.assert_called_once_with(mime=True)
+
+    def test_sniffs_once(self):
+        # Test 4: Run every check on the same file.
+        # Expected Result: The file should only be opened once.
+        with mock.patch("builtins.open", wraps=open) as open_file:
+            self.inspector.is_image(self.TEXT_FILE)
+            self.inspector.does_extension_match(self.TEXT_FILE)
+            self.inspector.get_mime_type(self.TEXT_FILE)
+        self.assertEqual(open_file.call_count, 1)
+
+
 if __name__ == "__main__":
     unittest.main()
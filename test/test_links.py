@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import main
+from obsidian import rpg_pages
+from obsidian.links import (
+    LinkIndex,
+    LinkTarget,
+    build_link_index,
+    normalize_link,
+    read_link_target,
+)
+from utils.manifest import BuildManifest
+
+
+class TestLinkIndex(unittest.TestCase):
+    # Tests for resolving wikilinks to the notes they point to.
+    # 1. Links are normalized regardless of case, brackets, alt text, folders, extensions and headings.
+    # 2. Notes are found by filename, title or alias, in that order of precedence.
+    # 3. The title and aliases are read from the start of the file.
+    # 4. A character's location is replaced with the name of the location's card.
+    # 5. Cached cards are parsed again when the index changes.
+    # 6. A frontmatter link with alt text is resolved by its target, not its alt text.
+    # 7. Adding a note only parses the new note, since no cached card's links resolve differently.
+
+    def setUp(self) -> None:
+        self.vault = Path(tempfile.mkdtemp())
+        self.tavern = self.__write(
+            "Places/tavern.md",
+            "---\n# A YAML comment\ntags:\n- location\naliases:\n- The Tavern\n---\n\n# The Yawning Portal\n\n## Description\nA tavern.\n",
+        )
+        self.character = self.__write(
+            "bob.md",
+            '---\ntags:\n- character\nlocation: "[[The Tavern]]"\n---\n\n# Bob\n\n## Description\nA barbarian.\n',
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.vault)
+
+    def __write(self, relative_path: str, text: str) -> str:
+        path = self.vault / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        return str(path)
+
+    def test_normalize_link(self):
+        # Test 1: Normalize links written in different ways.
+        # Expected Result: Each should reduce to the lowercase name of the note.
+        for link in [
+            "Waterdeep",
+            "[[waterdeep]]",
+            "[[Places/Waterdeep.md#Docks|the city]]",
+            " WATERDEEP^block ",
+        ]:
+            with self.subTest(link=link):
+                self.assertEqual(normalize_link(link), "waterdeep")
+
+    def test_precedence(self):
+        # Test 2: Index notes whose filenames, titles and aliases overlap.
+        # Expected Result: Filenames should win over titles, and titles over aliases.
+        by_filename = LinkTarget(
+            path="a/Neverwinter.md", title="The Jewel of the North"
+        )
+        by_title = LinkTarget(path="b.md", title="Neverwinter", aliases=["Jewel"])
+        by_alias = LinkTarget(
+            path="c.md", title="Other", aliases=["The Jewel of the North"]
+        )
+        index = LinkIndex([by_alias, by_title, by_filename])
+        self.assertIs(index.resolve("[[neverwinter]]"), by_filename)
+        self.assertIs(index.resolve("The Jewel of the North"), by_filename)
+        self.assertIs(index.resolve("Jewel"), by_title)
+        self.assertIsNone(index.resolve("Luskan"))
+        self.assertEqual(len(index), 3)
+
+    def test_read_link_target(self):
+        # Test 3: Read a note whose frontmatter has a comment that looks like a heading.
+        # Expected Result: The title should come from the first heading after the frontmatter.
+        target = read_link_target(self.tavern)
+        self.assertEqual(target.title, "The Yawning Portal")
+        self.assertEqual(target.aliases, ["The Tavern"])
+
+    def test_resolve_character_location(self):
+        # Test 4: Create a character whose location links to an alias of a location note.
+        # Expected Result: The location should be the title of the location's card.
+        index = build_link_index([self.tavern, self.character])
+        with open(self.character) as file:
+            character = rpg_pages.new_page(file.read(), index)
+        self.assertEqual(character.location, "The Yawning Portal")
+
+    def test_manifest_tracks_index(self):
+        # Test 5: Build with a manifest, retitle the location and build again.
+        # Expected Result: The character's card should show the new title, even though its own file didn't change.
+        manifest_path = self.vault / "manifest.json"
+        for title in ["The Yawning Portal", "The Portal"]:
+            self.__write(
+                "Places/tavern.md",
+                f"---\ntags:\n- location\naliases:\n- The Tavern\n---\n\n# {title}\n\n## Description\nA tavern.\n",
+            )
+            manifest = BuildManifest(manifest_path, "v1")
+            files = [self.tavern, self.character]
+            cards = main.parse_md_files(
+                files,
+                manifest=manifest,
+                link_index=main.build_link_index(files, manifest),
+            )
+            manifest.save()
+            location = cards[1]["lists"][1]["items"][0]["value"]
+            self.assertEqual(location, title)
+
+    def test_aliased_frontmatter_link(self):
+        # Test 6: Create characters whose location links to the tavern with alt text, quoted and unquoted.
+        # Expected Result: The location should be the title of the location's card, not the alt text.
+        index = build_link_index([self.tavern, self.character])
+        for location in ['"[[The Tavern|the inn]]"', "[[Places/tavern|the inn]]"]:
+            with self.subTest(location=location):
+                character = rpg_pages.new_page(
+                    f"---\ntags:\n- character\nlocation: {location}\n---\n\n# Bob\n\n## Description\nA barbarian.\n",
+                    index,
+                )
+                self.assertEqual(character.location, "The Yawning Portal")
+
+    def test_new_note_keeps_cache(self):
+        # Test 7: Build with a manifest, add an unrelated note and build again.
+        # Expected Result: Only the new note should be parsed, and the other cards reused.
+        manifest_path = self.vault / "manifest.json"
+        files = [self.tavern, self.character]
+        self.__build_with_manifest(manifest_path, files)
+        dagger = self.__write(
+            "dagger.md",
+            "---\ntags:\n- item\n---\n\n# Dagger\n\n## Description\nSharp.\n",
+        )
+        with mock.patch(
+            "main.parse_md_to_linked_card", wraps=main.parse_md_to_linked_card
+        ) as parse:
+            self.__build_with_manifest(manifest_path, files + [dagger])
+        self.assertEqual([call.args[0] for call in parse.call_args_list], [dagger])
+
+    def __build_with_manifest(self, manifest_path: Path, files: list[str]) -> None:
+        manifest = BuildManifest(manifest_path, "v1")
+        main.parse_md_files(
+            files,
+            manifest=manifest,
+            link_index=main.build_link_index(files, manifest),
+        )
+        manifest.save()
+
+
+if __name__ == "__main__":
+    unittest.main()
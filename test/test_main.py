@@ -0,0 +1,211 @@
+import shutil
+import tempfile
+import time
+import tracemalloc
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from unittest import mock
+
+import yaml
+
+import main
+import typst
+import utils.files as files
+from obsidian import decks
+
+
+class TestParseMarkdownFiles(unittest.TestCase):
+    # Tests for converting a directory of markdown files into card dicts.
+    # 1. Parsing in a process pool gives the same cards in the same order as parsing serially.
+
+    def setUp(self) -> None:
+        self.md_files = list(files.find_files(Path("test/files")))
+
+    def test_parallel_matches_serial(self):
+        # Test 1: Parse the test files serially and with a process pool.
+        # Expected Result: Both runs should return identical lists of cards.
+        serial_cards = main.parse_md_files(self.md_files, jobs=1)
+        parallel_cards = main.parse_md_files(self.md_files, jobs=2)
+        self.assertGreater(len(serial_cards), 0)
+        self.assertEqual(parallel_cards, serial_cards)
+
+
+class TestStreamCards(unittest.TestCase):
+    # Tests for the streaming build, which writes each card as soon as it is parsed.
+    # 1. The cards and copied images are the same as a serial build's, with overlapping I/O and parsing in worker processes.
+    # 2. Slow reads, like those from a network mount, are waited on at the same time.
+    # 3. Cards are written to the deck chosen for them, with each deck's images in its own directory.
+    # 4. The peak memory use stays flat as the vault grows.
+
+    def setUp(self) -> None:
+        self.md_files = main.find_card_files(files.find_files(Path("test/files")))
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def build(
+        self,
+        md_files: list[str],
+        output_directory: Path,
+        io_concurrency: int = 1,
+        jobs: int = 1,
+        router: decks.DeckRouter | None = None,
+    ) -> list[tuple[Path, dict]]:
+        output_directory.mkdir()
+        io_executor = (
+            ThreadPoolExecutor(max_workers=io_concurrency)
+            if io_concurrency > 1
+            else None
+        )
+        with io_executor or nullcontext():
+            return list(
+                main.write_decks(
+                    main.stream_cards(
+                        md_files,
+                        jobs,
+                        io_executor=io_executor,
+                        io_concurrency=io_concurrency,
+                    ),
+                    output_directory / "data.yaml",
+                    Path("test/files"),
+                    output_directory,
+                    router,
+                    io_executor=io_executor,
+                    io_concurrency=io_concurrency,
+                )
+            )
+
+    def test_matches_serial(self):
+        # Test 1: Build the test files serially, then with 8 I/O threads and 2 worker processes.
+        # Expected Result: The cards, the data files and the copied images should be identical.
+        serial_directory = self.temp_dir / "serial"
+        serial_directory.mkdir()
+        serial_cards = main.parse_md_files(self.md_files)
+        for card in serial_cards:
+            card["image"] = main.process_card_image(
+                card["image"], Path("test/files"), serial_directory
+            )
+        streamed_directory = self.temp_dir / "streamed"
+        streamed = self.build(self.md_files, streamed_directory, 8, 2)
+        self.assertGreater(len(serial_cards), 0)
+        self.assertEqual([card for _, card in streamed], serial_cards)
+        serial_yaml_directory = self.temp_dir / "serial-yaml"
+        serial_yaml_directory.mkdir()
+        with open(serial_yaml_directory / "data.yaml", "w") as file:
+            typst.write_cards(serial_cards, file)
+        self.assertEqual(
+            (streamed_directory / "data.yaml").read_text(),
+            (serial_yaml_directory / "data.yaml").read_text(),
+        )
+        self.assertEqual(
+            sorted(path.name for path in serial_directory.iterdir()),
+            sorted(
+                path.name
+                for path in streamed_directory.iterdir()
+                if path.name != "data.yaml"
+            ),
+        )
+
+    def test_overlapping_reads(self):
+        # Test 2: Build the test files with every read taking 50 ms.
+        # Expected Result: Reading eight at a time should take much less than reading them one by one.
+        read_md_file = main.read_md_file
+
+        def slow_read(filepath: str) -> str:
+            time.sleep(0.05)
+            return read_md_file(filepath)
+
+        with mock.patch.object(main, "read_md_file", slow_read):
+            start = time.perf_counter()
+            self.build(self.md_files, self.temp_dir / "streamed", 8)
+            elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, len(self.md_files) * 0.05 / 2)
+
+    def test_decks(self):
+        # Test 3: Build the test files split by page type, with 3 I/O threads.
+        # Expected Result: Each card should be written to its type's data file, and its image copied to its type's directory.
+        output_directory = self.temp_dir / "decks"
+        streamed = self.build(
+            self.md_files,
+            output_directory,
+            3,
+            router=decks.DeckRouter(split_by_type=True),
+        )
+        character_file = output_directory / "data-character.yaml"
+        self.assertIn(character_file, [path for path, _ in streamed])
+        self.assertIn(
+            output_directory / "data-item.yaml", [path for path, _ in streamed]
+        )
+        self.assertFalse((output_directory / "data.yaml").exists())
+        with open(character_file) as file:
+            characters = yaml.safe_load(file)["cards"]
+        self.assertEqual(
+            characters, [card for path, card in streamed if path == character_file]
+        )
+        self.assertTrue((output_directory / "character" / "image-good.jpg").exists())
+
+    def test_flat_memory(self):
+        # Test 4: Build a vault of 60 notes and one of 240 notes, tracing memory, after a first build that loads what every build shares.
+        # Expected Result: The larger vault's peak should be less than twice the smaller vault's, where keeping every card would make it about 4 times as large.
+        note = Path("test/files/standard-character.md").read_text()
+
+        def peak_memory(notes: int) -> int:
+            vault = self.temp_dir / f"vault-{notes}"
+            vault.mkdir()
+            for index in range(notes):
+                (vault / f"note-{index}.md").write_text(
+                    note.replace("# Bob the Barbarian", f"# Bob the Barbarian {index}")
+                    + "A long description. " * 200
+                )
+            md_files = main.find_card_files(files.find_files(vault))
+            output_directory = self.temp_dir / f"out-{notes}"
+            output_directory.mkdir()
+            tracemalloc.start()
+            try:
+                # Go through the written cards without keeping them.
+                for _ in main.write_decks(
+                    main.stream_cards(md_files),
+                    output_directory / "data.yaml",
+                    Path("test/files"),
+                    output_directory,
+                ):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        peak_memory(10)
+        small_peak = peak_memory(60)
+        large_peak = peak_memory(240)
+        self.assertLess(large_peak, small_peak * 2)
+
+
+class TestParseArgs(unittest.TestCase):
+    # Tests for checking the command line arguments.
+    # 1. Sizes and counts must be whole numbers of at least 1.
+
+    def test_positive_int(self):
+        # Test 1: Parse --max-cards-per-deck and --image-max-size with valid and invalid values.
+        # Expected Result: 1 and 12 should be accepted, and 0, -3 and 'two' rejected with an argparse error.
+        for option in ("--max-cards-per-deck", "--image-max-size"):
+            destination = option.removeprefix("--").replace("-", "_")
+            for value, expected in (("1", 1), ("12", 12)):
+                with self.subTest(option=option, value=value):
+                    with mock.patch("sys.argv", ["main.py", option, value]):
+                        self.assertEqual(
+                            getattr(main.parse_args(), destination), expected
+                        )
+            for value in ("0", "-3", "two"):
+                with self.subTest(option=option, value=value):
+                    with mock.patch("sys.argv", ["main.py", option, value]), mock.patch(
+                        "sys.stderr"
+                    ):
+                        with self.assertRaises(SystemExit):
+                            main.parse_args()
+
+
+if __name__ == "__main__":
+    unittest.main()
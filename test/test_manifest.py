@@ -0,0 +1,79 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import main
+import utils.manifest as manifest
+from utils.manifest import BuildManifest
+
+
+class TestBuildManifest(unittest.TestCase):
+    # Tests for the incremental build manifest.
+    # 1. Unchanged files reuse their cached cards without being parsed.
+    # 2. Changed files are parsed again.
+    # 3. A new parser version discards the cache.
+    # 4. The parser version changes when main.py or a parser module changes.
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.md_file = str(self.temp_dir / "standard-character.md")
+        shutil.copy("test/files/standard-character.md", self.md_file)
+        self.manifest_path = self.temp_dir / "manifest.json"
+        self.cards = self.__build(BuildManifest(self.manifest_path, "v1"))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def __build(self, manifest: BuildManifest) -> list[dict]:
+        cards = main.parse_md_files([self.md_file], manifest=manifest)
+        manifest.save()
+        return cards
+
+    def test_unchanged_file_is_cached(self):
+        # Test 1: Build again without changing the file.
+        # Expected Result: The same cards should be returned without parsing the file.
+        with mock.patch("main.parse_md_to_linked_card") as parse:
+            cards = self.__build(BuildManifest(self.manifest_path, "v1"))
+        parse.assert_not_called()
+        self.assertEqual(cards, self.cards)
+
+    def test_changed_file_is_parsed(self):
+        # Test 2: Build again after renaming the character.
+        # Expected Result: The card should have the new name.
+        text = Path(self.md_file).read_text()
+        Path(self.md_file).write_text(text.replace("# Bob the Barbarian", "# Bob"))
+        cards = self.__build(BuildManifest(self.manifest_path, "v1"))
+        self.assertEqual(cards[0]["name"], "Bob")
+
+    def test_parser_version_invalidates_cache(self):
+        # Test 3: Build again with a different parser version.
+        # Expected Result: The file should be parsed again.
+        with mock.patch(
+            "main.parse_md_to_linked_card", wraps=main.parse_md_to_linked_card
+        ) as parse:
+            cards = self.__build(BuildManifest(self.manifest_path, "v2"))
+        parse.assert_called_once_with(self.md_file, None)
+        self.assertEqual(cards, self.cards)
+
+    def test_parser_version_sources(self):
+        # Test 4: Get the parser version of a copy of the sources, then change main.py and a parser module.
+        # Expected Result: The version should change each time.
+        self.assertIn(Path(main.__file__).resolve(), manifest.PARSER_SOURCES)
+        sources = [self.temp_dir / "main.py", self.temp_dir / "obsidian"]
+        sources[0].write_text("")
+        sources[1].mkdir()
+        (sources[1] / "parser.py").write_text("")
+        versions = []
+        with mock.patch.object(manifest, "PARSER_SOURCES", sources):
+            versions.append(manifest.get_parser_version())
+            sources[0].write_text("# Builds the cards.")
+            versions.append(manifest.get_parser_version())
+            (sources[1] / "parser.py").write_text("# Parses the notes.")
+            versions.append(manifest.get_parser_version())
+        self.assertEqual(len(set(versions)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
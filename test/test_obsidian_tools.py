@@ -1,6 +1,13 @@
+import glob
+import shutil
+import tempfile
+import time
 import unittest
+from pathlib import Path
+from unittest import mock
 
 import obsidian.parser as op
+import obsidian.rpg_pages as rpg_pages
 import utils.string as string_utils
 
 
@@ -46,6 +53,42 @@ class TestObsidianTools(unittest.TestCase):
         # Expected Result: The function should return a list with the expected structure.
         self.assertEqual(self.data.images, ["image1.png", "image2.jpg"])
 
+    def test_scan_text(self):
+        # Test the scan_text function.
+        # Test 1: Test the scan_text function with every form of Dataview field, a repeated key, links and image embeds.
+        # Expected Result: The links should be replaced, every value of the repeated key kept in order, and each image found once.
+        text = (
+            "- race:: Human\n"
+            "(race:: Elf) [Group Name:: [[Possums|The Possums]]]\n"
+            "Met at [[Inn]]. ![[portrait.png|300]] [[map.webp]]\n"
+        )
+        scanned = op.scan_text(text)
+        self.assertEqual(
+            scanned.text_without_wikilinks,
+            "- race:: Human\n"
+            "(race:: Elf) [Group Name:: The Possums]\n"
+            "Met at Inn. ![[portrait.png|300]] map.webp\n",
+        )
+        self.assertEqual(
+            scanned.dataview_fields,
+            {"race": ["Human", "Elf"], "group-name": ["The Possums"]},
+        )
+        self.assertEqual(scanned.images, ["portrait.png", "map.webp"])
+        # Test 2: Test the scan_text function with a link before an image embed on the same line.
+        # Expected Result: The image filename should not include the link before it.
+        self.assertEqual(op.scan_text("[[Bob]] ![[bob.jpg]]").images, ["bob.jpg"])
+        # Test 3: Time a key repeated many times, at two sizes.
+        # Expected Result: Eight times as many values should take far less than 64 times as long, which is how rebuilding the list for each value scales.
+        timings = []
+        for count in [2000, 16000]:
+            text = "[tag:: value]\n" * count
+            start = time.perf_counter()
+            for _ in range(5):
+                fields = op.scan_text(text).dataview_fields
+            timings.append(time.perf_counter() - start)
+            self.assertEqual(len(fields["tag"]), count)
+        self.assertLess(timings[1], timings[0] * 24)
+
     def test_get_content(self):
         # Test the get_content function.
         # Test 1: Test the get_content function with a simple markdown file.
@@ -84,6 +127,38 @@ class TestObsidianTools(unittest.TestCase):
         alt_text = "This is a [[wikilink|with alt text]]."
         alt_text_result = string_utils.remove_wikilinks(alt_text)
         self.assertEqual(alt_text_result, "This is a with alt text.")
+        # Test 5: Test the remove_wikilinks function with a link to a file that is also embedded.
+        # Expected Result: The embed should be left alone.
+        embed_and_link = "This is a [[wikilink]] and an ![[wikilink]]."
+        self.assertEqual(
+            string_utils.remove_wikilinks(embed_and_link),
+            "This is a wikilink and an ![[wikilink]].",
+        )
+
+    def test_remove_wikilinks_pathological(self):
+        # Test the remove_wikilinks function with very large inputs.
+        # Test 1: Test a note with 5,000 links, alt text and embeds.
+        # Expected Result: Every link should be replaced and every embed left alone.
+        text = "".join(
+            f"[[Note {index}|Alias {index}]], [[Note {index}]] ![[image{index}.png]]\n"
+            for index in range(5000)
+        )
+        expected = "".join(
+            f"Alias {index}, Note {index} ![[image{index}.png]]\n"
+            for index in range(5000)
+        )
+        self.assertEqual(string_utils.remove_wikilinks(text), expected)
+        # Test 2: Time notes made of many links, and a line of unclosed brackets, at two sizes.
+        # Expected Result: Eight times as much text should take far less than 64 times as long, which is how a quadratic rewriter scales.
+        for unit in ["[[Note|Alias]] and [[Note]]. ", "[[ "]:
+            timings = []
+            for count in [2000, 16000]:
+                text = unit * count
+                start = time.perf_counter()
+                for _ in range(5):
+                    string_utils.remove_wikilinks(text)
+                timings.append(time.perf_counter() - start)
+            self.assertLess(timings[1], timings[0] * 24)
 
     def test_obsidian_page_data(self):
         # Test the ObsidianPageData class.
@@ -108,5 +183,92 @@ class TestObsidianTools(unittest.TestCase):
         self.assertEqual(self.data.images, ["image1.png", "image2.jpg"])
 
 
+class TestFrontmatterSniffing(unittest.TestCase):
+    # Tests for reading only the frontmatter of a file to skip notes that aren't cards.
+    # 1. The frontmatter is read without the body.
+    # 2. Files that are rejected would also fail to become cards.
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_read_frontmatter(self):
+        # Test 1: Read the frontmatter of a file whose body ends with bytes that aren't valid UTF-8.
+        # Expected Result: The frontmatter should be returned, because the end of the body is never read.
+        path = self.temp_dir / "note.md"
+        body = b"# Body\n" + b"Long text.\n" * 100_000 + b"\xff\xfe\n"
+        path.write_bytes(b"\n---\ntags:\n- item/weapon\n---\n" + body)
+        self.assertEqual(op.read_frontmatter(str(path)), {"tags": ["item/weapon"]})
+        self.assertTrue(rpg_pages.is_card_file(str(path)))
+
+    def test_no_frontmatter(self):
+        # Test 1: Read files without frontmatter, and with unclosed frontmatter.
+        # Expected Result: An empty dict for the first, and None for the second since only a full parse can tell.
+        path = self.temp_dir / "note.md"
+        path.write_text("# Just a heading\n")
+        self.assertEqual(op.read_frontmatter(str(path)), {})
+        self.assertFalse(rpg_pages.is_card_file(str(path)))
+        path.write_text("---\ntags: [character]\n# No closing line\n")
+        self.assertIsNone(op.read_frontmatter(str(path)))
+        self.assertTrue(rpg_pages.is_card_file(str(path)))
+
+    def test_rejected_files_are_not_cards(self):
+        # Test 2: Check every test file.
+        # Expected Result: Every file that is rejected should fail to parse into a page.
+        for path in glob.glob("test/files/*.md"):
+            with self.subTest(path=path):
+                if rpg_pages.is_card_file(path):
+                    continue
+                with self.assertRaises((ValueError, AttributeError)):
+                    rpg_pages.new_page(Path(path).read_text())
+
+
+class TestLazyMarkdownData(unittest.TestCase):
+    # Tests for parsing MarkdownData's fields on first access.
+    # 1. Reading the tags doesn't parse the content.
+    # 2. Each field is parsed only once.
+    # 3. Notes without tags raise an AttributeError when their tags are read.
+    # 4. The full tags keep every level of a nested tag.
+
+    def setUp(self) -> None:
+        with open("test/files/standard-character.md", "r") as file:
+            self.text = file.read()
+
+    def test_tags_skip_content(self):
+        # Test 1: Identify the page type of a note.
+        # Expected Result: The content should never be parsed.
+        with mock.patch.object(op, "parse_sections") as parse_sections:
+            page_type = rpg_pages.get_page_type(op.MarkdownData(self.text))
+        parse_sections.assert_not_called()
+        self.assertEqual(page_type, rpg_pages.PageTypes.CHARACTER)
+
+    def test_memoized(self):
+        # Test 2: Read the content twice.
+        # Expected Result: The markdown should be parsed once, and the same dict returned both times.
+        data = op.MarkdownData(self.text)
+        with mock.patch.object(
+            op, "parse_sections", wraps=op.parse_sections
+        ) as parse_sections:
+            content = data.content
+            self.assertIs(data.content, content)
+        parse_sections.assert_called_once()
+
+    def test_no_tags(self):
+        # Test 3: Read the tags of a note without any.
+        # Expected Result: An AttributeError should be raised, as before the fields were lazy.
+        data = op.MarkdownData("---\nlocation: Waterdeep\n---\n# Note\n")
+        self.assertFalse(hasattr(data, "tags"))
+        self.assertEqual(data.frontmatter, {"location": "Waterdeep"})
+
+    def test_full_tags(self):
+        # Test 4: Read the tags of a note with a nested tag.
+        # Expected Result: `full_tags` should keep the nested tag, while `tags` keeps only its first segment.
+        data = op.MarkdownData("---\ntags:\n  - character/npc/villain\n---\n# Note\n")
+        self.assertEqual(data.full_tags, ["character/npc/villain"])
+        self.assertEqual(data.tags, ["character"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import main
+import utils.profiling as profiling
+
+
+class TestProfiling(unittest.TestCase):
+    # Tests for the per-stage build profiler.
+    # 1. Marking a stage does nothing while profiling is off.
+    # 2. Each stage of parsing a note is timed and counted.
+    # 3. The report includes the throughput and the slowest notes.
+
+    def tearDown(self) -> None:
+        profiling.stop_profiling()
+
+    def test_not_profiling(self):
+        # Test 1: Mark a stage without starting a profiler.
+        # Expected Result: The shared no-op context manager should be returned.
+        self.assertIs(profiling.stage("read"), profiling.NOT_PROFILING)
+        self.assertIs(profiling.note("note.md"), profiling.NOT_PROFILING)
+
+    def test_stages(self):
+        # Test 2: Parse two notes while profiling.
+        # Expected Result: Every stage should have been called once per note.
+        profiler = profiling.start_profiling()
+        files = ["test/files/standard-character.md", "test/files/location.md"]
+        main.parse_md_files(files)
+        for stage in [
+            "read",
+            "replace_uncommon_characters",
+            "markdown_data.scan",
+            "markdown_data.frontmatter",
+            "markdown_data.content",
+            "classify",
+            "build_page",
+            "build_card",
+        ]:
+            with self.subTest(stage=stage):
+                self.assertEqual(profiler.stages[stage].calls, 2)
+        self.assertEqual(list(profiler.notes), files)
+
+    def test_report(self):
+        # Test 3: Report on a build of three notes, keeping only the slowest two.
+        # Expected Result: The report should count the cards and list two notes, slowest first.
+        profiler = profiling.start_profiling()
+        cards = main.parse_md_files(
+            [
+                "test/files/standard-character.md",
+                "test/files/location.md",
+                "test/files/item-simple.md",
+            ]
+        )
+        report = profiler.report(len(cards), top=2)
+        self.assertEqual(report["cards"], 3)
+        self.assertGreater(report["cards_per_second"], 0)
+        self.assertEqual(len(report["slowest_notes"]), 2)
+        seconds = [note["seconds"] for note in report["slowest_notes"]]
+        self.assertEqual(seconds, sorted(seconds, reverse=True))
+        self.assertIn("cards/sec", profiling.format_report(report)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
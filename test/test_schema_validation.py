@@ -0,0 +1,96 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import typst
+
+
+class TestValidateCards(unittest.TestCase):
+    # Tests for validating a whole deck against a schema.
+    # 1. The schema is only loaded and compiled once.
+    # 2. Valid cards produce no errors.
+    # 3. Errors are reported against the card they belong to.
+    # 4. A single card is validated at its position in the deck.
+    # 5. The constraints on the deck as a whole are validated from its size.
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.schema_file = self.temp_dir / "data.schema.json"
+        schema = {
+            "type": "object",
+            "properties": {
+                "cards": {
+                    "type": "array",
+                    "maxItems": 3,
+                    "items": {
+                        "type": "object",
+                        "required": ["name", "template"],
+                        "properties": {
+                            "name": {"type": "string", "minLength": 1},
+                            "template": {"type": "string"},
+                        },
+                    },
+                }
+            },
+        }
+        self.schema_file.write_text(json.dumps(schema))
+        self.valid_card = typst.Card(
+            template="landscape-content-left", name="Bob", body_text=""
+        )
+        self.invalid_card = typst.Card(
+            template="landscape-content-left", name="", body_text=""
+        )
+
+    def tearDown(self) -> None:
+        typst.get_validator.cache_clear()
+        shutil.rmtree(self.temp_dir)
+
+    def test_schema_is_cached(self):
+        # Test 1: Get the validator twice.
+        # Expected Result: The same compiled validator should be returned.
+        self.assertIs(
+            typst.get_validator(self.schema_file), typst.get_validator(self.schema_file)
+        )
+
+    def test_valid_cards(self):
+        # Test 2: Validate a deck of valid cards, given as objects and as dicts.
+        # Expected Result: There should be no errors.
+        errors = typst.validate_cards(
+            [self.valid_card, {"name": "Alice", "template": "x"}], self.schema_file
+        )
+        self.assertEqual(errors, [])
+
+    def test_invalid_card(self):
+        # Test 3: Validate a deck where the third card has an empty name.
+        # Expected Result: One error should be reported against the third card's name.
+        errors = typst.validate_cards(
+            [self.valid_card, self.valid_card, self.invalid_card], self.schema_file
+        )
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].card_index, 2)
+        self.assertEqual(errors[0].path, "name")
+
+    def test_validate_card(self):
+        # Test 4: Validate the card at position 5 of a deck, once valid and once with an empty name.
+        # Expected Result: Only the invalid card should have an error, reported against position 5.
+        self.assertEqual(typst.validate_card(self.valid_card, 5, self.schema_file), [])
+        errors = typst.validate_card(self.invalid_card, 5, self.schema_file)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].card_index, 5)
+        self.assertEqual(errors[0].card_name, "")
+        self.assertEqual(errors[0].path, "name")
+
+    def test_validate_deck(self):
+        # Test 5: Validate decks of 3 and 4 cards against a schema that allows at most 3 cards.
+        # Expected Result: Only the deck of 4 should have an error, reported against the cards array rather than a card.
+        self.assertEqual(typst.validate_deck(3, self.schema_file), [])
+        errors = typst.validate_deck(4, self.schema_file)
+        self.assertEqual(len(errors), 1)
+        self.assertIsNone(errors[0].card_index)
+        self.assertEqual(errors[0].path, "cards")
+
+
+if __name__ == "__main__":
+    unittest.main()
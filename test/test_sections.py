@@ -0,0 +1,136 @@
+import json
+import random
+import unittest
+from pathlib import Path
+
+import frontmatter
+import markdown_to_json
+
+from obsidian.rpg_pages import Item
+from obsidian.sections import find_section, parse_sections
+
+
+def parse_with_markdown_to_json(text: str) -> dict:
+    return json.loads(markdown_to_json.jsonify(text))
+
+
+class TestParseSections(unittest.TestCase):
+    # Tests for building the heading-section tree.
+    # 1. The tree matches markdown_to_json for the test notes.
+    # 2. The tree matches markdown_to_json for randomly generated documents.
+    # 3. Lists, code and text before the first subheading are handled like markdown_to_json does.
+    # 4. Empty documents raise a ValueError.
+
+    LINES = [
+        "# Name",
+        "## Description",
+        "### Appearance",
+        "#### Clothes ####",
+        "Some text with *emphasis*.",
+        "  Indented text",
+        "    code",
+        "\tcode",
+        "- item",
+        "* item",
+        "1. first",
+        "2) second",
+        "  - nested item",
+        "",
+        "> quote",
+        "```",
+        "~~~ python",
+        "---",
+        "===",
+        "<div>",
+        "[link]: https://example.com",
+    ]
+
+    def test_test_notes(self):
+        # Test 1: Parse every note in the test folder.
+        # Expected Result: The sections should be the same as markdown_to_json's.
+        for path in Path("test/files").rglob("*.md"):
+            _, text = frontmatter.parse(path.read_text(encoding="utf-8"))
+            with self.subTest(path=path):
+                self.assertEqual(
+                    parse_sections(text), parse_with_markdown_to_json(text)
+                )
+
+    def test_random_documents(self):
+        # Test 2: Parse random combinations of headings, lists, code and other blocks.
+        # Expected Result: The sections should be the same as markdown_to_json's.
+        generator = random.Random(0)
+        for _ in range(2000):
+            text = "\n".join(
+                generator.choice(self.LINES) for _ in range(generator.randint(1, 12))
+            )
+            with self.subTest(text=text):
+                try:
+                    expected = parse_with_markdown_to_json(text)
+                except ValueError:
+                    with self.assertRaises(ValueError):
+                        parse_sections(text)
+                    continue
+                self.assertEqual(parse_sections(text), expected)
+
+    def test_section_values(self):
+        # Test 3: Parse a note with a list, a code block and text before the first subheading.
+        # Expected Result: Lists become lists of strings, and the text before the subheadings is dropped.
+        text = (
+            "# Name\n"
+            "Dropped text\n"
+            "## Occupants\n"
+            "- Bob\n"
+            "  - Bob's dog\n"
+            "- Alice\n"
+            "## Notes\n"
+            "First paragraph\n"
+            "\n"
+            "```\n"
+            "code\n"
+            "```\n"
+        )
+        self.assertEqual(
+            parse_sections(text),
+            {
+                "Name": {
+                    "Occupants": ["Bob", ["Bob's dog"], "Alice"],
+                    "Notes": "First paragraph\n\n```\ncode\n```",
+                }
+            },
+        )
+
+    def test_empty_document(self):
+        # Test 4: Parse a document with only blank lines.
+        # Expected Result: A ValueError should be raised, the same as markdown_to_json.
+        with self.assertRaises(ValueError):
+            parse_sections("\n\n")
+
+
+class TestFindSection(unittest.TestCase):
+    # Tests for looking up sections by their headings.
+    # 1. Headings are matched regardless of case and surrounding whitespace.
+    # 2. Missing sections and content without sections return None.
+    # 3. Cards use the lookup for their sections.
+
+    def test_case_insensitive(self):
+        # Test 1: Look up a section with a differently cased heading.
+        # Expected Result: The section should be found.
+        content = {"Story hook ": "A rumor", "Description": "A place"}
+        self.assertEqual(find_section(content, "Story Hook"), "A rumor")
+        self.assertEqual(find_section(content, "description"), "A place")
+
+    def test_missing_section(self):
+        # Test 2: Look up a section that doesn't exist, and a section in a note without subheadings.
+        # Expected Result: None should be returned.
+        self.assertIsNone(find_section({"Description": "A place"}, "Occupants"))
+        self.assertIsNone(find_section("Just a description", "Description"))
+
+    def test_item_description(self):
+        # Test 3: Create an item whose description heading is lowercase.
+        # Expected Result: The description should still be found.
+        item = Item("---\ntags:\n- item\n---\n# Sword\n## description\nSharp.\n")
+        self.assertEqual(item.description, "Sharp.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import main
+from utils.vault_index import VaultIndex, compile_query
+
+
+class TestVaultIndex(unittest.TestCase):
+    # Tests for the SQLite vault index and its queries.
+    # 1. Queries match page types, nested tags and frontmatter fields.
+    # 2. Unchanged notes aren't parsed again, and their cards are read from the index.
+    # 3. Changed notes are parsed again, and deleted notes are removed.
+    # 4. Malformed queries raise a ValueError.
+    # 5. Adding a note only parses the notes whose links now resolve to it.
+    # 6. A note edited while it is parsed is parsed again on the next refresh.
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.md_files = []
+        for name in ("standard-character.md", "location.md", "item-simple.md"):
+            shutil.copy(f"test/files/{name}", self.temp_dir / name)
+            self.md_files.append(str(self.temp_dir / name))
+        self.index_path = self.temp_dir / "index.sqlite"
+        with VaultIndex(self.index_path, "v1") as vault_index:
+            self.parsed_count = main.refresh_index(vault_index, self.md_files)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def __find(self, query: str) -> list[str]:
+        with VaultIndex(self.index_path, "v1") as vault_index:
+            return sorted(Path(file).name for file in vault_index.find_pages(query))
+
+    def test_queries(self):
+        # Test 1: Run queries on a character, a location and an item.
+        # Expected Result: Each query should match the notes it describes.
+        self.assertEqual(self.parsed_count, 3)
+        self.assertEqual(self.__find("type=item"), ["item-simple.md"])
+        self.assertEqual(self.__find("tag:location"), ["location.md"])
+        self.assertEqual(self.__find("tag:#location/service/*"), ["location.md"])
+        self.assertEqual(self.__find("tag:location/*/shop"), [])
+        self.assertEqual(
+            self.__find("not type=character and not type=item"), ["location.md"]
+        )
+        self.assertEqual(
+            self.__find("(type=item or RACE=human) and not tag:location"),
+            ["item-simple.md", "standard-character.md"],
+        )
+        self.assertEqual(self.__find('location="*north ward*"'), ["location.md"])
+
+    def test_unchanged_notes_are_not_parsed(self):
+        # Test 2: Touch a note without changing it, refresh the index and read the characters.
+        # Expected Result: No note should be parsed, and the card should match the one parsed directly.
+        Path(self.md_files[0]).touch()
+        with VaultIndex(self.index_path, "v1") as vault_index:
+            with mock.patch("main.parse_md_to_indexed_page") as parse:
+                self.assertEqual(main.refresh_index(vault_index, self.md_files), 0)
+            cards = list(
+                main.stream_indexed_cards(vault_index, self.md_files, "type=character")
+            )
+        parse.assert_not_called()
+        self.assertEqual(
+            cards,
+            [(self.md_files[0], main.parse_md_to_card_dict(self.md_files[0]))],
+        )
+
+    def test_changed_and_deleted_notes(self):
+        # Test 3: Rename the character, delete the item and refresh the index.
+        # Expected Result: Only the character should be parsed again, and the item should no longer match.
+        text = Path(self.md_files[0]).read_text()
+        Path(self.md_files[0]).write_text(text.replace("# Bob the Barbarian", "# Bob"))
+        md_files = self.md_files[:2]
+        with VaultIndex(self.index_path, "v1") as vault_index:
+            with mock.patch(
+                "main.parse_md_to_indexed_page", wraps=main.parse_md_to_indexed_page
+            ) as parse:
+                main.refresh_index(vault_index, md_files)
+            parse.assert_called_once_with(self.md_files[0], None)
+            self.assertEqual(vault_index.get_card(self.md_files[0])["name"], "Bob")  # type: ignore
+            self.assertIsNone(vault_index.get_card(self.md_files[2]))
+        self.assertEqual(self.__find("type=item"), [])
+
+    def test_malformed_queries(self):
+        # Test 4: Compile queries with missing values, operators and parentheses.
+        # Expected Result: Each should raise a ValueError.
+        for query in (
+            "",
+            "type=",
+            "rarity",
+            "tag:",
+            "type=item and",
+            "(type=item",
+            "or type=item",
+            "type=item)",
+        ):
+            with self.subTest(query=query):
+                with self.assertRaises(ValueError):
+                    compile_query(query)
+
+    def test_new_notes_and_links(self):
+        # Test 5: Index a tavern and a character linking to it, then add an unrelated dagger, then a note named after the link.
+        # Expected Result: Only the dagger should be parsed at first, then the new note and the character, whose link now resolves to it.
+        tavern = self.__write(
+            "tavern.md",
+            "---\ntags:\n- location\naliases:\n- The Tavern\n---\n\n# The Yawning Portal\n\n## Description\nA tavern.\n",
+        )
+        character = self.__write(
+            "bob.md",
+            '---\ntags:\n- character\nlocation: "[[The Tavern]]"\n---\n\n# Bob\n\n## Description\nA barbarian.\n',
+        )
+        md_files = [tavern, character]
+        self.assertEqual(self.__refresh_with_links(md_files), md_files)
+        dagger = self.__write(
+            "dagger.md",
+            "---\ntags:\n- item\n---\n\n# Dagger\n\n## Description\nSharp.\n",
+        )
+        md_files.append(dagger)
+        self.assertEqual(self.__refresh_with_links(md_files), [dagger])
+        other_tavern = self.__write(
+            "the tavern.md",
+            "---\ntags:\n- location\n---\n\n# The Other Tavern\n\n## Description\nAnother tavern.\n",
+        )
+        md_files.append(other_tavern)
+        self.assertEqual(
+            sorted(self.__refresh_with_links(md_files)),
+            sorted([character, other_tavern]),
+        )
+
+    def test_note_edited_while_parsed(self):
+        # Test 6: Rename the character, and rename it again just after it is read, then refresh the index twice.
+        # Expected Result: The first refresh should store the name that was parsed, and the second should parse the note again and store the newer name.
+        character = Path(self.md_files[0])
+        text = character.read_text()
+        character.write_text(text.replace("# Bob the Barbarian", "# Bob"))
+        parse_md_to_indexed_page = main.parse_md_to_indexed_page
+
+        def parse_then_edit(*args):
+            page = parse_md_to_indexed_page(*args)
+            character.write_text(text.replace("# Bob the Barbarian", "# Robert"))
+            return page
+
+        with VaultIndex(self.index_path, "v1") as vault_index:
+            with mock.patch(
+                "main.parse_md_to_indexed_page", side_effect=parse_then_edit
+            ):
+                self.assertEqual(main.refresh_index(vault_index, self.md_files), 1)
+            self.assertEqual(vault_index.get_card(self.md_files[0])["name"], "Bob")  # type: ignore
+            self.assertEqual(main.refresh_index(vault_index, self.md_files), 1)
+            self.assertEqual(vault_index.get_card(self.md_files[0])["name"], "Robert")  # type: ignore
+
+    def __write(self, name: str, text: str) -> str:
+        path = self.temp_dir / "links" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(text)
+        return str(path)
+
+    def __refresh_with_links(self, md_files: list[str]) -> list[str]:
+        with VaultIndex(self.temp_dir / "links.sqlite", "v1") as vault_index:
+            with mock.patch(
+                "main.parse_md_to_indexed_page", wraps=main.parse_md_to_indexed_page
+            ) as parse:
+                main.refresh_index(
+                    vault_index, md_files, link_index=main.build_link_index(md_files)
+                )
+        return [call.args[0] for call in parse.call_args_list]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import utils.watch as watch
+
+
+class WatcherTests:
+    # Tests shared by every watcher backend.
+    # 1. Modifying a file is reported.
+    # 2. Creating and deleting files is reported.
+    # 3. Files in new subfolders are reported, and excluded folders are ignored.
+    # 4. Waiting with no changes times out with an empty set.
+
+    def new_watcher(
+        self, directories: list[Path], exclude: list[str] = []
+    ) -> watch.Watcher:
+        raise NotImplementedError
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.existing_file = self.temp_dir / "existing.md"
+        self.existing_file.write_text("# Existing")
+        self.watcher = self.new_watcher([self.temp_dir])
+
+    def tearDown(self) -> None:
+        self.watcher.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_modified_file(self):
+        # Test 1: Append to an existing file.
+        # Expected Result: The watcher should report that file.
+        time.sleep(0.01)
+        with open(self.existing_file, "a") as file:
+            file.write("\nMore text.")
+        self.assertEqual(self.watcher.wait(timeout=2), {self.existing_file})
+
+    def test_created_and_deleted_files(self):
+        # Test 2: Create a new file and delete the existing one.
+        # Expected Result: The watcher should report both files.
+        new_file = self.temp_dir / "new.md"
+        new_file.write_text("# New")
+        self.existing_file.unlink()
+        changed: set[Path] = set()
+        deadline = time.monotonic() + 2
+        while changed != {new_file, self.existing_file} and time.monotonic() < deadline:
+            changed |= self.watcher.wait(timeout=0.5)
+        self.assertEqual(changed, {new_file, self.existing_file})
+
+    def test_nested_files(self):
+        # Test 3: Create a new folder with a note in it, and a note in Obsidian's settings folder.
+        # Expected Result: Only the note in the new folder should be reported.
+        self.watcher.close()
+        (self.temp_dir / ".obsidian").mkdir()
+        self.watcher = self.new_watcher([self.temp_dir], exclude=[".obsidian"])
+        nested_file = self.temp_dir / "People" / "bob.md"
+        nested_file.parent.mkdir()
+        nested_file.write_text("# Bob")
+        (self.temp_dir / ".obsidian" / "workspace.md").write_text("{}")
+        changed: set[Path] = set()
+        deadline = time.monotonic() + 2
+        while nested_file not in changed and time.monotonic() < deadline:
+            changed |= self.watcher.wait(timeout=0.5)
+        self.assertEqual(changed, {nested_file})
+
+    def test_timeout(self):
+        # Test 4: Wait without changing anything.
+        # Expected Result: The watcher should return an empty set.
+        self.assertEqual(self.watcher.wait(timeout=0.05), set())
+
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+    def new_watcher(
+        self, directories: list[Path], exclude: list[str] = []
+    ) -> watch.Watcher:
+        return watch.PollingWatcher(directories, exclude, interval=0.01)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify requires Linux.")
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+    def new_watcher(
+        self, directories: list[Path], exclude: list[str] = []
+    ) -> watch.Watcher:
+        return watch.InotifyWatcher(directories, exclude)
+
+
+if __name__ == "__main__":
+    unittest.main()
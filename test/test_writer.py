@@ -0,0 +1,117 @@
+import io
+import unittest
+from dataclasses import asdict
+from pathlib import Path
+from unittest import mock
+
+import yaml
+
+import obsidian
+import typst
+import typst.writer
+
+
+class TestCardWriter(unittest.TestCase):
+    # Tests for streaming cards to a data file.
+    # 1. The output is identical to dumping the whole deck with yaml.SafeDumper.
+    # 2. Strings that need escaping are written identically too.
+    # 3. An empty deck is written as an empty list.
+    # 4. The output is the same without libyaml.
+
+    def setUp(self) -> None:
+        self.cards: list[dict] = []
+        for path in ["standard-character.md", "location.md", "item-simple.md"]:
+            text = Path("test/files", path).read_text()
+            page = obsidian.rpg_pages.new_page(text)
+            self.cards.append(asdict(page.to_typst_card()))
+        self.cards.append(
+            asdict(
+                typst.Card(
+                    template="landscape-content-left",
+                    name="Ünïcode “quotes” — " + "and a long body " * 20,
+                    body_text="Trailing space before a break \n and after it.",
+                )
+            )
+        )
+
+    def __assert_matches_safe_dump(self, cards: list[dict]) -> None:
+        stream = io.StringIO()
+        typst.write_cards(cards, stream)
+        expected = yaml.dump(data={"cards": cards}, Dumper=yaml.SafeDumper)
+        self.assertEqual(stream.getvalue(), expected)
+
+    def test_matches_safe_dump(self):
+        # Test 1 and 2: Write the test cards, including one with escaped strings.
+        # Expected Result: The output should be identical to yaml.SafeDumper's.
+        self.__assert_matches_safe_dump(self.cards)
+
+    def test_empty_deck(self):
+        # Test 3: Write no cards.
+        # Expected Result: The output should be identical to yaml.SafeDumper's.
+        self.__assert_matches_safe_dump([])
+
+    def test_without_libyaml(self):
+        # Test 4: Write the test cards using only the pure-Python dumper.
+        # Expected Result: The output should be identical to yaml.SafeDumper's.
+        with mock.patch.object(typst.writer, "FastSafeDumper", yaml.SafeDumper):
+            self.__assert_matches_safe_dump(self.cards)
+
+
+class TestCardToDict(unittest.TestCase):
+    # Tests for converting cards to dicts without dataclasses.asdict.
+    # 1. The dict is identical to asdict's for every test note.
+    # 2. The dict doesn't share any lists with the card.
+    # 3. Cards use slots instead of a per-instance __dict__.
+    # 4. Card objects can be written directly.
+
+    def setUp(self) -> None:
+        self.cards: list[typst.Card] = []
+        for path in sorted(Path("test/files").glob("*.md")):
+            try:
+                page = obsidian.rpg_pages.new_page(path.read_text())
+            except (KeyError, ValueError, AttributeError):
+                continue
+            self.cards.append(page.to_typst_card())
+
+    def test_matches_asdict(self):
+        # Test 1: Convert each test card.
+        # Expected Result: The dicts should be equal, with their keys in the same order.
+        for card in self.cards:
+            with self.subTest(card=card.name):
+                self.assertEqual(card.to_dict(), asdict(card))
+                self.assertEqual(list(card.to_dict()), list(asdict(card)))
+
+    def test_copies_lists(self):
+        # Test 2: Modify a card's list value after converting it.
+        # Expected Result: The dict should be unchanged.
+        card = typst.Card(
+            template="landscape-content-right",
+            name="Tavern",
+            body_text="",
+            lists=[typst.CardList(items=[typst.CardList.Item(value=["Bob"])])],  # type: ignore
+        )
+        card_dict = card.to_dict()
+        card.lists[0].items[0].value.append("Alice")  # type: ignore
+        self.assertEqual(card_dict["lists"][0]["items"][0]["value"], ["Bob"])
+
+    def test_slots(self):
+        # Test 3: Check the card classes for a __dict__.
+        # Expected Result: None of them should have one.
+        item = typst.CardList.Item(value="Bob")
+        card_list = typst.CardList(items=[item])
+        card = typst.Card(template="", name="", body_text="", lists=[card_list])
+        for value in [item, card_list, card]:
+            self.assertFalse(hasattr(value, "__dict__"))
+
+    def test_write_card_objects(self):
+        # Test 4: Write the Card objects rather than their dicts.
+        # Expected Result: The output should be the same.
+        from_objects = io.StringIO()
+        typst.write_cards(self.cards, from_objects)
+        from_dicts = io.StringIO()
+        typst.write_cards([asdict(card) for card in self.cards], from_dicts)
+        self.assertEqual(from_objects.getvalue(), from_dicts.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
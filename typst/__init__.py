@@ -1 +1,11 @@
-from .typst import Card, CardList
+from .typst import (
+    SCHEMA_FILE,
+    Card,
+    CardList,
+    CardValidationError,
+    get_validator,
+    validate_card,
+    validate_cards,
+    validate_deck,
+)
+from .writer import CardWriter, write_cards
@@ -0,0 +1,370 @@
+"""
+Compiles a deck of cards to PDF on several cores, by splitting the deck into shards that are compiled at the same time and merging the PDFs in order.
+
+Each shard is compiled in its own mirror of the Typst project root, in which the shard's cards are at the path the template reads its data file from.
+
+Run `python -m typst.compiler --help` for the options.
+"""
+
+import argparse
+import math
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Sequence
+
+import yaml
+
+from typst.writer import write_cards
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    PdfReader = None
+    PdfWriter = None
+
+# The command that compiles one shard.
+# `{root}` is the shard's mirror of the project root, and `{data}` the path from it to the shard's data file, for templates that read it from `sys.inputs`.
+DEFAULT_COMPILER_COMMAND = "typst compile --root {root} {template} {output}"
+
+# Where the template reads the deck's data file from, relative to the project root.
+DEFAULT_DATA_PATH = Path("in/data.yaml")
+
+
+def split_cards(
+    cards: Sequence[dict], shards: int, cards_per_page: int = 1
+) -> List[List[dict]]:
+    """Split a deck into shards of nearly equal size, keeping the cards in order.
+
+    Args:
+        cards (Sequence[dict]): The cards.
+        shards (int): The number of shards to split the deck into. There are fewer if the deck has fewer pages.
+        cards_per_page (int, optional): The number of cards the template puts on a page. Each shard except the last holds whole pages, so merging the shards doesn't leave gaps. Defaults to 1.
+
+    Returns:
+        List[List[dict]]: The shards, in order. There is always at least one.
+    """
+    pages = math.ceil(len(cards) / cards_per_page)
+    shards = max(1, min(shards, pages))
+    pages_per_shard, extra_pages = divmod(pages, shards)
+    split: List[List[dict]] = []
+    start = 0
+    for shard in range(shards):
+        end = start + (pages_per_shard + (shard < extra_pages)) * cards_per_page
+        split.append(list(cards[start:end]))
+        start = end
+    return split
+
+
+def link_path(source: Path, destination: Path) -> None:
+    """Link to a file or directory, or copy it where links aren't allowed, as on Windows without developer mode.
+
+    Args:
+        source (Path): The file or directory.
+        destination (Path): The path of the link, which must not exist.
+    """
+    try:
+        os.symlink(source.resolve(), destination, target_is_directory=source.is_dir())
+    except OSError:
+        if source.is_dir():
+            shutil.copytree(source, destination)
+        else:
+            shutil.copy2(source, destination)
+
+
+def mirror_root(root: Path, mirror: Path, own_paths: Sequence[Path]) -> None:
+    """Recreate a project root out of links to its files and directories, so that some of its files can be replaced without touching the root.
+
+    The directories that lead to `own_paths` are created rather than linked, and the files at `own_paths` are left out for the caller to write.
+
+    Args:
+        root (Path): The project root.
+        mirror (Path): The directory to create the mirror in, which must not exist.
+        own_paths (Sequence[Path]): The files, relative to the root, that the mirror has its own versions of.
+    """
+    own_parts = [path.parts for path in own_paths]
+    mirror.mkdir(parents=True)
+    for entry in root.iterdir():
+        inner_parts = [parts[1:] for parts in own_parts if parts[0] == entry.name]
+        if not inner_parts:
+            link_path(entry, mirror / entry.name)
+        elif all(inner_parts) and entry.is_dir():
+            mirror_root(
+                entry, mirror / entry.name, [Path(*parts) for parts in inner_parts]
+            )
+    for path in own_paths:
+        (mirror / path).parent.mkdir(parents=True, exist_ok=True)
+
+
+def format_command(command: str, **values: str) -> List[str]:
+    """Split a command into its arguments and fill in the placeholders in each.
+
+    Args:
+        command (str): The command, with placeholders such as `{output}`.
+        **values (str): The value of each placeholder.
+
+    Returns:
+        List[str]: The arguments. A value with spaces stays in one argument.
+    """
+    return [argument.format(**values) for argument in shlex.split(command)]
+
+
+def run_command(arguments: List[str]) -> None:
+    """Run a command, raising an error with its output if it fails.
+
+    Args:
+        arguments (List[str]): The command and its arguments.
+
+    Raises:
+        RuntimeError: If the command exits with an error.
+    """
+    result = subprocess.run(arguments, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"'{shlex.join(arguments)}' exited with code {result.returncode}: {result.stderr.strip()}"
+        )
+
+
+def check_shard_pages(
+    pdf_files: List[Path], split: List[List[dict]], cards_per_page: int = 1
+) -> None:
+    """Check that each shard's PDF has as many pages as its cards fill, in proportion to the others.
+
+    A template that prints each page of cards on more than one page, such as fronts and backs, is allowed, as long as it does so for every shard.
+
+    Args:
+        pdf_files (List[Path]): The shards' PDFs.
+        split (List[List[dict]]): The cards in each shard.
+        cards_per_page (int, optional): The number of cards the template puts on a page. Defaults to 1.
+
+    Raises:
+        RuntimeError: If the page counts don't add up, which happens when the template doesn't read the shard's cards, or puts a different number of cards on a page.
+    """
+    page_counts = [len(PdfReader(pdf_file).pages) for pdf_file in pdf_files]  # type: ignore
+    card_pages = [math.ceil(len(shard) / cards_per_page) for shard in split]
+    pages_per_card_page = page_counts[0] // max(card_pages[0], 1)
+    if any(
+        page_count != pages_per_card_page * card_page_count
+        for page_count, card_page_count in zip(page_counts, card_pages)
+    ):
+        raise RuntimeError(
+            f"The shards have {page_counts} pages for {card_pages} pages of cards. Check that the template reads its cards from the data file and puts {cards_per_page} cards on a page."
+        )
+
+
+def merge_pdfs(
+    pdf_files: List[Path], output_file: Path, merge_command: str | None = None
+) -> None:
+    """Merge PDFs into one, in order.
+
+    Args:
+        pdf_files (List[Path]): The PDFs to merge.
+        output_file (Path): The path to write the merged PDF to.
+        merge_command (str | None, optional): A command that merges the PDFs, in which `{inputs}` stands for all the PDFs and `{output}` for the merged file, such as `qpdf --empty --pages {inputs} -- {output}`. Defaults to None, which merges them with pypdf.
+
+    Raises:
+        ImportError: If no merge command is given and pypdf isn't installed.
+    """
+    if merge_command is not None:
+        arguments: List[str] = []
+        for argument in shlex.split(merge_command):
+            if argument == "{inputs}":
+                arguments.extend(str(pdf_file) for pdf_file in pdf_files)
+            else:
+                arguments.append(argument.format(output=output_file))
+        run_command(arguments)
+        return
+    if PdfWriter is None:
+        raise ImportError(
+            "Merging the shards needs pypdf. Install it with `pip install pypdf`, or give a merge command."
+        )
+    writer = PdfWriter()
+    for pdf_file in pdf_files:
+        writer.append(pdf_file)
+    with open(output_file, "wb") as file:
+        writer.write(file)
+
+
+def compile_deck(
+    cards: Sequence[dict],
+    output_file: Path,
+    template: Path,
+    root: Path,
+    shards: int,
+    jobs: int | None = None,
+    cards_per_page: int = 1,
+    compiler_command: str = DEFAULT_COMPILER_COMMAND,
+    merge_command: str | None = None,
+    data_path: Path = DEFAULT_DATA_PATH,
+) -> int:
+    """Compile a deck of cards to a PDF, compiling shards of the deck at the same time.
+
+    Each shard is compiled in a temporary mirror of `root`, made of links to its files, with the template copied and the shard's cards written to `data_path`.
+    When the shards are merged with pypdf, their page counts are checked first.
+
+    Args:
+        cards (Sequence[dict]): The cards, as written to the data file.
+        output_file (Path): The path to write the PDF to.
+        template (Path): The Typst file that lays out the cards.
+        root (Path): The Typst project root, which must contain the template.
+        shards (int): The number of shards to split the deck into.
+        jobs (int | None, optional): The number of compilers to run at once. Defaults to None, which runs one per shard.
+        cards_per_page (int, optional): The number of cards the template puts on a page. Defaults to 1.
+        compiler_command (str, optional): The command that compiles a shard, with the placeholders `{root}`, `{data}`, `{template}` and `{output}`. Defaults to `DEFAULT_COMPILER_COMMAND`.
+        merge_command (str | None, optional): The command that merges the shards' PDFs. Defaults to None, which merges them with pypdf.
+        data_path (Path, optional): Where the template reads the data file from, relative to `root`. Defaults to `DEFAULT_DATA_PATH`.
+
+    Raises:
+        ValueError: If the template isn't inside the root.
+        RuntimeError: If a compiler or the merge command fails, or the shards' page counts don't add up.
+
+    Returns:
+        int: The number of shards compiled.
+    """
+    if not template.resolve().is_relative_to(root.resolve()):
+        raise ValueError(f"The template {template} isn't inside the root {root}.")
+    split = split_cards(cards, shards, cards_per_page)
+    template_path = template.resolve().relative_to(root.resolve())
+    shard_directory = Path(tempfile.mkdtemp(prefix="rpg-cards-shards-"))
+    try:
+        commands: List[List[str]] = []
+        pdf_files: List[Path] = []
+        for index, shard in enumerate(split):
+            shard_root = shard_directory / f"shard-{index:04d}"
+            mirror_root(root, shard_root, [data_path, template_path])
+            # The template is copied rather than linked, since Typst requires it to be inside the root once links are followed.
+            shutil.copy2(template, shard_root / template_path)
+            with open(shard_root / data_path, "w") as file:
+                write_cards(shard, file)
+            # A single shard is compiled straight to the output.
+            pdf_file = (
+                output_file.resolve()
+                if len(split) == 1
+                else shard_root.with_suffix(".pdf")
+            )
+            pdf_files.append(pdf_file)
+            commands.append(
+                format_command(
+                    compiler_command,
+                    root=str(shard_root),
+                    data="/" + data_path.as_posix(),
+                    template=str(shard_root / template_path),
+                    output=str(pdf_file),
+                )
+            )
+        # Each compiler runs in its own process, so threads are enough to wait on them.
+        with ThreadPoolExecutor(max_workers=jobs or len(commands)) as executor:
+            list(executor.map(run_command, commands))
+        if len(split) > 1:
+            if merge_command is None and PdfReader is not None:
+                check_shard_pages(pdf_files, split, cards_per_page)
+            merge_pdfs(pdf_files, output_file, merge_command)
+    finally:
+        shutil.rmtree(shard_directory)
+    return len(split)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compiles a deck of cards to PDF on several cores, by compiling shards of the deck at the same time and merging them."
+    )
+    parser.add_argument(
+        "--data-file",
+        help="The data file written by main.py.",
+        metavar="data_file",
+        type=Path,
+        default="rpg-cards-typst-templates/in/data.yaml",
+    )
+    parser.add_argument(
+        "--template",
+        help="The Typst file that lays out the cards. It must be inside the root.",
+        metavar="template",
+        type=Path,
+        default="rpg-cards-typst-templates/src/cards.typ",
+    )
+    parser.add_argument(
+        "--root",
+        help="The Typst project root.",
+        metavar="root",
+        type=Path,
+        default="rpg-cards-typst-templates",
+    )
+    parser.add_argument(
+        "--data-path",
+        help="Where the template reads the data file from, relative to the root. Each shard's cards are written there in its own copy of the root.",
+        metavar="data_path",
+        type=Path,
+        default=DEFAULT_DATA_PATH,
+    )
+    parser.add_argument(
+        "--output-file-path",
+        help="The path to the output PDF.",
+        metavar="output_file_path",
+        type=Path,
+        default="out/cards.pdf",
+    )
+    parser.add_argument(
+        "--shards",
+        help="The number of shards to split the deck into. Defaults to one per CPU core.",
+        metavar="shards",
+        type=int,
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--jobs",
+        help="The number of compilers to run at once. Defaults to one per shard.",
+        metavar="jobs",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--cards-per-page",
+        help="The number of cards the template puts on a page, so that shards hold whole pages.",
+        metavar="cards_per_page",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--compiler-command",
+        help=f"The command that compiles a shard, with the placeholders {{root}}, {{data}}, {{template}} and {{output}}. Defaults to '{DEFAULT_COMPILER_COMMAND}'.",
+        metavar="compiler_command",
+        default=DEFAULT_COMPILER_COMMAND,
+    )
+    parser.add_argument(
+        "--merge-command",
+        help="The command that merges the shards' PDFs, with the placeholders {inputs} and {output}, such as 'qpdf --empty --pages {inputs} -- {output}'. Defaults to merging them with pypdf.",
+        metavar="merge_command",
+        default=None,
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    params = parse_args()
+    with open(params.data_file, "r") as file:
+        cards = yaml.load(file, Loader=SafeLoader)["cards"]
+    try:
+        shards = compile_deck(
+            cards,
+            params.output_file_path,
+            params.template,
+            params.root,
+            params.shards,
+            params.jobs,
+            params.cards_per_page,
+            params.compiler_command,
+            params.merge_command,
+            params.data_path,
+        )
+    except (ValueError, RuntimeError) as error:
+        raise SystemExit(f"🔴 {error}")
+    print(f"Successfully wrote {params.output_file_path} from {shards} shards.")
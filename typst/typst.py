@@ -1,18 +1,182 @@
 import json
-from dataclasses import asdict, dataclass, field
+from dataclasses import dataclass, field
+from functools import cache
 from pathlib import Path
-from typing import List
+from typing import Any, Iterable, List
 
-from jsonschema import Draft7Validator
+from jsonschema import Draft7Validator, ValidationError
+
+# The schema in the rpg-cards-typst-templates repository.
+SCHEMA_FILE: Path = Path("rpg-cards-typst-templates/schemas/data.schema.json")
+
+# Array keywords that depend on the cards' contents, so `validate_deck` can't check them.
+CARD_CONTENT_KEYWORDS: frozenset[str] = frozenset({"uniqueItems", "contains"})
+
+
+@cache
+def get_validator(schema_file: Path = SCHEMA_FILE) -> Draft7Validator:
+    """Load and compile the data file schema. Each schema file is only loaded once per process.
+
+    Args:
+        schema_file (Path, optional): The path to the schema. Defaults to the schema in rpg-cards-typst-templates.
+
+    Returns:
+        Draft7Validator: A validator for the whole data file.
+    """
+    with open(schema_file, "r") as file:
+        schema: dict[str, str] = json.load(file)
+    return Draft7Validator(schema)
 
 
 @dataclass
+class CardValidationError:
+    """
+    A schema error found in a deck of cards.
+    """
+
+    card_index: (
+        int | None
+    )  # The position of the card in the deck, or None if the error isn't about a single card.
+    card_name: str
+    path: str  # The JSON path to the invalid value, relative to the card.
+    message: str
+
+
+def validate_cards(
+    cards: List["Card"] | List[dict], schema_file: Path = SCHEMA_FILE
+) -> List[CardValidationError]:
+    """Validate a whole deck of cards against the schema in one pass.
+
+    Args:
+        cards (List[Card] | List[dict]): The cards, either as `Card` objects or as dicts.
+        schema_file (Path, optional): The path to the schema. Defaults to the schema in rpg-cards-typst-templates.
+
+    Returns:
+        List[CardValidationError]: The errors, ordered by card. Empty if every card is valid.
+    """
+    card_dicts = [card if isinstance(card, dict) else card.to_dict() for card in cards]
+    return collect_validation_errors(
+        get_validator(schema_file).iter_errors({"cards": card_dicts}), card_dicts
+    )
+
+
+def validate_card(
+    card: "Card | dict", card_index: int, schema_file: Path = SCHEMA_FILE
+) -> List[CardValidationError]:
+    """Validate one card of a deck against the schema, so that a deck can be validated as it is written.
+
+    Args:
+        card (Card | dict): The card, either as a `Card` object or as a dict.
+        card_index (int): The position of the card in the deck, used in the errors.
+        schema_file (Path, optional): The path to the schema. Defaults to the schema in rpg-cards-typst-templates.
+
+    Returns:
+        List[CardValidationError]: The card's errors. Errors about the deck as a whole aren't reported, so check them with `validate_deck` once the deck is written.
+    """
+    card_dict = card if isinstance(card, dict) else card.to_dict()
+    errors = collect_validation_errors(
+        get_validator(schema_file).iter_errors({"cards": [card_dict]}), [card_dict]
+    )
+    return [
+        CardValidationError(card_index, error.card_name, error.path, error.message)
+        for error in errors
+        if error.card_index is not None
+    ]
+
+
+def validate_deck(
+    card_count: int, schema_file: Path = SCHEMA_FILE
+) -> List[CardValidationError]:
+    """Validate the parts of a deck that `validate_card` can't see, such as how many cards the `cards` array may hold, once every card has been written.
+
+    Cards with identical contents, and the `contains` keyword, aren't checked, since that would need every card in memory.
+
+    Args:
+        card_count (int): The number of cards in the deck.
+        schema_file (Path, optional): The path to the schema. Defaults to the schema in rpg-cards-typst-templates.
+
+    Returns:
+        List[CardValidationError]: The deck's errors, none of which belong to a single card.
+    """
+    # Empty placeholders stand in for the cards, whose own errors were already found by `validate_card`.
+    placeholders: List[dict] = [{}] * card_count
+    errors = collect_validation_errors(
+        (
+            error
+            for error in get_validator(schema_file).iter_errors({"cards": placeholders})
+            if error.validator not in CARD_CONTENT_KEYWORDS
+        ),
+        placeholders,
+    )
+    # The messages quote the array, which reads better as the number of cards.
+    placeholders_text = repr(placeholders)
+    return [
+        CardValidationError(
+            None,
+            error.card_name,
+            error.path,
+            error.message.replace(placeholders_text, f"The deck of {card_count} cards"),
+        )
+        for error in errors
+        if error.card_index is None
+    ]
+
+
+def collect_validation_errors(
+    schema_errors: Iterable[ValidationError], card_dicts: List[dict]
+) -> List[CardValidationError]:
+    """Convert the schema errors found in a data file to errors about its cards.
+
+    Args:
+        schema_errors (Iterable[ValidationError]): The errors from validating `{"cards": card_dicts}`.
+        card_dicts (List[dict]): The cards that were validated.
+
+    Returns:
+        List[CardValidationError]: The errors, ordered by card.
+    """
+    errors: List[CardValidationError] = []
+    for error in schema_errors:
+        path = list(error.absolute_path)
+        if len(path) >= 2 and path[0] == "cards" and isinstance(path[1], int):
+            card_index: int | None = path[1]
+            card_name = str(card_dicts[path[1]].get("name", ""))
+            card_path = path[2:]
+        else:
+            card_index = None
+            card_name = ""
+            card_path = path
+        errors.append(
+            CardValidationError(
+                card_index=card_index,
+                card_name=card_name,
+                path="/".join(str(part) for part in card_path),
+                message=error.message,
+            )
+        )
+    errors.sort(key=lambda e: (-1 if e.card_index is None else e.card_index, e.path))
+    return errors
+
+
+def copy_value(value: Any) -> Any:
+    """
+    Copies the lists and dicts in a card field, the same way `dataclasses.asdict` does, so the card dict doesn't share them with the card.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return [copy_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: copy_value(item) for key, item in value.items()}
+    return value
+
+
+@dataclass(slots=True)
 class CardList:
     """
     A list for use in rpg-cards-typst-templates.
     """
 
-    @dataclass
+    @dataclass(slots=True)
     class Item:
         """
         A list item for use in rpg-cards-typst-templates.
@@ -21,12 +185,28 @@ class CardList:
         value: str
         name: str = ""
 
+        def to_dict(self) -> dict:
+            """
+            Converts the item to a dict, the same as `dataclasses.asdict` but without inspecting its fields.
+            """
+            return {"value": copy_value(self.value), "name": copy_value(self.name)}
+
     items: List[Item]
     title: str = ""
     style: str = "plain"  # The style of the list as defined in the schema.
 
+    def to_dict(self) -> dict:
+        """
+        Converts the list to a dict, the same as `dataclasses.asdict` but without inspecting its fields.
+        """
+        return {
+            "items": [item.to_dict() for item in self.items],
+            "title": copy_value(self.title),
+            "style": copy_value(self.style),
+        }
 
-@dataclass
+
+@dataclass(slots=True)
 class Card:
     """
     Class used to export data to rpg-cards-typst-templates.
@@ -41,18 +221,27 @@ class Card:
     image_subtext: str = ""
     lists: List[CardList] = field(default_factory=list)
 
+    def to_dict(self) -> dict:
+        """
+        Converts the card to a dict, the same as `dataclasses.asdict` but without inspecting its fields.
+        """
+        return {
+            "template": copy_value(self.template),
+            "name": copy_value(self.name),
+            "body_text": copy_value(self.body_text),
+            "banner_color": copy_value(self.banner_color),
+            "image": copy_value(self.image),
+            "name_subtext": copy_value(self.name_subtext),
+            "image_subtext": copy_value(self.image_subtext),
+            "lists": [card_list.to_dict() for card_list in self.lists],
+        }
+
     def validate_schema(self) -> bool:
-        # Get the schema from the repository.
-        schema_file: Path = Path("rpg-cards-typst-templates/schemas/data.schema.json")
-        with open(schema_file, "r") as file:
-            schema: dict[str, str] = json.load(file)
-            # The schema assumes that the data is a list of cards.
-            # Since this is a single card, we need to wrap it in a list.
-            card: dict = {"cards": [asdict(self)]}
-            card_validator = Draft7Validator(schema)
-            errors = sorted(card_validator.iter_errors(card), key=lambda e: e.path)
-            if len(errors) == 0:
-                return True
-            for error in errors:
-                print(error)
-            return False
+        # The schema assumes that the data is a list of cards.
+        # Since this is a single card, validate it as a deck of one.
+        errors = validate_cards([self])
+        if len(errors) == 0:
+            return True
+        for error in errors:
+            print(error)
+        return False
@@ -0,0 +1,93 @@
+import re
+from typing import Any, Iterable, TextIO
+
+import yaml
+
+from typst.typst import Card
+
+try:
+    from yaml import CSafeDumper as FastSafeDumper
+except ImportError:
+    from yaml import SafeDumper as FastSafeDumper
+
+# libyaml folds long double-quoted scalars differently from PyYAML.
+# A string is only double-quoted when it has characters that must be escaped or spaces next to a line break,
+# so cards containing such strings are written with the pure-Python dumper to keep the output identical.
+DOUBLE_QUOTED_PATTERN: re.Pattern[str] = re.compile(r"[^\x20-\x7e\n]| \n|\n ")
+
+
+def needs_pure_dumper(value: Any) -> bool:
+    """Check whether any string in a card would be written as a double-quoted scalar.
+
+    Args:
+        value (Any): A card dict or one of its values.
+
+    Returns:
+        bool: True if the card must be written with the pure-Python dumper.
+    """
+    if isinstance(value, str):
+        return DOUBLE_QUOTED_PATTERN.search(value) is not None
+    if isinstance(value, dict):
+        return any(
+            needs_pure_dumper(key) or needs_pure_dumper(item)
+            for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return any(needs_pure_dumper(item) for item in value)
+    return False
+
+
+class CardWriter:
+    """
+    Writes cards to a rpg-cards-typst-templates data file one at a time.
+
+    The output is identical to dumping `{"cards": [...]}` with `yaml.SafeDumper`, but each card is written as soon as it is passed in, using libyaml when it is available.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, card: dict | Card) -> None:
+        """Write a card to the stream.
+
+        Args:
+            card (dict | Card): The card, either as a dict or as a `Card`.
+        """
+        if isinstance(card, Card):
+            card = card.to_dict()
+        if self.count == 0:
+            self.stream.write("cards:\n")
+        dumper = yaml.SafeDumper if needs_pure_dumper(card) else FastSafeDumper
+        # A top-level block sequence is written at the same indentation as the "cards" key's value.
+        yaml.dump(data=[card], stream=self.stream, Dumper=dumper)
+        self.count += 1
+
+    def close(self) -> None:
+        """
+        Finish the data file. An empty deck is written as an empty flow sequence.
+        """
+        if self.count == 0:
+            self.stream.write("cards: []\n")
+
+    def __enter__(self) -> "CardWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def write_cards(cards: Iterable[dict | Card], stream: TextIO) -> int:
+    """Write cards to a rpg-cards-typst-templates data file.
+
+    Args:
+        cards (Iterable[dict | Card]): The cards, either as dicts or as `Card` objects.
+        stream (TextIO): The file to write to.
+
+    Returns:
+        int: The number of cards written.
+    """
+    with CardWriter(stream) as writer:
+        for card in cards:
+            writer.write(card)
+        return writer.count
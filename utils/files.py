@@ -0,0 +1,63 @@
+"""
+Tools to find files in an Obsidian vault.
+"""
+
+import os
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterator, Sequence
+
+# Obsidian's settings, its trash and template folders never contain cards.
+DEFAULT_EXCLUDES: list[str] = [".obsidian", ".trash", "[Tt]emplates", "_[Tt]emplates"]
+
+
+def matches_any(relative_path: str, patterns: Sequence[str]) -> bool:
+    """Check whether a path matches any of a list of glob patterns.
+
+    Args:
+        relative_path (str): The path relative to the directory being searched, using forward slashes.
+        patterns (Sequence[str]): The glob patterns. A pattern matches either the whole relative path or just the file name.
+
+    Returns:
+        bool: True if any pattern matches.
+    """
+    name = relative_path.rsplit("/", 1)[-1]
+    return any(
+        fnmatch(relative_path, pattern) or fnmatch(name, pattern)
+        for pattern in patterns
+    )
+
+
+def find_files(
+    directory: Path,
+    include: Sequence[str] = ("*.md",),
+    exclude: Sequence[str] = DEFAULT_EXCLUDES,
+    recursive: bool = True,
+) -> Iterator[str]:
+    """Find the files in a directory and its subdirectories, yielding each one as soon as it is found.
+
+    Args:
+        directory (Path): The path to the directory.
+        include (Sequence[str], optional): Glob patterns for the files to yield. Defaults to markdown files.
+        exclude (Sequence[str], optional): Glob patterns for the files and directories to skip. Defaults to `DEFAULT_EXCLUDES`.
+        recursive (bool, optional): Whether to search subdirectories. Defaults to True.
+
+    Yields:
+        str: The path to each matching file.
+    """
+    pending: list[tuple[str, str]] = [(str(directory), "")]
+    while pending:
+        current, relative_prefix = pending.pop()
+        subdirectories: list[tuple[str, str]] = []
+        with os.scandir(current) as entries:
+            for entry in entries:
+                relative_path = relative_prefix + entry.name
+                if matches_any(relative_path, exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        subdirectories.append((entry.path, relative_path + "/"))
+                elif entry.is_file() and matches_any(relative_path, include):
+                    yield entry.path
+        # Visit the subdirectories in the order they were listed.
+        pending.extend(reversed(subdirectories))
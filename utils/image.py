@@ -2,11 +2,146 @@
 Tools to verify and modify the extensions of image files.
 """
 
+import os
 import shutil
+import threading
 from pathlib import Path
 
 import magic
 
+# The number of bytes read from the start of a file to identify its type.
+HEADER_SIZE = 8192
+
+
+def get_signature_mime_type(header: bytes) -> str | None:
+    """
+    Identify the common image formats from their file signatures without calling libmagic.
+
+    Args:
+        header (bytes): The first bytes of the file.
+
+    Returns:
+        str | None: The MIME type, or None if the signature isn't recognized.
+    """
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def get_mime_extension(mime_type: str) -> str:
+    """
+    Get the file extension for a MIME type, without the period.
+    """
+    mime_extension = mime_type.split("/")[1]
+    if mime_extension == "jpeg":
+        mime_extension = "jpg"
+    return mime_extension
+
+
+class ImageInspector:
+    """
+    Identifies the type of files, sniffing each file only once.
+
+    Common image formats are recognized from their signatures. Everything else is passed to a single shared libmagic handle.
+    Results are cached by path and modification time, so a file is sniffed again only if it changes.
+    An inspector can be shared between threads, since the libmagic handle is only used by one thread at a time.
+    """
+
+    def __init__(self):
+        self.__magic: magic.Magic | None = None
+        self.__magic_lock = threading.Lock()
+        self.__mime_types: dict[tuple[str, int, int], str] = {}
+
+    def get_mime_type(self, filepath: Path) -> str:
+        """
+        Get the MIME type of a file.
+
+        Args:
+            filepath (Path): The path to the file.
+
+        Returns:
+            str: The MIME type of the file.
+        """
+        file_path_str = str(filepath.resolve())
+        stat = os.stat(file_path_str)
+        key = (file_path_str, stat.st_mtime_ns, stat.st_size)
+        if key in self.__mime_types:
+            return self.__mime_types[key]
+        with open(file_path_str, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        mime_type = get_signature_mime_type(header)
+        if mime_type is None:
+            with self.__magic_lock:
+                if self.__magic is None:
+                    self.__magic = magic.Magic(mime=True)
+                mime_type = self.__magic.from_buffer(header)
+        self.__mime_types[key] = mime_type
+        return mime_type
+
+    def is_image(self, filepath: Path) -> bool:
+        """
+        Check if a file is an image.
+
+        Args:
+            filepath (Path): The path to the file.
+
+        Returns:
+            bool: True if the file is an image, False if not.
+        """
+        return self.get_mime_type(filepath).startswith("image")
+
+    def does_extension_match(self, filepath: Path) -> bool:
+        """
+        Check if the file extension matches the file type.
+
+        Args:
+            filepath (Path): The path to the file.
+
+        Returns:
+            bool: True if the extension matches the file type, False if not.
+        """
+        mime_extension = get_mime_extension(self.get_mime_type(filepath))
+        file_extension = filepath.suffix.replace(".", "")
+        return mime_extension == file_extension
+
+    def get_matching_name(self, filepath: Path) -> str:
+        """
+        Get the name of a file with its extension changed to match the file type.
+
+        Args:
+            filepath (Path): The path to the file.
+
+        Returns:
+            str: The file name with the matching extension.
+        """
+        mime_extension = get_mime_extension(self.get_mime_type(filepath))
+        return filepath.with_suffix("." + mime_extension).name
+
+    def new_file_from_mimetype(self, filepath: Path) -> Path:
+        """
+        Make a copy of a file with a mismatched extension to match the file type.
+
+        Args:
+            filepath (Path): The path to the original file.
+
+        Returns:
+            Path: The path to the new file.
+        """
+        mime_extension = get_mime_extension(self.get_mime_type(filepath))
+        new_filepath = filepath.with_suffix("." + mime_extension)
+        shutil.copy(filepath, new_filepath)
+        return new_filepath
+
+
+# Shared by the module-level functions so that they reuse each other's results.
+default_inspector = ImageInspector()
+
 
 def is_image(filepath: Path) -> bool:
     """
@@ -18,10 +153,7 @@ def is_image(filepath: Path) -> bool:
     Returns:
         bool: True if the file is an image, False if not.
     """
-    file_path_str = str(filepath.resolve())
-    mime = magic.Magic(mime=True)
-    file_type = mime.from_file(file_path_str)
-    return file_type.startswith("image")
+    return default_inspector.is_image(filepath)
 
 
 def does_extension_match(filepath: Path) -> bool:
@@ -34,14 +166,20 @@ def does_extension_match(filepath: Path) -> bool:
     Returns:
         bool: True if the extension matches the file type, False if not.
     """
-    file_path_str = str(filepath.resolve())
-    mime = magic.Magic(mime=True)
-    mime_type = mime.from_file(file_path_str)
-    mime_extension = mime_type.split("/")[1]
-    if mime_extension == "jpeg":
-        mime_extension = "jpg"
-    file_extension = filepath.suffix.replace(".", "")
-    return mime_extension == file_extension
+    return default_inspector.does_extension_match(filepath)
+
+
+def get_matching_name(filepath: Path) -> str:
+    """
+    Get the name of a file with its extension changed to match the file type.
+
+    Args:
+        filepath (Path): The path to the file.
+
+    Returns:
+        str: The file name with the matching extension.
+    """
+    return default_inspector.get_matching_name(filepath)
 
 
 def new_file_from_mimetype(filepath: Path) -> Path:
@@ -54,12 +192,4 @@ def new_file_from_mimetype(filepath: Path) -> Path:
     Returns:
         Path: The path to the new file.
     """
-    file_path_str = str(filepath.resolve())
-    mime = magic.Magic(mime=True)
-    mime_type = mime.from_file(file_path_str)
-    mime_extension = mime_type.split("/")[1]
-    if mime_extension == "jpeg":
-        mime_extension = "jpg"
-    new_filepath = filepath.with_suffix("." + mime_extension)
-    shutil.copy(filepath, new_filepath)
-    return new_filepath
+    return default_inspector.new_file_from_mimetype(filepath)
@@ -0,0 +1,109 @@
+"""
+Shrinks card images to the size they are printed at, and converts formats that Typst handles poorly, keeping the results in an on-disk cache.
+
+Needs Pillow, which is only imported when an `ImageResizer` is created.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from utils.image_store import default_store
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+except ImportError:
+    Image = None
+    ImageOps = None
+    UnidentifiedImageError = OSError
+
+# The formats that are kept as they are. Anything else is converted to PNG if it has transparency, or JPEG if not.
+KEPT_FORMATS = {"PNG": "png", "JPEG": "jpg"}
+
+
+class ImageResizer:
+    """
+    Shrinks images so that their longest side is at most `max_size` pixels.
+
+    Each result is cached in `cache_directory` under the hash of the source image and the size, so an image is only resized again when it changes.
+    Images that are already small enough and in a kept format are used as they are, and so are images Pillow can't read, such as SVG or HEIC.
+    """
+
+    def __init__(self, cache_directory: Path, max_size: int, jpeg_quality: int = 90):
+        if Image is None:
+            raise ImportError(
+                "Resizing images needs Pillow. Install it with `pip install -r requirements-optional.txt`."
+            )
+        if max_size < 1:
+            raise ValueError("The maximum image size must be at least 1 pixel.")
+        self.cache_directory = cache_directory
+        self.max_size = max_size
+        self.jpeg_quality = jpeg_quality
+
+    def prepare(self, source: Path, image_name: str) -> tuple[Path, str]:
+        """Get a version of an image that is no larger than the maximum size, in a format Typst handles well.
+
+        Args:
+            source (Path): The path to the image.
+            image_name (str): The name the card uses for the image.
+
+        Returns:
+            tuple[Path, str]: The path to the image to copy to the output, and the name the card should use. A converted image's extension is added to the name, as in `map.webp.jpg`, so it can't replace another image in the output.
+        """
+        try:
+            return self.__prepare(source, image_name)
+        except (UnidentifiedImageError, OSError):
+            # Pillow can't decode every format that passes the image check, so those are copied as they are.
+            return source, image_name
+
+    def __prepare(self, source: Path, image_name: str) -> tuple[Path, str]:
+        """
+        Same as `prepare`, raising an error if Pillow can't read the image.
+        """
+        with Image.open(source) as image:  # type: ignore
+            image_format = image.format or ""
+            if image_format in KEPT_FORMATS and max(image.size) <= self.max_size:
+                return source, image_name
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+                image.mode == "P" and "transparency" in image.info
+            )
+            kept_extension = KEPT_FORMATS.get(image_format)
+            extension = kept_extension or ("png" if has_alpha else "jpg")
+            digest = default_store.hash_file(source)
+            cached_file = (
+                self.cache_directory / f"{digest}-{self.max_size}px.{extension}"
+            )
+            if not cached_file.exists():
+                self.__resize(image, cached_file, extension, has_alpha)
+        if kept_extension is None:
+            image_name = f"{image_name}.{extension}"
+        return cached_file, image_name
+
+    def __resize(
+        self, image, cached_file: Path, extension: str, has_alpha: bool
+    ) -> None:
+        """
+        Shrink an image and save it to the cache.
+        """
+        # Apply the EXIF orientation, since the metadata isn't kept.
+        image = ImageOps.exif_transpose(image)  # type: ignore
+        # Palette and other modes can only be resized with nearest-neighbour sampling.
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        image.thumbnail((self.max_size, self.max_size), Image.Resampling.LANCZOS)  # type: ignore
+        self.cache_directory.mkdir(parents=True, exist_ok=True)
+        # Save to a temporary file first, so that an interrupted build never leaves a partial image in the cache.
+        temp_file = cached_file.with_name(
+            f".{cached_file.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            if extension == "jpg":
+                image.convert("RGB" if image.mode != "L" else "L").save(
+                    temp_file, "JPEG", quality=self.jpeg_quality, optimize=True
+                )
+            else:
+                image.save(temp_file, "PNG", optimize=True)
+        except BaseException:
+            temp_file.unlink(missing_ok=True)
+            raise
+        os.replace(temp_file, cached_file)
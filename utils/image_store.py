@@ -0,0 +1,224 @@
+"""
+Writes card images to the output directory, storing each distinct image only once.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# The Linux ioctl that makes a file share the blocks of another, on filesystems that support it, such as Btrfs and XFS.
+FICLONE = 0x40049409
+
+
+def clone_file(source: Path, destination: Path) -> bool:
+    """Create a copy-on-write clone (reflink) of a file.
+
+    Args:
+        source (Path): The file to clone.
+        destination (Path): The path of the new file, which must not exist.
+
+    Returns:
+        bool: True if the clone was created, False if the platform or filesystem doesn't support it.
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(source, "rb") as source_file, open(destination, "xb") as new_file:
+            try:
+                fcntl.ioctl(new_file.fileno(), FICLONE, source_file.fileno())
+            except OSError:
+                cloned = False
+            else:
+                cloned = True
+    except OSError:
+        return False
+    if not cloned:
+        destination.unlink()
+        return False
+    shutil.copystat(source, destination)
+    return True
+
+
+def link_file(source: Path, destination: Path) -> bool:
+    """Create a hardlink to a file.
+
+    Args:
+        source (Path): The file to link to.
+        destination (Path): The path of the link, which must not exist.
+
+    Returns:
+        bool: True if the link was created, False if the filesystem doesn't support it or the paths are on different filesystems.
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        return False
+    return True
+
+
+def hash_contents(filepath: Path) -> str:
+    """Hash the contents of a file.
+
+    Args:
+        filepath (Path): The path to the file.
+
+    Returns:
+        str: The SHA-256 hex digest of the file.
+    """
+    with open(filepath, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+class ImageStore:
+    """
+    Writes images to output directories by their content.
+
+    - Each source image is hashed once, and again only if its modification time or size changes.
+    - A write is skipped if the destination is the source's file, or hashes to the same content.
+    - A destination with the same content as one already written to the same directory is hardlinked to it, as long as that file still hashes to that content.
+    - Otherwise the destination is cloned from the source where the filesystem allows, and copied if not.
+
+    Sources are never hardlinked, so that nothing done to the output can change the input images.
+    Destinations are replaced through a temporary file rather than written to, so a partly written image is never left behind.
+    A store can be shared between threads.
+    """
+
+    def __init__(self):
+        self.__hashes: dict[tuple[str, int, int], str] = {}
+        # The first destination written in each directory for each content hash, with its inode, size and modification time when it was written.
+        self.__written: dict[tuple[Path, str], tuple[Path, tuple[int, int, int]]] = {}
+        # The content hash each destination in `__written` was recorded under, so its entry can be dropped when it is overwritten.
+        self.__written_keys: dict[Path, tuple[Path, str]] = {}
+        self.__lock = threading.Lock()
+        self.__content_locks: dict[tuple[Path, str], threading.Lock] = {}
+
+    def hash_file(self, filepath: Path) -> str:
+        """Hash the contents of a file, reusing the hash from an earlier call if the file hasn't changed.
+
+        Args:
+            filepath (Path): The path to the file.
+
+        Returns:
+            str: The SHA-256 hex digest of the file.
+        """
+        stat = os.stat(filepath)
+        key = (str(filepath.resolve()), stat.st_mtime_ns, stat.st_size)
+        digest = self.__hashes.get(key)
+        if digest is None:
+            digest = hash_contents(filepath)
+            self.__hashes[key] = digest
+        return digest
+
+    def write(self, source: Path, destination: Path) -> None:
+        """Make the destination a copy of the source, unless it already is one.
+
+        Args:
+            source (Path): The image to copy.
+            destination (Path): The path to write it to.
+        """
+        digest = self.hash_file(source)
+        key = (destination.parent.resolve(), digest)
+        with self.__lock:
+            content_lock = self.__content_locks.setdefault(key, threading.Lock())
+        # Destinations with the same content are written one at a time, so that each can link to the first.
+        with content_lock:
+            written = self.__get_written(key)
+            if not self.__has_content(destination, source, digest):
+                temp_path = destination.with_name(
+                    f".{destination.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+                )
+                if written is not None and hash_contents(written) != digest:
+                    # Its content changed without changing its size or mtime, so it can't be linked to.
+                    self.__forget(written)
+                    written = None
+                if written is None or not link_file(written, temp_path):
+                    if not clone_file(source, temp_path):
+                        shutil.copy2(source, temp_path)
+                os.replace(temp_path, destination)
+                # The destination no longer holds the content it may have been recorded with.
+                self.__forget(key[0] / destination.name)
+            if written is None:
+                self.__remember(key, key[0] / destination.name)
+
+    def __get_written(self, key: tuple[Path, str]) -> Path | None:
+        """
+        Returns the destination first written with a content hash in a directory, unless it has changed or gone since.
+        """
+        with self.__lock:
+            entry = self.__written.get(key)
+        if entry is None:
+            return None
+        written, written_stat = entry
+        try:
+            stat = os.stat(written)
+        except FileNotFoundError:
+            stat = None
+        if (
+            stat is not None
+            and (stat.st_ino, stat.st_size, stat.st_mtime_ns) == written_stat
+        ):
+            return written
+        self.__forget(written)
+        return None
+
+    def __remember(self, key: tuple[Path, str], destination: Path) -> None:
+        """
+        Records a destination as the one to link to for its content hash and directory.
+        """
+        stat = os.stat(destination)
+        with self.__lock:
+            self.__forget_locked(destination)
+            self.__written[key] = (
+                destination,
+                (stat.st_ino, stat.st_size, stat.st_mtime_ns),
+            )
+            self.__written_keys[destination] = key
+
+    def __forget(self, destination: Path) -> None:
+        """
+        Drops the record of a destination, if it was recorded.
+        """
+        with self.__lock:
+            self.__forget_locked(destination)
+
+    def __forget_locked(self, destination: Path) -> None:
+        key = self.__written_keys.pop(destination, None)
+        if key is not None:
+            del self.__written[key]
+
+    def __has_content(self, destination: Path, source: Path, digest: str) -> bool:
+        """
+        Check whether the destination already holds the source's content, only hashing it if it is another file of the same size.
+        """
+        try:
+            destination_stat = os.stat(destination)
+        except FileNotFoundError:
+            return False
+        source_stat = os.stat(source)
+        if os.path.samestat(source_stat, destination_stat):
+            return True
+        if destination_stat.st_size != source_stat.st_size:
+            return False
+        # A file restored from a backup or synced with its times kept can have different content with the same size and mtime, so only the hash is trusted.
+        return hash_contents(destination) == digest
+
+
+# Shared by every build in this process, so each image is only hashed once.
+default_store = ImageStore()
+
+
+def store_image(source: Path, destination: Path) -> None:
+    """Make the destination a copy of the source image, unless it already is one.
+
+    Args:
+        source (Path): The image to copy.
+        destination (Path): The path to write it to.
+    """
+    default_store.write(source, destination)
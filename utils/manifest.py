@@ -0,0 +1,167 @@
+"""
+An on-disk build manifest that caches the card generated from each markdown file.
+"""
+
+import copy
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from obsidian.links import LinkIndex, ResolvedLinks
+
+# The source files and directories that determine how a markdown file is turned into a card.
+# main.py is included because it builds the cards from the parsed pages. If any of them change, every cached card is thrown away.
+PARSER_SOURCES: list[Path] = [
+    Path(__file__).resolve().parent.parent / source
+    for source in ["main.py", "obsidian", "typst", "utils"]
+]
+
+
+def get_parser_version() -> str:
+    """Hash the source code of the parser modules.
+
+    Returns:
+        str: A hex digest that changes whenever the parser code changes.
+    """
+    digest = hashlib.sha256()
+    for source in PARSER_SOURCES:
+        source_files = sorted(source.rglob("*.py")) if source.is_dir() else [source]
+        for source_file in source_files:
+            digest.update(source_file.relative_to(source.parent).as_posix().encode())
+            digest.update(source_file.read_bytes())
+    return digest.hexdigest()
+
+
+def hash_file(filepath: str | Path) -> str:
+    """Hash the contents of a file.
+
+    Args:
+        filepath (str | Path): The path to the file.
+
+    Returns:
+        str: The SHA-256 hex digest of the file.
+    """
+    with open(filepath, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+class BuildManifest:
+    """
+    Maps each markdown file to the card dict that was generated from it.
+
+    An entry is reused when the file's mtime and size are unchanged, or when its contents still hash to the same value.
+    Entries are discarded when the parser version changes, and files that aren't looked up or stored during a run are dropped when the manifest is saved.
+    Cards can also depend on other notes through their links, so each entry records the title each of its links resolved to.
+    An entry is only reused while its links resolve to the same titles in `link_index`, so adding or retitling a note only invalidates the cards that link to it.
+    """
+
+    def __init__(self, manifest_path: Path, parser_version: str | None = None):
+        self.manifest_path = manifest_path
+        self.parser_version = parser_version or get_parser_version()
+        # The index of the vault's notes that cards' links are resolved against, or None if links aren't resolved.
+        self.link_index: LinkIndex | None = None
+        self.__entries: dict[str, dict] = self.__load()
+        self.__fingerprints: dict[str, dict] = {}
+        self.__used: dict[str, dict] = {}
+
+    def __load(self) -> dict[str, dict]:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, "r") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("parser_version") != self.parser_version:
+            return {}
+        return manifest.get("entries", {})
+
+    def __get_fingerprint(self, filepath: str) -> dict:
+        """
+        Returns the mtime, size and content hash of a file, only hashing it if its mtime or size changed.
+        """
+        stat = os.stat(filepath)
+        fingerprint = {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+        entry = self.__entries.get(filepath)
+        if (
+            entry is not None
+            and entry["mtime"] == fingerprint["mtime"]
+            and entry["size"] == fingerprint["size"]
+        ):
+            fingerprint["hash"] = entry["hash"]
+        else:
+            fingerprint["hash"] = hash_file(filepath)
+        self.__fingerprints[filepath] = fingerprint
+        return fingerprint
+
+    def get_card(self, filepath: str) -> dict | None:
+        """Get the cached card for a file.
+
+        Args:
+            filepath (str): The path to the markdown file.
+
+        Returns:
+            dict | None: A copy of the cached card, or None if the file changed or has never been cached.
+        """
+        linked_card = self.get_linked_card(filepath)
+        return None if linked_card is None else linked_card[0]
+
+    def get_linked_card(
+        self, filepath: str
+    ) -> tuple[dict, ResolvedLinks | None] | None:
+        """Same as `get_card`, but also returns the title each of the card's links resolved to.
+
+        Returns:
+            tuple[dict, ResolvedLinks | None] | None: A copy of the cached card with its links, or None if the file changed or has never been cached.
+        """
+        fingerprint = self.__get_fingerprint(filepath)
+        entry = self.__entries.get(filepath)
+        if (
+            entry is None
+            or entry["hash"] != fingerprint["hash"]
+            or not self.__links_are_current(entry.get("links"))
+        ):
+            return None
+        self.__used[filepath] = {**entry, **fingerprint}
+        return copy.deepcopy(entry["card"]), entry.get("links")
+
+    def __links_are_current(self, resolved: ResolvedLinks | None) -> bool:
+        """
+        Returns whether a card's links, as recorded when it was stored, still resolve the same way.
+        """
+        if self.link_index is None or resolved is None:
+            # A card is only reused if its links were resolved exactly when they are resolved now.
+            return self.link_index is None and resolved is None
+        return self.link_index.resolves_to(resolved)
+
+    def set_card(
+        self, filepath: str, card: dict, links: ResolvedLinks | None = None
+    ) -> None:
+        """Cache the card generated from a file.
+
+        Args:
+            filepath (str): The path to the markdown file.
+            card (dict): The card dict generated from the file.
+            links (ResolvedLinks | None, optional): The title each of the card's links resolved to, as recorded by a `LinkRecorder`. Defaults to None, for a card whose links weren't resolved.
+        """
+        fingerprint = self.__fingerprints.get(filepath) or self.__get_fingerprint(
+            filepath
+        )
+        entry = {
+            **fingerprint,
+            "links": links,
+            "card": copy.deepcopy(card),
+        }
+        self.__entries[filepath] = entry
+        self.__used[filepath] = entry
+
+    def save(self) -> None:
+        """
+        Write the entries used during this run to disk.
+        """
+        manifest = {"parser_version": self.parser_version, "entries": self.__used}
+        temp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(temp_path, "w") as file:
+            json.dump(manifest, file)
+        os.replace(temp_path, self.manifest_path)
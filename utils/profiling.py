@@ -0,0 +1,170 @@
+"""
+Records how long each stage of a build takes and which notes are the slowest to parse.
+
+The pipeline marks its stages with `stage()` and `note()`, which do nothing unless a profiler has been started with `start_profiling()`.
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import ContextManager, Iterator, List
+
+
+@dataclass
+class StageStats:
+    """
+    The total wall time spent in a stage and the number of times it ran.
+    """
+
+    seconds: float = 0.0
+    calls: int = 0
+
+
+@dataclass
+class Profiler:
+    """
+    Collects the wall time and call count of each stage, and the time taken to parse each note.
+
+    Stages can be nested, such as `markdown_data.content` inside `markdown_data`, so their times overlap and don't add up to the total.
+    """
+
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    notes: dict[str, float] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.perf_counter)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block of code as one call of a stage.
+
+        Args:
+            name (str): The name of the stage.
+        """
+        # Stages are reported in the order they first started.
+        stats = self.stages.setdefault(name, StageStats())
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.calls += 1
+
+    @contextmanager
+    def note(self, filepath: str) -> Iterator[None]:
+        """Time a block of code as the parsing of a note.
+
+        Args:
+            filepath (str): The path to the note.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.notes[filepath] = time.perf_counter() - start
+
+    def report(self, cards: int, top: int = 10) -> dict:
+        """Summarize the build.
+
+        Args:
+            cards (int): The number of cards the build produced.
+            top (int, optional): The number of slowest notes to include. Defaults to 10.
+
+        Returns:
+            dict: The total wall time, the throughput, each stage's time and calls, and the slowest notes.
+        """
+        total_seconds = time.perf_counter() - self.start_time
+        slowest_notes = sorted(
+            self.notes.items(), key=lambda item: item[1], reverse=True
+        )
+        return {
+            "total_seconds": total_seconds,
+            "cards": cards,
+            "cards_per_second": cards / total_seconds if total_seconds else 0.0,
+            "notes_parsed": len(self.notes),
+            "stages": {
+                name: {
+                    "seconds": stats.seconds,
+                    "calls": stats.calls,
+                    "share": stats.seconds / total_seconds if total_seconds else 0.0,
+                }
+                for name, stats in self.stages.items()
+            },
+            "slowest_notes": [
+                {"path": path, "seconds": seconds}
+                for path, seconds in slowest_notes[:top]
+            ],
+        }
+
+
+def format_report(report: dict) -> List[str]:
+    """Format a profiler report for printing.
+
+    Args:
+        report (dict): The report from `Profiler.report`.
+
+    Returns:
+        List[str]: The lines of the report.
+    """
+    lines = [
+        f"Built {report['cards']} cards in {report['total_seconds']:.3f}s ({report['cards_per_second']:.1f} cards/sec).",
+        f"{'Stage':<28} {'Seconds':>9} {'Calls':>8} {'Share':>7}",
+    ]
+    for name, stats in report["stages"].items():
+        lines.append(
+            f"{name:<28} {stats['seconds']:9.4f} {stats['calls']:8d} {stats['share']:7.1%}"
+        )
+    if report["slowest_notes"]:
+        lines.append("Slowest notes:")
+        for note in report["slowest_notes"]:
+            lines.append(f"{note['seconds'] * 1000:9.2f} ms  {note['path']}")
+    return lines
+
+
+# The profiler that `stage()` and `note()` record to, or None when profiling is off.
+active_profiler: Profiler | None = None
+# Shared by every call while profiling is off, so that marking a stage costs almost nothing.
+NOT_PROFILING: ContextManager[None] = nullcontext()
+
+
+def start_profiling() -> Profiler:
+    """
+    Starts recording stages to a new profiler and returns it.
+    """
+    global active_profiler
+    active_profiler = Profiler()
+    return active_profiler
+
+
+def stop_profiling() -> None:
+    """
+    Stops recording stages.
+    """
+    global active_profiler
+    active_profiler = None
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Mark a block of code as one call of a stage.
+
+    Args:
+        name (str): The name of the stage.
+
+    Returns:
+        ContextManager[None]: A context manager that times the block if profiling is on.
+    """
+    if active_profiler is None:
+        return NOT_PROFILING
+    return active_profiler.stage(name)
+
+
+def note(filepath: str) -> ContextManager[None]:
+    """Mark a block of code as the parsing of a note.
+
+    Args:
+        filepath (str): The path to the note.
+
+    Returns:
+        ContextManager[None]: A context manager that times the block if profiling is on.
+    """
+    if active_profiler is None:
+        return NOT_PROFILING
+    return active_profiler.note(filepath)
@@ -6,22 +6,129 @@ def simplify_text(text: str) -> str:
     return text.lower().replace(" ", "-")
 
 
-def remove_wikilinks(text: str) -> str:
+# The extensions of the images that can be put on a card.
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg", ".webp")
+
+
+class _ImageExtensionFinder:
+    """
+    Finds the first image extension after a position.
+    Remembers where each extension next occurs, so the text is searched for each extension only once however many links there are.
+    """
+
+    __slots__ = ("text", "positions")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.positions = [-1] * len(IMAGE_EXTENSIONS)
+
+    def find_end(self, start: int, end: int) -> int:
+        """
+        Returns the index just after the first image extension in `text[start:end]`, or -1 if there isn't one.
+        """
+        first = -1
+        first_end = -1
+        for index, extension in enumerate(IMAGE_EXTENSIONS):
+            position = self.positions[index]
+            if position < start:
+                position = self.text.find(extension, start)
+                if position == -1:
+                    position = len(self.text)
+                self.positions[index] = position
+            extension_end = position + len(extension)
+            if extension_end <= end and (first == -1 or position < first):
+                first = position
+                first_end = extension_end
+        return first_end
+
+
+def remove_wikilinks(text: str, images: list[str] | None = None) -> str:
     """
     Extracts the string contents of all wikilinks from a string.
     If there is alt text, use that instead of the name of the file.
     Leaves embeds (`![[link]]`) alone.
+
+    Each link is rewritten where it is found in a single pass, so the time taken grows linearly with the length of the text.
+
+    If `images` is given, the filename of every linked or embedded image is appended to it during the same pass.
+    The filename runs from the start of the link to the first image extension, as in `![[portrait.png|300]]`.
     """
-    pattern = __re.compile(
-        r"(?<![!])\[\[(?P<link>.+?)(?:\|)?(?P<altText>(?<=\|).+?)?\]\]"
-    )
-    matches = pattern.finditer(text)
-    for match in matches:
-        if match.group("altText"):
-            text = text.replace(match.group(0), match.group("altText"))
+    if "[[" not in text:
+        return text
+    parts: list[str] = []
+    copied_up_to = 0
+    position = 0
+    line_end = -1
+    close = -1
+    unclosed_line_end = -1
+    image_finder = None if images is None else _ImageExtensionFinder(text)
+    images_end = 0
+    while True:
+        start = text.find("[[", position)
+        if start == -1:
+            break
+        link_start = start + 2
+        if start > line_end:
+            line_end = text.find("\n", link_start)
+            if line_end == -1:
+                line_end = len(text)
+        # The link needs at least one character and can't span lines.
+        # An embed leaves the scan inside it, so its closing brackets may already be known.
+        if close <= link_start:
+            if line_end == unclosed_line_end:
+                close = -1
+            else:
+                close = text.find("]]", link_start + 1, line_end)
+                if close == -1:
+                    unclosed_line_end = line_end
+        if image_finder is not None and start >= images_end:
+            filename_end = image_finder.find_end(
+                link_start, line_end if close == -1 else close
+            )
+            if filename_end != -1:
+                images.append(text[link_start:filename_end])  # type: ignore
+                images_end = filename_end
+        if start > 0 and text[start - 1] == "!":
+            position = start + 1
+            continue
+        if close == -1:
+            # Any other link starting on this line would also be unclosed, but it may still name an image.
+            position = images_end if images_end > start else line_end
+            continue
+        if text[link_start] == "|" and text[link_start + 1] != "|":
+            # A link that is just a pipe, as in `[[|alt text]]`.
+            pipe = link_start
         else:
-            text = text.replace(match.group(0), match.group("link"))
-    return text
+            pipe = text.find("|", link_start + 1, close)
+        alt_text_close = -1 if pipe == -1 else text.find("]]", pipe + 2, line_end)
+        if alt_text_close != -1:
+            replacement = text[pipe + 1 : alt_text_close]
+            end = alt_text_close + 2
+        elif pipe > link_start:
+            # An empty alt text, as in `[[link|]]`.
+            replacement = text[link_start:pipe]
+            end = pipe + 3
+        else:
+            replacement = text[link_start:close]
+            end = close + 2
+        if image_finder is not None:
+            # Links inside the brackets of this one are rewritten with it, but may still name images.
+            inner = text.find("[[", max(start + 1, images_end), end)
+            while inner != -1:
+                if close <= inner + 2:
+                    close = text.find("]]", inner + 3, line_end)
+                filename_end = image_finder.find_end(
+                    inner + 2, line_end if close == -1 else close
+                )
+                if filename_end != -1:
+                    images.append(text[inner + 2 : filename_end])  # type: ignore
+                    images_end = filename_end
+                inner = text.find("[[", max(inner + 1, images_end), end)
+        parts.append(text[copied_up_to:start])
+        parts.append(replacement)
+        copied_up_to = position = end
+    parts.append(text[copied_up_to:])
+    return "".join(parts)
 
 
 def replace_uncommon_characters(text: str) -> str:
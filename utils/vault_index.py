@@ -0,0 +1,400 @@
+"""
+A persistent SQLite index of the vault's parsed notes, which decks can be selected from with a query such as `type=item and rarity=rare`.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, List
+
+from obsidian.links import LinkIndex, ResolvedLinks
+from utils.manifest import get_parser_version, hash_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS pages (
+    path TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    links TEXT NOT NULL,
+    page_type TEXT NOT NULL,
+    frontmatter TEXT NOT NULL,
+    dataview_fields TEXT NOT NULL,
+    card TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (path TEXT NOT NULL, tag TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS tags_by_path ON tags (path);
+CREATE INDEX IF NOT EXISTS tags_by_tag ON tags (tag);
+CREATE TABLE IF NOT EXISTS fields (
+    path TEXT NOT NULL,
+    key TEXT NOT NULL COLLATE NOCASE,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fields_by_path ON fields (path);
+CREATE INDEX IF NOT EXISTS fields_by_key ON fields (key);
+"""
+
+# A parenthesis, or a run of other characters in which double-quoted values can contain spaces and parentheses.
+QUERY_TOKEN_PATTERN: re.Pattern[str] = re.compile(r'\(|\)|(?:[^\s()"]|"[^"]*")+')
+
+
+@dataclass
+class FileFingerprint:
+    """
+    The mtime, size and hash of a note, taken when it was read.
+    """
+
+    mtime: int
+    size: int
+    hash: str
+
+
+def read_fingerprinted_file(filepath: str) -> tuple[str, FileFingerprint]:
+    """Read the text of a file, fingerprinting the bytes that were read.
+
+    The file is stat'ed before it is read, so if it changes in between, the next check finds a newer mtime and hashes it again.
+
+    Args:
+        filepath (str): The path to the file.
+
+    Returns:
+        tuple[str, FileFingerprint]: The text, decoded the same way `open` does, and the fingerprint of the bytes it was decoded from.
+    """
+    stat = os.stat(filepath)
+    with open(filepath, "rb") as file:
+        data = file.read()
+    text = io.TextIOWrapper(io.BytesIO(data)).read()
+    return text, FileFingerprint(
+        stat.st_mtime_ns, stat.st_size, hashlib.sha256(data).hexdigest()
+    )
+
+
+@dataclass
+class IndexedPage:
+    """
+    A parsed note, as stored in the vault index.
+    """
+
+    path: str
+    page_type: str
+    card: dict
+    # The fingerprint of the text the page was parsed from.
+    fingerprint: FileFingerprint
+    tags: List[str] = field(default_factory=list)
+    frontmatter: dict = field(default_factory=dict)
+    dataview_fields: dict[str, List[str]] = field(default_factory=dict)
+    # The title each of the page's links resolved to, or None if they weren't resolved.
+    links: ResolvedLinks | None = None
+
+
+def get_field_values(value: Any) -> List[str]:
+    """Convert a frontmatter or Dataview value to the strings a query is matched against.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        List[str]: One string for each item of a list, or a single string for any other value.
+    """
+    if isinstance(value, list):
+        return [item for element in value for item in get_field_values(element)]
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [json.dumps(value, default=str)]
+    return [str(value)]
+
+
+class QueryParser:
+    """
+    Compiles a query into an SQL condition on the `pages` table.
+
+    A query is made of terms combined with `and`, `or`, `not` and parentheses:
+
+    - `type=TYPE` matches the page type, such as `type=item`.
+    - `tag:TAG` matches a tag and the tags nested under it. `*` and `?` match any characters, so `tag:character/npc/*` only matches nested tags.
+    - `KEY=VALUE` matches a frontmatter or Dataview field, ignoring case. `*` and `?` work in the value too. Values with spaces can be double-quoted.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.tokens = QUERY_TOKEN_PATTERN.findall(query)
+        self.position = 0
+        self.parameters: List[str] = []
+
+    def parse(self) -> tuple[str, List[str]]:
+        """Compile the query.
+
+        Raises:
+            ValueError: If the query is malformed.
+
+        Returns:
+            tuple[str, List[str]]: The SQL condition and its parameters.
+        """
+        if not self.tokens:
+            raise ValueError("The query is empty.")
+        condition = self.__parse_or()
+        if self.position < len(self.tokens):
+            raise ValueError(
+                f"Unexpected '{self.tokens[self.position]}' in query '{self.query}'."
+            )
+        return condition, self.parameters
+
+    def __peek(self) -> str | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def __take(self) -> str:
+        token = self.__peek()
+        if token is None:
+            raise ValueError(f"Query '{self.query}' ends too early.")
+        self.position += 1
+        return token
+
+    def __parse_or(self) -> str:
+        conditions = [self.__parse_and()]
+        while (self.__peek() or "").lower() == "or":
+            self.position += 1
+            conditions.append(self.__parse_and())
+        return conditions[0] if len(conditions) == 1 else f"({' OR '.join(conditions)})"
+
+    def __parse_and(self) -> str:
+        conditions = [self.__parse_not()]
+        while (self.__peek() or "").lower() == "and":
+            self.position += 1
+            conditions.append(self.__parse_not())
+        return (
+            conditions[0] if len(conditions) == 1 else f"({' AND '.join(conditions)})"
+        )
+
+    def __parse_not(self) -> str:
+        if (self.__peek() or "").lower() == "not":
+            self.position += 1
+            return f"NOT {self.__parse_not()}"
+        token = self.__take()
+        if token == "(":
+            condition = self.__parse_or()
+            if self.__take() != ")":
+                raise ValueError(f"Missing ')' in query '{self.query}'.")
+            return condition
+        if token == ")" or token.lower() in ("and", "or"):
+            raise ValueError(f"Unexpected '{token}' in query '{self.query}'.")
+        return self.__parse_term(token)
+
+    def __parse_term(self, token: str) -> str:
+        if token.lower().startswith("tag:"):
+            tag = token[4:].strip('"').lstrip("#")
+            if not tag:
+                raise ValueError(f"Term '{token}' is missing a tag.")
+            self.parameters += [tag, f"{tag}/*"]
+            return "EXISTS (SELECT 1 FROM tags WHERE tags.path = pages.path AND (tags.tag GLOB ? OR tags.tag GLOB ?))"
+        key, separator, value = token.partition("=")
+        value = value.strip('"')
+        if not separator or not key or not value:
+            raise ValueError(
+                f"Term '{token}' should look like KEY=VALUE, type=TYPE or tag:TAG."
+            )
+        if key.lower() == "type":
+            self.parameters.append(value.lower())
+            return "pages.page_type = ?"
+        self.parameters += [key, value]
+        return "EXISTS (SELECT 1 FROM fields WHERE fields.path = pages.path AND fields.key = ? AND lower(fields.value) GLOB lower(?))"
+
+
+def compile_query(query: str) -> tuple[str, List[str]]:
+    """Compile a query into an SQL condition on the `pages` table. See `QueryParser` for the syntax.
+
+    Args:
+        query (str): The query, such as `type=item and rarity=rare` or `tag:character/npc/*`.
+
+    Raises:
+        ValueError: If the query is malformed.
+
+    Returns:
+        tuple[str, List[str]]: The SQL condition and its parameters.
+    """
+    return QueryParser(query).parse()
+
+
+class VaultIndex:
+    """
+    Stores each parsed note's page type, tags, frontmatter, Dataview fields and card in an SQLite database.
+
+    Like the build manifest, a note is current when its mtime and size are unchanged, or when its contents still hash to the same value, and it was indexed with the current parser version and its links still resolve to the same notes.
+    Only the notes that aren't current need to be parsed again, so adding a note only parses the notes whose links now point to it.
+    """
+
+    def __init__(self, index_path: Path, parser_version: str | None = None):
+        self.index_path = index_path
+        self.parser_version = parser_version or get_parser_version()
+        # The index that the pages' links are resolved against, or None if they aren't resolved.
+        self.link_index: LinkIndex | None = None
+        self.connection = sqlite3.connect(index_path)
+        self.connection.executescript(SCHEMA)
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'parser_version'"
+        ).fetchone()
+        if row is None or row[0] != self.parser_version:
+            # Pages parsed by another version of the parser may differ, so they are all parsed again.
+            with self.connection:
+                self.connection.execute("DELETE FROM pages")
+                self.connection.execute("DELETE FROM tags")
+                self.connection.execute("DELETE FROM fields")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('parser_version', ?)",
+                    (self.parser_version,),
+                )
+
+    def is_current(self, filepath: str) -> bool:
+        """Check whether a note's page is indexed and unchanged, only hashing the note if its mtime or size changed.
+
+        Args:
+            filepath (str): The path to the markdown file.
+
+        Returns:
+            bool: True if the note doesn't need to be parsed again.
+        """
+        row = self.connection.execute(
+            "SELECT mtime, size, hash, links FROM pages WHERE path = ?", (filepath,)
+        ).fetchone()
+        if row is None or not self.__links_are_current(json.loads(row[3])):
+            return False
+        stat = os.stat(filepath)
+        if (row[0], row[1]) == (stat.st_mtime_ns, stat.st_size):
+            return True
+        if hash_file(filepath) != row[2]:
+            return False
+        # The note was touched without changing, so remember its new mtime and size.
+        self.connection.execute(
+            "UPDATE pages SET mtime = ?, size = ? WHERE path = ?",
+            (stat.st_mtime_ns, stat.st_size, filepath),
+        )
+        return True
+
+    def __links_are_current(self, resolved: ResolvedLinks | None) -> bool:
+        """
+        Returns whether a page's links, as recorded when it was indexed, still resolve the same way.
+        """
+        if self.link_index is None or resolved is None:
+            # A page is only reused if its links were resolved exactly when they are resolved now.
+            return self.link_index is None and resolved is None
+        return self.link_index.resolves_to(resolved)
+
+    def set_page(self, page: IndexedPage) -> None:
+        """Add or replace a note's page.
+
+        Args:
+            page (IndexedPage): The parsed note.
+        """
+        self.remove_page(page.path)
+        self.connection.execute(
+            "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                page.path,
+                page.fingerprint.mtime,
+                page.fingerprint.size,
+                page.fingerprint.hash,
+                json.dumps(page.links),
+                page.page_type,
+                json.dumps(page.frontmatter, default=str),
+                json.dumps(page.dataview_fields),
+                json.dumps(page.card),
+            ),
+        )
+        self.connection.executemany(
+            "INSERT INTO tags VALUES (?, ?)",
+            ((page.path, tag) for tag in page.tags),
+        )
+        self.connection.executemany(
+            "INSERT INTO fields VALUES (?, ?, ?)",
+            (
+                (page.path, str(key), value)
+                for fields in (page.frontmatter, page.dataview_fields)
+                for key, values in fields.items()
+                for value in get_field_values(values)
+            ),
+        )
+
+    def remove_page(self, filepath: str) -> None:
+        """Remove a note's page, if it is indexed.
+
+        Args:
+            filepath (str): The path to the markdown file.
+        """
+        for table in ("pages", "tags", "fields"):
+            self.connection.execute(f"DELETE FROM {table} WHERE path = ?", (filepath,))
+
+    def keep_pages(self, filepaths: Iterable[str]) -> None:
+        """Remove the pages of every note except the given ones, such as notes that were deleted.
+
+        Args:
+            filepaths (Iterable[str]): The paths to the markdown files to keep.
+        """
+        kept = set(filepaths)
+        indexed = [
+            path
+            for (path,) in self.connection.execute("SELECT path FROM pages")
+            if path not in kept
+        ]
+        for path in indexed:
+            self.remove_page(path)
+
+    def find_pages(self, query: str) -> set[str]:
+        """Find the notes whose pages match a query. See `QueryParser` for the syntax.
+
+        Args:
+            query (str): The query, such as `type=item and rarity=rare`.
+
+        Raises:
+            ValueError: If the query is malformed.
+
+        Returns:
+            set[str]: The paths to the matching markdown files.
+        """
+        condition, parameters = compile_query(query)
+        return {
+            path
+            for (path,) in self.connection.execute(
+                f"SELECT path FROM pages WHERE {condition}", parameters
+            )
+        }
+
+    def get_card(self, filepath: str) -> dict | None:
+        """Get the card of a note's page.
+
+        Args:
+            filepath (str): The path to the markdown file.
+
+        Returns:
+            dict | None: The card dict, or None if the note isn't indexed.
+        """
+        row = self.connection.execute(
+            "SELECT card FROM pages WHERE path = ?", (filepath,)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def commit(self) -> None:
+        """
+        Write the changes made since the last commit to disk.
+        """
+        self.connection.commit()
+
+    def close(self) -> None:
+        """
+        Write the changes to disk and close the database.
+        """
+        self.connection.commit()
+        self.connection.close()
+
+    def __enter__(self) -> "VaultIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,249 @@
+"""
+Tools to wait for files in a set of directories to change.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Sequence
+
+from utils.files import matches_any
+
+
+def list_directories(directory: Path, exclude: Sequence[str] = ()) -> list[Path]:
+    """List a directory and all of its subdirectories, skipping excluded ones.
+
+    Args:
+        directory (Path): The path to the directory.
+        exclude (Sequence[str], optional): Glob patterns for the directories to skip, relative to `directory`. Defaults to ().
+
+    Returns:
+        list[Path]: The directory followed by its subdirectories.
+    """
+    directories: list[Path] = []
+    for current, subdirectories, _ in os.walk(directory):
+        directories.append(Path(current))
+        relative_prefix = Path(current).relative_to(directory).as_posix() + "/"
+        if relative_prefix == "./":
+            relative_prefix = ""
+        subdirectories[:] = [
+            subdirectory
+            for subdirectory in subdirectories
+            if not matches_any(relative_prefix + subdirectory, exclude)
+        ]
+    return directories
+
+
+class Watcher(ABC):
+    """
+    Base class for the directory watchers.
+    """
+
+    def __init__(self, directories: list[Path], exclude: Sequence[str] = ()):
+        self.directories = list(dict.fromkeys(directories))
+        self.exclude = exclude
+
+    def list_watched_directories(self) -> list[Path]:
+        """
+        Returns the watched directories and all of their subdirectories that aren't excluded.
+        """
+        watched: list[Path] = []
+        for directory in self.directories:
+            watched.extend(list_directories(directory, self.exclude))
+        return list(dict.fromkeys(watched))
+
+    @abstractmethod
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Block until at least one file in the watched directories changes.
+
+        Args:
+            timeout (float | None, optional): The number of seconds to wait before giving up. Defaults to None, which waits forever.
+
+        Returns:
+            set[Path]: The files that were created, modified or deleted. Empty if the timeout ran out.
+        """
+        raise NotImplementedError("This method should be overridden in subclasses.")
+
+    def close(self) -> None:
+        """
+        Release any resources held by the watcher.
+        """
+
+
+class PollingWatcher(Watcher):
+    """
+    Detects changes by comparing the mtime and size of every file on each poll.
+    Works on every platform and filesystem, including network shares.
+    """
+
+    def __init__(
+        self,
+        directories: list[Path],
+        exclude: Sequence[str] = (),
+        interval: float = 0.25,
+    ):
+        super().__init__(directories, exclude)
+        self.interval = interval
+        self.__snapshot = self.__scan()
+
+    def __scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot: dict[Path, tuple[int, int]] = {}
+        for directory in self.list_watched_directories():
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            snapshot[Path(entry.path)] = (
+                                stat.st_mtime_ns,
+                                stat.st_size,
+                            )
+            except FileNotFoundError:
+                # The directory was removed while it was being scanned.
+                continue
+        return snapshot
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.__scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self.__snapshot.keys()
+                if snapshot.get(path) != self.__snapshot.get(path)
+            }
+            self.__snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+
+class InotifyWatcher(Watcher):
+    """
+    Uses the Linux inotify API through libc, so changes are reported as soon as they happen.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_ISDIR = 0x40000000
+    EVENT_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(
+        self,
+        directories: list[Path],
+        exclude: Sequence[str] = (),
+        debounce: float = 0.02,
+    ):
+        super().__init__(directories, exclude)
+        self.debounce = debounce
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError("inotify is only available on Linux.")
+        self.__libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.__fd: int = self.__libc.inotify_init1(os.O_CLOEXEC)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed.")
+        self.__directories_by_wd: dict[int, Path] = {}
+        try:
+            for directory in self.list_watched_directories():
+                self.__add_watch(directory)
+        except OSError:
+            os.close(self.__fd)
+            raise
+
+    def __add_watch(self, directory: Path) -> None:
+        wd = self.__libc.inotify_add_watch(
+            self.__fd, os.fsencode(directory), self.EVENT_MASK
+        )
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Could not watch '{directory}'.")
+        self.__directories_by_wd[wd] = directory
+
+    def __is_excluded(self, path: Path) -> bool:
+        for directory in self.directories:
+            if path.is_relative_to(directory):
+                parts = path.relative_to(directory).parts
+                return any(
+                    matches_any("/".join(parts[: index + 1]), self.exclude)
+                    for index in range(len(parts))
+                )
+        return False
+
+    def __watch_new_directory(self, directory: Path) -> set[Path]:
+        """
+        Watches a directory that was created or moved in, and returns the files already in it.
+        """
+        changed: set[Path] = set()
+        for new_directory in list_directories(directory):
+            if self.__is_excluded(new_directory):
+                continue
+            try:
+                self.__add_watch(new_directory)
+                # Files can be written before the watch is added, so report everything that's already there.
+                changed.update(
+                    path for path in new_directory.iterdir() if path.is_file()
+                )
+            except OSError:
+                # The directory was removed again before it could be watched.
+                continue
+        return changed
+
+    def __read_events(self) -> set[Path]:
+        changed: set[Path] = set()
+        buffer = os.read(self.__fd, 64 * 1024)
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(buffer, offset)
+            offset += self.EVENT_HEADER.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if not name or wd not in self.__directories_by_wd:
+                continue
+            path = self.__directories_by_wd[wd] / os.fsdecode(name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    changed |= self.__watch_new_directory(path)
+                continue
+            changed.add(path)
+        return changed
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        readable, _, _ = select.select([self.__fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = self.__read_events()
+        # Editors often write a file in several steps, so collect the rest of the burst before returning.
+        while select.select([self.__fd], [], [], self.debounce)[0]:
+            changed |= self.__read_events()
+        return changed
+
+    def close(self) -> None:
+        os.close(self.__fd)
+
+
+def new_watcher(directories: list[Path], exclude: Sequence[str] = ()) -> Watcher:
+    """Create the fastest watcher available on this system.
+
+    Args:
+        directories (list[Path]): The directories to watch, including their subdirectories.
+        exclude (Sequence[str], optional): Glob patterns for the subdirectories to ignore. Defaults to ().
+
+    Returns:
+        Watcher: An inotify watcher on Linux, otherwise a polling watcher.
+    """
+    try:
+        return InotifyWatcher(directories, exclude)
+    except (OSError, AttributeError):
+        return PollingWatcher(directories, exclude)